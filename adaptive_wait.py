@@ -0,0 +1,118 @@
+# 自适应滚动等待：滚动后一旦有新推文渲染就立即返回，而不是固定等待一个随机时间窗口
+import random
+import threading
+import time
+
+from instrumentation import METRICS, STAGE_SCROLL
+
+ADAPTIVE_SCROLL_WAIT = True  # False 时退回到原来的固定随机等待
+JITTER_FLOOR = (0.3, 0.8)  # 即使内容已加载，每次滚动也至少随机停留这么多秒，保留人类化的节奏
+SETTLE_MS = 200  # 检测到新推文后再等待的毫秒数，让同一批渲染完成
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 3000, 5000)
+
+# 在页面中安装 MutationObserver 后滚动到底部，出现新的推文节点或预算耗尽时回调
+SCROLL_AND_OBSERVE_JS = """
+var budgetMs = arguments[0], settleMs = arguments[1], done = arguments[arguments.length - 1];
+var selector = "article[data-testid='tweet']";
+var lastHeight = document.body.scrollHeight;
+var start = performance.now();
+var finished = false, settling = false, timer = null, observer = null;
+function finish(reason) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    done({last_height: lastHeight, new_height: document.body.scrollHeight, count: document.querySelectorAll(selector).length, elapsed_ms: performance.now() - start, reason: reason});
+}
+observer = new MutationObserver(function (mutations) {
+    if (settling) return;
+    for (var i = 0; i < mutations.length; i++) {
+        var added = mutations[i].addedNodes;
+        for (var j = 0; j < added.length; j++) {
+            var node = added[j];
+            if (node.nodeType === 1 && (node.matches(selector) || node.querySelector(selector))) {
+                settling = true;
+                setTimeout(function () { finish('articles'); }, settleMs);
+                return;
+            }
+        }
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+timer = setTimeout(function () { finish('timeout'); }, budgetMs);
+window.scrollTo(0, document.body.scrollHeight);
+"""
+
+class ScrollLatencyStats:
+    """按滚动循环的名称记录每次滚动等待的耗时，用于输出直方图"""
+
+    def __init__(self):
+        self.samples = {}
+        self.fixed_windows = {}
+        self.lock = threading.Lock()
+
+    def record(self, label, seconds, wait_range):
+        with self.lock:
+            self.samples.setdefault(label, []).append(seconds)
+            self.fixed_windows[label] = wait_range
+
+    def report(self):
+        """打印每个滚动循环的耗时分布，以及与固定随机等待相比节省的时间"""
+        with self.lock:
+            samples = {label: sorted(values) for label, values in self.samples.items()}
+        if not samples:
+            return
+        print(f"\n--- 滚动等待耗时统计 ({'自适应' if ADAPTIVE_SCROLL_WAIT else '固定随机等待'}) ---")
+        for label, values in samples.items():
+            count = len(values)
+            mean = sum(values) / count
+            p50, p90 = values[count // 2], values[min(count - 1, int(count * 0.9))]
+            fixed_mean = sum(self.fixed_windows[label]) / 2
+            print(f"{label}: {count} 次 | 平均 {mean:.2f}s | p50 {p50:.2f}s | p90 {p90:.2f}s | 相比固定等待约节省 {max(0.0, fixed_mean - mean) * count:.1f}s")
+            lower = 0
+            for upper in LATENCY_BUCKETS_MS + (None,):
+                in_bucket = sum(1 for v in values if v * 1000 >= lower and (upper is None or v * 1000 < upper))
+                bucket_name = f"{lower}-{upper}ms" if upper is not None else f">={lower}ms"
+                print(f"  {bucket_name:>12} | {'#' * round(in_bucket * 40 / count):<40} {in_bucket}")
+                lower = upper
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.fixed_windows.clear()
+
+SCROLL_STATS = ScrollLatencyStats()
+
+def scroll_and_wait(driver, wait_range, label='scroll'):
+    """滚动到页面底部并等待新内容，返回 (滚动前页面高度, 滚动后页面高度)
+
+    自适应模式下一旦出现新推文就返回，最多等待 wait_range[1] 秒，并保留 JITTER_FLOOR 的最短随机停留；
+    非自适应模式与原逻辑一致：固定随机等待 wait_range 秒。
+    """
+    with METRICS.stage(STAGE_SCROLL):
+        return _scroll_and_wait(driver, wait_range, label)
+
+def _scroll_and_wait(driver, wait_range, label):
+    start = time.perf_counter()
+    if ADAPTIVE_SCROLL_WAIT:
+        floor = random.uniform(*JITTER_FLOOR)
+        try:
+            result = driver.execute_async_script(SCROLL_AND_OBSERVE_JS, int(wait_range[1] * 1000), SETTLE_MS)
+            last_height, new_height = result['last_height'], result['new_height']
+        except Exception:
+            # 页面不支持异步脚本时退回到固定等待
+            last_height, new_height = _fixed_scroll_wait(driver, wait_range)
+        remaining = floor - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+    else:
+        last_height, new_height = _fixed_scroll_wait(driver, wait_range)
+    SCROLL_STATS.record(label, time.perf_counter() - start, wait_range)
+    return last_height, new_height
+
+def _fixed_scroll_wait(driver, wait_range):
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    time.sleep(random.uniform(*wait_range))
+    new_height = driver.execute_script("return document.body.scrollHeight")
+    return last_height, new_height
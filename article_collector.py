@@ -0,0 +1,103 @@
+# 滚动采集推文：在浏览器中只取回新出现的推文节点并解析，三个脚本共用
+# last_time=True 时以推文中最后一个 time 的链接作为帖子链接（二次采集的引用页面，外层是引用推文本身）
+from adaptive_wait import scroll_and_wait
+from instrumentation import COUNT_EARLY_STOPS, COUNT_NEW, COUNT_SEEN, METRICS, STAGE_CAPTURE, STAGE_PARSE, STAGE_SOURCE
+from pipeline import ParseBatches
+from tweet_parser import parse_page_articles, parse_tweet_article
+
+# 【增量采集】在浏览器中一次性取回尚未采集过的推文节点，按帖子链接去重
+COLLECT_NEW_ARTICLES_JS = """
+var seen = new Set(arguments[0]);
+var useLastTime = arguments[1];
+var result = [];
+document.querySelectorAll("article[data-testid='tweet']").forEach(function (article) {
+    var times = article.querySelectorAll('time');
+    if (!times.length) return;
+    var link = times[useLastTime ? times.length - 1 : 0].closest('a');
+    if (!link) return;
+    var href = link.getAttribute('href');
+    if (!href || seen.has(href)) return;
+    seen.add(href);
+    result.push([href, article.outerHTML]);
+});
+return result;
+"""
+
+def find_new_articles(driver, seen_paths, last_time=False):
+    """返回页面中链接路径不在 seen_paths 中的推文 [(链接路径, outerHTML)]，不解析"""
+    with METRICS.stage(STAGE_SOURCE):
+        articles = driver.execute_script(COLLECT_NEW_ARTICLES_JS, list(seen_paths), last_time) or []
+    METRICS.count(COUNT_SEEN, len(articles))
+    return articles
+
+def fetch_new_articles(driver, seen_tweets, last_time=False):
+    """从浏览器取回自上次滚动以来新出现的推文 [(链接路径, outerHTML)]，seen_tweets 为已采集的帖子链接"""
+    return find_new_articles(driver, [post_url.replace("https://x.com", "", 1) for post_url in seen_tweets], last_time)
+
+def collect_new_articles(driver, seen_tweets, last_time=False):
+    """只解析自上次滚动以来新出现的推文，避免每次滚动都重新解析整个 page_source"""
+    new_tweets = []
+    articles = fetch_new_articles(driver, seen_tweets, last_time)
+    with METRICS.stage(STAGE_PARSE):
+        for _, article_html in articles:
+            parsed_data = parse_tweet_article(article_html, last_time=last_time)
+            if parsed_data and parsed_data['post_url'] not in seen_tweets:
+                new_tweets.append(parsed_data)
+                seen_tweets.add(parsed_data['post_url'])
+    METRICS.count(COUNT_NEW, len(new_tweets))
+    return new_tweets
+
+def collect_page_articles(driver, seen_tweets, last_time=False):
+    """重新解析整个 page_source 并返回其中未采集过的推文（非增量模式）"""
+    new_tweets = []
+    with METRICS.stage(STAGE_SOURCE):
+        page_source = driver.page_source
+    with METRICS.stage(STAGE_PARSE):
+        articles = parse_page_articles(page_source, last_time=last_time)
+    for parsed_data in articles:
+        if parsed_data['post_url'] not in seen_tweets:
+            new_tweets.append(parsed_data)
+            seen_tweets.add(parsed_data['post_url'])
+    METRICS.count(COUNT_SEEN, len(articles))
+    METRICS.count(COUNT_NEW, len(new_tweets))
+    return new_tweets
+
+def scroll_and_collect(driver, seen_tweets, max_scrolls=1, target=None, last_time=False, incremental=True, parser=None):
+    """通过限制滚动次数来快速采集样本；已采集 target 条候选时提前停止，不再滚动
+
+    incremental=False 时每次滚动都重新解析整个页面。传入解析进程池 parser (pipeline.ParsePool) 时，
+    只把新推文的 HTML 交给进程池，随即继续滚动，滚动结束后再取回解析结果。
+    """
+    collected_data = []
+    batches = ParseBatches(parser, last_time=last_time) if parser and incremental else None
+    scroll_count = 0
+    capture = getattr(driver, 'capture', None)
+    while scroll_count < max_scrolls:
+        new_tweets = None
+        submitted = 0
+        if capture:
+            with METRICS.stage(STAGE_CAPTURE):
+                new_tweets = capture.take(seen_tweets)
+            if new_tweets is not None and capture.page_responses:
+                METRICS.count(COUNT_NEW, len(new_tweets))
+        if new_tweets is None or not capture.page_responses:
+            if batches:
+                new_tweets, submitted = [], batches.submit(fetch_new_articles(driver, seen_tweets, last_time), seen_tweets)
+                METRICS.count(COUNT_NEW, submitted)
+            elif incremental: new_tweets = collect_new_articles(driver, seen_tweets, last_time)
+            else: new_tweets = collect_page_articles(driver, seen_tweets, last_time)
+        collected_data.extend(new_tweets)
+        new_tweets_found = bool(new_tweets) or submitted > 0
+        if target and len(collected_data) + (batches.found if batches else 0) >= target:
+            METRICS.count(COUNT_EARLY_STOPS)
+            break
+
+        last_height, new_height = scroll_and_wait(driver, (2.0, 3.5), 'scroll_and_collect')
+
+        scroll_count += 1
+        if new_height == last_height and not new_tweets_found:
+            break
+
+    if batches:
+        collected_data.extend(batches.results())
+    return collected_data
@@ -8,8 +8,23 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from tweet_parser import parse_page_articles
+from adaptive_wait import SCROLL_STATS, scroll_and_wait
+import article_collector
+from instrumentation import COUNT_BELOW_THRESHOLD, COUNT_NEW, COUNT_QUOTES_SKIPPED, COUNT_SEEN, METRICS, STAGE_CAPTURE, STAGE_GET, STAGE_PARSE, STAGE_SLEEP, STAGE_SOURCE, STAGE_WAIT, STAGE_WRITE
+from backoff import FAILURE_MISSING_SOURCE, BackoffPolicy, ScrapeFailure
+from browser_pool import BrowserPool
+from session_manager import SessionManager
+from lean_browser import apply_lean_options, enable_request_blocking, persistent_profile_dir
+from tab_session import TabDriver, tweet_pages
+from output_sink import open_sink
+from pipeline import ParsePool
+from job_ledger import LEDGER_FILE, JobLedger
+from search_shards import date_operators, describe_window, refine_window, split_date_range
+from network_capture import TimelineCapture, enable_performance_log
+from profile_cache import PROFILE_CACHE_FILE, ProfileCache, ProfileEnricher
+from tweet_index import TWEET_INDEX_FILE, TweetIndex
+from user_autotwi import fetch_profile
 from datetime import datetime, timedelta
 
 # --- 全局设置 ---
@@ -18,97 +33,48 @@ TASKS_FILE = 'tasks.txt'
 
 # 其他设置
 COOKIES_FILE = 'x_cookies.json'
-MAX_WORKERS = 2
+ACCOUNT_COOKIE_FILES = None # 多账号轮换：Cookies 文件列表，例如 ['x_cookies.json', 'x_cookies_2.json']，各浏览器会话按槽位轮流使用；None 表示只用 COOKIES_FILE
+MAX_WORKERS = 2 # 浏览器会话池中同时工作的浏览器数量
+PAGES_PER_SESSION = 50 # 每个浏览器会话处理多少个链接后自动重启，避免内存持续膨胀
 HEADLESS_MODE = True
+LEAN_BROWSER = False # 精简模式：屏蔽图片、字体、视频和统计脚本请求，并限制渲染进程内存（规则见 lean_browser.py）
+TABS_PER_BROWSER = 1 # 多标签页模式：每个浏览器打开的标签页数，当前标签页以外的标签页预加载队列中后面的链接，页面加载与采集重叠（见 tab_session.py）；1 表示不使用
+PERSISTENT_PROFILES = False # 每个浏览器会话使用固定的用户目录 (browser_profiles/autotwi-N)，缓存和 Cookies 在多次运行之间保留
 REPLY_RETWEET_LIMIT = 20
+OVERSAMPLE_FACTOR = None # 回复/引用的候选数达到 REPLY_RETWEET_LIMIT × 此倍数（如 2.0）后停止滚动，再从候选中随机抽样；样本只来自 X 排在最前面的那部分回复，不再是全部回复中的随机样本。None 表示始终滚动到最大次数
+SKIP_EMPTY_QUOTES = True # 源帖子的转发数（页面上包含引用数；网络捕获模式下使用接口返回的引用数）为 0 时不再打开 /quotes 页面
+INCREMENTAL_COLLECT = True # 滚动采集时只解析新出现的推文，而不是每次都重新解析整个页面
+NETWORK_CAPTURE = False # 直接读取页面请求的时间线JSON (GraphQL 响应) 生成记录，拿不到响应时自动退回DOM解析
+ENRICH_PROFILES = False # 资料附加：把用户资料缓存中的粉丝数、简介、注册时间等附加到源帖子和回复/引用上，缓存未命中的用户在后台分批采集
+PROFILE_BATCH_SIZE = 10 # 后台每批采集的用户资料数量
+GLOBAL_DEDUPE = False # 全局去重：多个任务搜索到同一条帖子时只采集一次，其他任务在各自文件夹的 references.jsonl 中记录引用（与二次采集共用 tweet_index.sqlite3，见 tweet_index.py）
+PARSE_PROCESSES = 0 # 流水线：解析推文 HTML 的进程数，浏览器线程取回 HTML 后立即继续滚动，解析在进程池中进行；0 表示在浏览器线程中解析
+WRITE_QUEUE_SIZE = 0 # 流水线：后台写入线程的队列长度，写出跟不上时采集线程等待；0 表示在采集线程中直接写出
+OUTPUT_FORMAT = 'json' # 输出格式: 'json' 每条一个文件（默认，与旧版一致）/ 'jsonl' 按大小轮转的JSONL / 'parquet' 列式文件（需要 pyarrow）
 SEARCH_LIMIT = 120 # 对每个任务，搜索120条推文链接
+SEARCH_CONCURRENCY = 1 # 同时执行搜索的会话数量，其余会话采集已搜索到的链接（失败后等待重试的搜索继续占用名额）
+SEARCH_SHARD = None # 搜索分片: None 整个日期范围只搜索一次 / 'day' 按天 / 'hour' 按小时拆分成独立的小搜索
+SHARD_LIMIT = 60 # 分片模式下每个窗口最多收集的链接数；达到上限的窗口会被细分后继续搜索（任务总数仍受 SEARCH_LIMIT 限制）
 MIN_RETWEETS = 0  # 对每个任务，搜索的最小转推量
-MIN_FAVES = 10 # 对每个任务，搜索的最小点赞量
+MIN_FAVES = 10 # 对每个任务，搜索的最小点赞量（按搜索结果卡片上的点赞数过滤，低于门槛的帖子不会被打开）
+MIN_REPLIES = 0 # 对每个任务，搜索结果的最小回复量
+PRIORITIZE_BY_ENGAGEMENT = True # 按搜索结果卡片上的互动量（回复 + 转发 + 点赞）排序采集队列，互动量高的帖子先采集
 
-# 【新增】当发生严重错误时，脚本暂停的秒数
+# 【新增】疑似触发反爬限制时，出错的浏览器会话首次暂停的秒数（连续出错时指数增长，其他会话不受影响）
 PAUSE_ON_ERROR_SECONDS = 241 
 
-def save_cookies(driver, file_path):
-    """保存当前浏览器的Cookies到文件"""
-    with open(file_path, 'w') as f:
-        json.dump(driver.get_cookies(), f)
-    print(f"Cookies have been saved to {file_path}")
-
-def load_cookies(driver, file_path):
-    """从文件加载Cookies到浏览器"""
-    if os.path.exists(file_path):
-        driver.get("https://x.com/")
-        with open(file_path, 'r') as f:
-            cookies = json.load(f)
-        for cookie in cookies:
-            driver.add_cookie(cookie)
-        return True
-    return False
+ENGAGEMENT_FIELDS = ('reply_count', 'retweet_count', 'like_count')  # 搜索结果卡片上保存的互动数据
+PARSER = None  # 解析进程池，main 中按 PARSE_PROCESSES 创建
 
-def parse_tweet_article(article_soup):
-    """从一个包含单条推文的 'article' HTML片段中解析出所有数据"""
-    try:
-        time_element = article_soup.find('time')
-        if not time_element or not time_element.find_parent('a'): return None
-        post_link = "https://x.com" + time_element.find_parent('a')['href']
-        post_time = time_element['datetime']
-        user_id = post_link.split('/')[3]
-        user_name_div = article_soup.find('div', {'data-testid': 'User-Name'})
-        nickname = user_name_div.find_all('span')[0].text if user_name_div else user_id
-        tweet_text_div = article_soup.find('div', {'data-testid': 'tweetText'})
-        if tweet_text_div:
-            for img in tweet_text_div.find_all('img', alt=True): img.replace_with(img['alt'])
-        content = tweet_text_div.get_text(separator='\n', strip=True) if tweet_text_div else ''
-        emoji_pattern = re.compile("[" u"\U0001F600-\U0001F64F" u"\U0001F300-\U0001F5FF" u"\U0001F680-\U0001F6FF" u"\U0001F1E0-\U0001F1FF" u"\U00002702-\U000027B0" u"\U000024C2-\U0001F251" "]+", flags=re.UNICODE)
-        emojis = emoji_pattern.findall(content)
-        hashtags = [tag.text for tag in article_soup.find_all('a', href=re.compile(r'/hashtag/'))]
-        reply_count_element = article_soup.find('button', {'data-testid': 'reply'}) or article_soup.find('div', {'data-testid': 'reply'})
-        retweet_count_element = article_soup.find('button', {'data-testid': 'retweet'}) or article_soup.find('div', {'data-testid': 'retweet'})
-        like_count_element = article_soup.find('button', {'data-testid': 'like'}) or article_soup.find('div', {'data-testid': 'like'})
-
-        def parse_metric(element):
-            if not element: return 0
-            aria_label = element.get('aria-label', '')
-            if aria_label:
-                match = re.search(r'([\d,]+)', aria_label)
-                if match:
-                    try: return int(match.group(1).replace(',', ''))
-                    except (ValueError, TypeError): pass
-            text = element.get_text(strip=True).upper()
-            if not text: return 0
-            if 'K' in text: return int(float(text.replace('K', '')) * 1000)
-            if 'M' in text: return int(float(text.replace('M', '')) * 1000000)
-            try: return int(text)
-            except (ValueError, TypeError): return 0
-
-        return {"nickname": nickname, "user_id": user_id, "platform": "X", "post_time": post_time, "ip_location": "N/A (Not available on web version)", "hashtags": ", ".join(hashtags), "post_text": content, "emojis": emojis, "reply_count": parse_metric(reply_count_element), "retweet_count": parse_metric(retweet_count_element), "like_count": parse_metric(like_count_element), "post_url": post_link}
-    except Exception: return None
-
-def scroll_and_collect(driver, seen_tweets, max_scrolls=1):
-    """通过限制滚动次数来快速采集样本"""
-    collected_data = []
-    scroll_count = 0
-    while scroll_count < max_scrolls:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        articles = soup.find_all('article', {'data-testid': 'tweet'})
-        new_tweets_found = False
-        for article in articles:
-            parsed_data = parse_tweet_article(article)
-            if parsed_data and parsed_data['post_url'] not in seen_tweets:
-                collected_data.append(parsed_data)
-                seen_tweets.add(parsed_data['post_url'])
-                new_tweets_found = True
-        
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(2.0, 3.5))
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        
-        scroll_count += 1
-        if new_height == last_height and not new_tweets_found:
-            break
-            
-    return collected_data
+def scroll_and_collect(driver, seen_tweets, max_scrolls=1, target=None):
+    """按本脚本的 INCREMENTAL_COLLECT / PARSER 设置滚动采集（见 article_collector.scroll_and_collect）"""
+    return article_collector.scroll_and_collect(driver, seen_tweets, max_scrolls, target, last_time=False, incremental=INCREMENTAL_COLLECT, parser=PARSER)
+
+def sample_target():
+    """回复和引用各自需要的候选数：从 REPLY_RETWEET_LIMIT × OVERSAMPLE_FACTOR 条候选中随机抽取 REPLY_RETWEET_LIMIT 条"""
+    if not OVERSAMPLE_FACTOR:
+        return None
+    return max(REPLY_RETWEET_LIMIT, round(REPLY_RETWEET_LIMIT * OVERSAMPLE_FACTOR))
 
 def get_chrome_options():
     """配置Chrome浏览器选项以提高速度"""
@@ -120,299 +86,471 @@ def get_chrome_options():
     options.add_argument("--start-maximized")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if LEAN_BROWSER: apply_lean_options(options)
+    profile_dir = persistent_profile_dir('autotwi') if PERSISTENT_PROFILES else None
+    if profile_dir: options.add_argument(f"--user-data-dir={profile_dir}")
+    if NETWORK_CAPTURE: enable_performance_log(options)
     return options
 
-def perform_initial_login():
-    """仅在没有cookies时执行，用于首次手动登录"""
-    if os.path.exists(COOKIES_FILE): return
-    print("Cookies file not found. A browser will open for you to log in.")
-    print("Please log in manually. You have 120 seconds...")
-    login_options = get_chrome_options()
-    if any('--headless' in arg for arg in login_options.arguments): login_options.arguments.remove('--headless')
-    driver = webdriver.Chrome(options=login_options)
-    driver.get("https://x.com/login")
+def create_logged_in_driver(sessions=None):
+    """创建一个新的浏览器并注入登录 Cookies，供浏览器会话池使用；sessions 为 None 时只读取 COOKIES_FILE"""
+    sessions = sessions or SessionManager([COOKIES_FILE])
+    driver = webdriver.Chrome(options=get_chrome_options())
+    if LEAN_BROWSER: enable_request_blocking(driver)
     try:
-        WebDriverWait(driver, 120).until(EC.url_contains("home"))
-        print("Login successful! Saving cookies for future use...")
-        save_cookies(driver, COOKIES_FILE)
-    except Exception: print("Login timed out or failed.")
-    finally: driver.quit()
-
-def search_for_popular_tweets(driver, keyword, start_date, end_date, min_retweets, limit):
-    """根据关键词、日期范围和最小转发量搜索推文链接"""
-    print(f"开始搜索关键词 '{keyword}' 从 {start_date} 到 {end_date} (最小转发量: {min_retweets}) 的推文...")
-    search_query = f"{keyword} min_retweets:{min_retweets} since:{start_date} until:{end_date}"
-    search_url = f"https://x.com/search?q={search_query}&src=typed_query"
-    driver.get(search_url)
+        sessions.attach(driver)
+    except Exception:
+        driver.quit()
+        raise
+    if TABS_PER_BROWSER > 1: driver = TabDriver(driver, TABS_PER_BROWSER, setup=enable_request_blocking if LEAN_BROWSER else None)
+    if NETWORK_CAPTURE: driver.capture = TimelineCapture(driver)
+    return driver
+
+def build_search_url(keyword, start_date, end_date, min_retweets):
+    """start_date / end_date 可以是 YYYY-MM-DD 字符串，也可以是分片窗口的 datetime"""
+    search_query = f"{keyword} min_retweets:{min_retweets} {date_operators(start_date, end_date)}"
+    return f"https://x.com/search?q={search_query}&src=typed_query"
+
+def engagement(candidate):
+    """搜索结果卡片上的互动量，用于排序采集队列；旧版链接列表中只有链接、没有互动数据时为 0"""
+    return sum(candidate.get(field) or 0 for field in ENGAGEMENT_FIELDS)
+
+def meets_thresholds(candidate):
+    """卡片上的互动数据是否达到 MIN_REPLIES / MIN_RETWEETS / MIN_FAVES；没有互动数据的链接一律保留"""
+    if not any(field in candidate for field in ENGAGEMENT_FIELDS):
+        return True
+    return (candidate.get('reply_count', 0) >= MIN_REPLIES and candidate.get('retweet_count', 0) >= MIN_RETWEETS
+            and candidate.get('like_count', 0) >= MIN_FAVES)
+
+def queue_priority(candidate):
+    """会话池中的优先级，数值越小越先采集"""
+    return -engagement(candidate) if PRIORITIZE_BY_ENGAGEMENT else 0
+
+def candidate_metrics(candidate):
+    """保存到任务台账 payload 中的互动数据（不含链接）"""
+    return {field: candidate[field] for field in ENGAGEMENT_FIELDS if field in candidate} or None
+
+def load_candidates(entries):
+    """读取 urls_to_process.json：旧版为链接字符串列表，新版为带互动数据的候选列表；按当前门槛过滤"""
+    candidates = [{'url': entry} if isinstance(entry, str) else entry for entry in entries]
+    return [candidate for candidate in candidates if meets_thresholds(candidate)]
+
+def search_for_popular_tweets(driver, keyword, start_date, end_date, min_retweets, limit, on_found=None):
+    """根据关键词、日期范围和最小转发量搜索推文，返回达到互动门槛的候选 [{'url', 'reply_count', 'retweet_count', 'like_count'}, ...]
+
+    搜索结果卡片用与采集阶段相同的解析器解析，低于 MIN_FAVES 等门槛的帖子在进入采集队列前就被丢弃。
+    每次滚动后新发现的候选会立即传给 on_found(new_candidates)，调用方可以在搜索结束前就开始采集。
+    """
+    print(f"开始搜索关键词 '{keyword}' 时间 {describe_window((start_date, end_date))} (最小转发量: {min_retweets}) 的推文...")
+    with METRICS.stage(STAGE_GET):
+        driver.get(build_search_url(keyword, start_date, end_date, min_retweets))
     
-    tweet_urls = set()
+    candidates = {}  # 链接 -> 候选，有序去重
+    rejected = set()  # 低于门槛的链接，滚动后再次出现时不重复计数
     retries = 5
-    while len(tweet_urls) < limit and retries > 0:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        articles = soup.find_all('article', {'data-testid': 'tweet'})
+    while len(candidates) < limit and retries > 0:
+        with METRICS.stage(STAGE_SOURCE):
+            page_source = driver.page_source
+        with METRICS.stage(STAGE_PARSE):
+            articles = parse_page_articles(page_source)
         
         if not articles:
-            time.sleep(2)
+            with METRICS.stage(STAGE_SLEEP):
+                time.sleep(2)
             retries -= 1
             continue
 
-        for article in articles:
-            time_element = article.find('time')
-            if time_element and time_element.find_parent('a'):
-                post_link = "https://x.com" + time_element.find_parent('a')['href']
-                tweet_urls.add(post_link)
-                if len(tweet_urls) >= limit:
-                    break
+        new_candidates = []
+        for parsed_data in articles:
+            post_link = parsed_data['post_url']
+            if post_link in candidates or post_link in rejected:
+                continue
+            candidate = {'url': post_link, **{field: parsed_data[field] for field in ENGAGEMENT_FIELDS}}
+            if not meets_thresholds(candidate):
+                rejected.add(post_link)
+                METRICS.count(COUNT_BELOW_THRESHOLD)
+                continue
+            candidates[post_link] = candidate
+            new_candidates.append(candidate)
+            if len(candidates) >= limit:
+                break
+        METRICS.count(COUNT_SEEN, len(articles))
+        METRICS.count(COUNT_NEW, len(new_candidates))
+        if new_candidates and on_found:
+            on_found(new_candidates)
         
-        print(f"  [搜索进度] 已找到 {len(tweet_urls)} / {limit} 个链接...")
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(2.5, 4.0))
-        new_height = driver.execute_script("return document.body.scrollHeight")
+        print(f"  [搜索进度] 已找到 {len(candidates)} / {limit} 个链接 (低于互动门槛跳过 {len(rejected)} 个)...")
+        last_height, new_height = scroll_and_wait(driver, (2.5, 4.0), 'search')
         if new_height == last_height:
             retries -= 1
             print(f"  [搜索提示] 似乎已到达搜索结果底部，剩余尝试次数: {retries}")
     
-    print(f"搜索完成，共找到 {len(tweet_urls)} 个唯一链接。")
-    return list(tweet_urls)
-
-def process_url(url, output_dir):
-    """处理单个URL的完整爬取流程"""
-    thread_id = f"线程-{random.randint(100, 999)}"
-    print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 开始处理链接: {url}")
-    driver = webdriver.Chrome(options=get_chrome_options())
-    try:
-        if not load_cookies(driver, COOKIES_FILE):
-            print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 无法加载Cookies，跳过链接 {url}")
-            return
-
-        driver.get(url)
-        
-        wait = WebDriverWait(driver, 20)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
-        time.sleep(random.uniform(2, 3))
-
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        articles = soup.find_all('article', {'data-testid': 'tweet'})
-        
-        source_tweet = None
-        for article in articles:
-            parsed_data = parse_tweet_article(article)
-            if parsed_data and url.endswith(parsed_data['post_url'].replace("https://x.com", "")):
-                source_tweet = parsed_data
-                break
-        
-        if not source_tweet:
-            print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [失败] 页面加载后未能找到并解析源帖子 {url}")
-            return
-
-        seen_tweets = {source_tweet['post_url']}
-
-        final_replies = scroll_and_collect(driver, seen_tweets, max_scrolls=4)
-        quotes_url = url.rstrip('/') + "/quotes"
-        all_retweets = []
-        try:
-            driver.get(quotes_url)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
-            all_retweets = scroll_and_collect(driver, seen_tweets, max_scrolls=4)
-        except Exception: pass
-
-        if len(final_replies) > REPLY_RETWEET_LIMIT: sampled_replies = random.sample(final_replies, REPLY_RETWEET_LIMIT)
-        else: sampled_replies = final_replies
-
-        if len(all_retweets) > REPLY_RETWEET_LIMIT: sampled_retweets = random.sample(all_retweets, REPLY_RETWEET_LIMIT)
-        else: sampled_retweets = all_retweets
-
-        source_tweet['replies'] = sampled_replies
-        source_tweet['retweets_with_comment'] = sampled_retweets
-        
-        post_time_str = source_tweet.get('post_time', str(time.time()))
-        filename_time = post_time_str.replace('T', '_').replace(':', '-').split('.')[0]
-        tweet_id = url.split('/')[-1]
-        output_filename = f"{filename_time}_id_{tweet_id}.json"
-        output_path = os.path.join(output_dir, output_filename)
-
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(source_tweet, f, ensure_ascii=False, indent=4)
-        print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [成功] {url} 的数据已保存至 {output_path}")
+    print(f"搜索完成，共找到 {len(candidates)} 个达到互动门槛的唯一链接，跳过 {len(rejected)} 个。")
+    return list(candidates.values())
 
-    except Exception as e:
-        print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 处理链接 {url} 时发生严重错误: {e}")
-        wait_time = 180
-        print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 遇到严重错误，程序将暂停 {wait_time // 60} 分钟后继续处理其他链接...")
-        for i in range(wait_time, 0, -1):
-            print(f"\r[{time.strftime('%H:%M:%S')}] {thread_id}: 倒计时: {i:03d} 秒...", end="", flush=True)
-            time.sleep(1)
-        print(f"\n[{time.strftime('%H:%M:%S')}] {thread_id}: 暂停结束，此线程将退出。")
-    finally:
-        driver.quit()
-
-def process_url_sequentially(driver, url, output_dir):
+def process_url_sequentially(driver, url, sink, enrich=None):
     """
     【再次重构】处理单个URL的爬取流程。
-    增加了在遇到严重错误时自动暂停的功能。
+    出错时抛出异常，由浏览器会话池分类失败原因、让当前会话退避并重新排队该链接。
+    enrich(record, write) 附加用户资料后调用 write(record) 写出；缓存中缺少的资料采集完之前记录暂不写出。
     """
     thread_id = f"浏览器实例"
     print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 开始处理链接: {url}")
-    try:
+    capture = getattr(driver, 'capture', None)
+    if capture: capture.reset()
+    with METRICS.stage(STAGE_GET):
         driver.get(url)
-        
-        wait = WebDriverWait(driver, 20)
+    
+    wait = WebDriverWait(driver, 20)
+    with METRICS.stage(STAGE_WAIT):
         wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
+    with METRICS.stage(STAGE_SLEEP):
         time.sleep(random.uniform(2, 3))
 
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        articles = soup.find_all('article', {'data-testid': 'tweet'})
-        
-        source_tweet = None
-        for article in articles:
-            parsed_data = parse_tweet_article(article)
-            if parsed_data and url.endswith(parsed_data['post_url'].replace("https://x.com", "")):
+    source_tweet = quote_count = None
+    if capture:
+        with METRICS.stage(STAGE_CAPTURE):
+            source_tweet = capture.find(url.rstrip('/').split('/')[-1])
+            quote_count = capture.quote_count(url.rstrip('/').split('/')[-1])  # 滚动采集会取走缓冲区，先记下
+    if not source_tweet:
+        with METRICS.stage(STAGE_SOURCE):
+            page_source = driver.page_source
+        with METRICS.stage(STAGE_PARSE):
+            articles = parse_page_articles(page_source)
+        for parsed_data in articles:
+            if url.endswith(parsed_data['post_url'].replace("https://x.com", "")):
                 source_tweet = parsed_data
                 break
-        
-        if not source_tweet:
-            print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [失败] 页面加载后未能找到并解析源帖子 {url}")
-            return
-
-        seen_tweets = {source_tweet['post_url']}
-
-        final_replies = scroll_and_collect(driver, seen_tweets, max_scrolls=3)
-        quotes_url = url.rstrip('/') + "/quotes"
-        all_retweets = []
+    
+    if not source_tweet:
+        raise ScrapeFailure(FAILURE_MISSING_SOURCE, f"页面加载后未能找到并解析源帖子 {url}")
+
+    seen_tweets = {source_tweet['post_url']}
+
+    target = sample_target()
+    final_replies = scroll_and_collect(driver, seen_tweets, max_scrolls=3, target=target)
+    quotes_url = url.rstrip('/') + "/quotes"
+    all_retweets = []
+    if SKIP_EMPTY_QUOTES and (quote_count == 0 if quote_count is not None else source_tweet.get('retweet_count') == 0):
+        METRICS.count(COUNT_QUOTES_SKIPPED)  # 引用数为 0（页面上的转发数包含引用数）时引用页面必然为空
+    else:
         try:
-            driver.get(quotes_url)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
-            all_retweets = scroll_and_collect(driver, seen_tweets, max_scrolls=3)
+            if capture: capture.reset()
+            with METRICS.stage(STAGE_GET):
+                driver.get(quotes_url)
+            with METRICS.stage(STAGE_WAIT):
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
+            all_retweets = scroll_and_collect(driver, seen_tweets, max_scrolls=3, target=target)
         except Exception:
             print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 访问或解析引用推文页面失败: {quotes_url}")
             pass
 
-        if len(final_replies) > REPLY_RETWEET_LIMIT: sampled_replies = random.sample(final_replies, REPLY_RETWEET_LIMIT)
-        else: sampled_replies = final_replies
+    if len(final_replies) > REPLY_RETWEET_LIMIT: sampled_replies = random.sample(final_replies, REPLY_RETWEET_LIMIT)
+    else: sampled_replies = final_replies
 
-        if len(all_retweets) > REPLY_RETWEET_LIMIT: sampled_retweets = random.sample(all_retweets, REPLY_RETWEET_LIMIT)
-        else: sampled_retweets = all_retweets
+    if len(all_retweets) > REPLY_RETWEET_LIMIT: sampled_retweets = random.sample(all_retweets, REPLY_RETWEET_LIMIT)
+    else: sampled_retweets = all_retweets
 
-        source_tweet['replies'] = sampled_replies
-        source_tweet['retweets_with_comment'] = sampled_retweets
-        
-        post_time_str = source_tweet.get('post_time', str(time.time()))
-        filename_time = post_time_str.replace('T', '_').replace(':', '-').split('.')[0]
-        tweet_id = url.split('/')[-1]
-        output_filename = f"{filename_time}_id_{tweet_id}.json"
-        output_path = os.path.join(output_dir, output_filename)
-
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(source_tweet, f, ensure_ascii=False, indent=4)
+    source_tweet['replies'] = sampled_replies
+    source_tweet['retweets_with_comment'] = sampled_retweets
+    
+    post_time_str = source_tweet.get('post_time', str(time.time()))
+    filename_time = post_time_str.replace('T', '_').replace(':', '-').split('.')[0]
+    tweet_id = url.split('/')[-1]
+    record_key = f"{filename_time}_id_{tweet_id}"
+
+    def write(record):
+        with METRICS.stage(STAGE_WRITE):
+            output_path = sink.write(record, record_key)
         print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [成功] {url} 的数据已保存至 {output_path}")
 
-    except Exception as e:
-        print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 处理链接 {url} 时发生严重错误: {e}")
-        
-        # --- 【核心修改】在这里重新加入暂停逻辑 ---
-        wait_time = PAUSE_ON_ERROR_SECONDS
-        if wait_time > 0:
-            print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 遇到严重错误，程序将暂停 {wait_time // 60} 分钟 ({wait_time} 秒) 以应对反爬机制...")
-            for i in range(wait_time, 0, -1):
-                print(f"\r[{time.strftime('%H:%M:%S')}] {thread_id}: 倒计时: {i:03d} 秒...", end="", flush=True)
-                time.sleep(1)
-            print(f"\n[{time.strftime('%H:%M:%S')}] {thread_id}: 暂停结束，将继续处理下一个链接。")
-        # ------------------------------------------
+    if enrich: enrich(source_tweet, write)
+    else: write(source_tweet)
 
-def main():
-    try:
-        with open(TASKS_FILE, 'r', encoding='utf-8') as f:
-            tasks = [line.strip().split(',') for line in f if line.strip() and not line.startswith('#')]
-        if not tasks:
-            print(f"{TASKS_FILE} 为空或格式不正确。")
+def run_tasks(pool, ledger, tasks):
+    """登记 tasks 中的每个任务并用会话池并行搜索和采集
+
+    tasks 为 [关键词, 开始日期, 结束日期, 保存文件夹] 的列表。需要搜索的任务作为生产者，
+    搜索到的链接立即进入同一个采集队列；已有链接列表的任务直接从任务台账续传。
+    GLOBAL_DEDUPE 时，排队前先在全局推文索引中登记，已属于其他任务的帖子只记录引用；
+    登记它的任务最终放弃采集时，帖子转交给本次运行中记录了引用的下一个任务重新排队。
+    """
+    sinks = []
+    url_tasks = {}  # 链接 -> [(关键词, 保存文件夹), ...]（按排队顺序），用于汇总失败
+    referrers = {}  # 推文 ID -> 本次运行中只记录了引用的任务 [(关键词, 保存文件夹, scrape, 候选), ...]
+    progress = {}
+    waiting_searches = []
+    enricher = ProfileEnricher(ProfileCache(PROFILE_CACHE_FILE), PROFILE_BATCH_SIZE) if ENRICH_PROFILES else None
+    index = TweetIndex(TWEET_INDEX_FILE) if GLOBAL_DEDUPE else None
+
+    def fetch_profiles(driver, batch):
+        enricher.fetch_batch(driver, batch, fetch_profile)
+
+    def enrich(record, write):
+        # 命中缓存的资料直接附加；未命中的用户攒满一批后排到采集队列最前面，由空闲会话采集，采集完后再写出等待这些资料的记录
+        for batch in enricher.enrich(record, write):
+            pool.submit(fetch_profiles, batch, priority=float('-inf'))
+
+    def make_scrape(keyword, output_dir, sink):
+        def scrape(driver, url):
+            tweet_id = url.split('/')[-1]
+            if not ledger.claim(output_dir, tweet_id):
+                return  # 已被其他会话领取或已完成
+            # 调用重构后的函数，传入当前会话的driver实例
+            try:
+                process_url_sequentially(driver, url, sink, enrich if enricher else None)
+            except Exception as e:
+                ledger.fail(output_dir, tweet_id, e)
+                raise
+            with pool.lock:
+                progress[keyword] += 1
+                print(f"\n--- 任务 '{keyword}' 进度: 已处理 {progress[keyword]} 个链接 ---\n")
+        scrape.prefetch = tweet_pages  # 多标签页模式下预加载的页面
+        scrape.on_give_up = lambda url, error: give_up(keyword, output_dir, url, error)
+        return scrape
+
+    def give_up(failed_keyword, output_dir, url, error):
+        # 重试次数用完：撤销全局登记；本次运行中有其他任务只记录了引用时，把帖子交给其中第一个任务重新排队，否则它不会出现在任何输出中
+        tweet_id = url.split('/')[-1]
+        ledger.fail(output_dir, tweet_id, error, final=True)
+        if not index:
             return
-    except FileNotFoundError:
-        print(f"未找到任务配置文件 '{TASKS_FILE}'。")
-        with open(TASKS_FILE, 'w', encoding='utf-8') as f:
-            f.write("# 格式: 搜索关键词,开始日期(YYYY-MM-DD),结束日期(YYYY-MM-DD),保存文件夹名称\n")
-            f.write("Trump,2024-05-01,2024-05-02,Trump_May_2024\n")
-            f.write("Biden,2024-05-01,2024-05-02,Biden_May_2024\n")
-        print(f"已为您创建一个示例 '{TASKS_FILE}' 文件。")
-        return
+        index.release(tweet_id, output_dir)  # 其他任务或下次运行可以重新领取
+        with pool.lock:
+            waiting = referrers.get(tweet_id)
+            heir = waiting.pop(0) if waiting else None
+        if heir is None:
+            return
+        keyword, heir_dir, scrape, candidate = heir
+        if index.claim(tweet_id, heir_dir) is not None:
+            return  # 同时运行的另一个进程已经重新登记
+        ledger.reopen(heir_dir, [tweet_id])
+        url_tasks[url].append((keyword, heir_dir))
+        print(f"[{time.strftime('%H:%M:%S')}] 帖子 {url} 在任务 '{failed_keyword}' 中采集失败，转交给同样搜索到它的任务 '{keyword}' 重新采集。")
+        pool.submit(scrape, url, priority=queue_priority(candidate))
+
+    def is_duplicate(keyword, output_dir, scrape, candidate):
+        # 已由其他任务登记的帖子不再采集：记录引用并在本任务台账中标记完成
+        tweet_id = candidate['url'].split('/')[-1]
+        owner = index.claim(tweet_id, output_dir)
+        if owner is None:
+            return False
+        index.reference(output_dir, candidate['url'], owner, keyword=keyword)
+        ledger.complete(output_dir, [tweet_id])
+        with pool.lock:
+            referrers.setdefault(tweet_id, []).append((keyword, output_dir, scrape, candidate))
+        return True
 
-    perform_initial_login()
+    def enqueue(keyword, output_dir, scrape, candidates):
+        # 会话池按优先级领取任务：互动量高的帖子先采集，不受发现顺序和所属任务的影响
+        if index:
+            candidates = [c for c in candidates if not is_duplicate(keyword, output_dir, scrape, c)]
+        for candidate in candidates:
+            url_tasks.setdefault(candidate['url'], []).append((keyword, output_dir))
+            pool.submit(scrape, candidate['url'], priority=queue_priority(candidate))
+
+    def start_next_search():
+        with pool.lock:
+            search_job = waiting_searches.pop(0) if waiting_searches else None
+        if search_job:
+            pool.submit(*search_job, priority=float('-inf'))  # 搜索排在所有链接之前，让新的候选尽早进入队列参与排序
+
+    def make_search(keyword, output_dir, url_list_file, processed_ids, scrape):
+        """返回 submit_window(window)：把任务的一个搜索窗口加入等待队列；所有窗口完成或放弃后保存链接列表"""
+        state = {'found': {}, 'outstanding': 0, 'failed': 0}
+        window_limit = SHARD_LIMIT if SEARCH_SHARD else SEARCH_LIMIT
+
+        def on_found(new_candidates):
+            # 新发现的链接先登记到台账（连同卡片上的互动数据），再立即放入采集队列，不必等待搜索结束；各窗口之间的结果在这里合并去重
+            with pool.lock:
+                fresh = [c for c in new_candidates if c['url'] not in state['found']][:max(0, SEARCH_LIMIT - len(state['found']))]
+                state['found'].update((c['url'], c) for c in fresh)
+            added = set(ledger.add(output_dir, [(c['url'].split('/')[-1], c['url'], candidate_metrics(c)) for c in fresh]))
+            ledger.complete(output_dir, added & processed_ids)
+            enqueue(keyword, output_dir, scrape, [c for c in fresh if c['url'].split('/')[-1] in added - processed_ids])
+
+        def finish_window(failed=False):
+            # 窗口搜索成功或重试次数用完时才让出搜索名额；会话池重新排队的重试仍占用这个名额
+            with pool.lock:
+                state['outstanding'] -= 1
+                state['failed'] += failed
+                finished = state['outstanding'] == 0
+            try:
+                start_next_search()
+            finally:
+                if finished:
+                    save_url_list()
+
+        def save_url_list():
+            # 链接列表文件同时作为“搜索已完成”的标记，中途中断的搜索会在下次运行时重新执行；放弃的窗口不阻止保存已找到的链接
+            target_urls = list(state['found'].values())
+            if target_urls:
+                with open(url_list_file, 'w') as f:
+                    json.dump(target_urls, f, indent=4)
+                print(f"已将 {len(target_urls)} 个搜索到的链接及其互动数据保存至 '{url_list_file}'")
+            else:
+                print(f"任务 '{keyword}' 未能获取任何推文链接。")
+            if state['failed']:
+                print(f"  [警告] 任务 '{keyword}' 有 {state['failed']} 个时间窗口在重试后仍然搜索失败；删除 '{url_list_file}' 后重新运行可以重新搜索。")
+
+        def submit_window(window, front=False):
+            def search(driver, label):
+                found = []
+                if len(state['found']) < SEARCH_LIMIT:
+                    found = search_for_popular_tweets(driver, keyword, window[0], window[1], MIN_RETWEETS, window_limit, on_found=on_found)
+                # 窗口的结果达到上限，说明可能还有更多帖子被截断，细分后继续搜索
+                sub_windows = refine_window(window) if SEARCH_SHARD and len(found) >= window_limit and len(state['found']) < SEARCH_LIMIT else []
+                if sub_windows:
+                    print(f"  [分片] 窗口 {describe_window(window)} 达到上限 {window_limit}，细分为 {len(sub_windows)} 个窗口继续搜索。")
+                    for sub_window in reversed(sub_windows):
+                        submit_window(sub_window, front=True)
+                finish_window()
+            search.on_give_up = lambda label, error: finish_window(failed=True)
+
+            with pool.lock:
+                state['outstanding'] += 1
+                waiting_searches.insert(0 if front else len(waiting_searches), (search, f"{keyword} [{describe_window(window)}]"))
+        return submit_window
 
-    # --- 【重构核心】在所有任务开始前，只初始化一次浏览器 ---
-    driver = None
     try:
-        driver = webdriver.Chrome(options=get_chrome_options())
-        if not load_cookies(driver, COOKIES_FILE):
-            print("无法加载Cookies，程序无法继续执行。")
-            return
-
-        # --- 按顺序执行每个任务 ---
+        # --- 登记每个任务：已有链接列表的任务直接排队采集，需要搜索的任务交给搜索阶段 ---
         for task_index, task in enumerate(tasks):
             if len(task) != 4:
                 print(f"任务 {task_index+1} 格式错误，已跳过: {task}")
                 continue
             
             keyword, start_date, end_date, output_dir = [t.strip() for t in task]
+            try:
+                datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d')
+            except ValueError:
+                print(f"任务 {task_index+1} 的日期不是 YYYY-MM-DD 格式，已跳过: {task}")
+                continue
             print(f"\n{'='*50}")
-            print(f"开始执行任务 {task_index+1}/{len(tasks)}: 关键词='{keyword}', 日期='{start_date}' to '{end_date}', 文件夹='{output_dir}'")
+            print(f"登记任务 {task_index+1}/{len(tasks)}: 关键词='{keyword}', 日期='{start_date}' to '{end_date}', 文件夹='{output_dir}'")
             print(f"{'='*50}\n")
 
             os.makedirs(output_dir, exist_ok=True)
             url_list_file = os.path.join(output_dir, 'urls_to_process.json')
+            # 记录真正落盘后才在台账中标记完成（JSONL/Parquet 为缓冲写入）
+            sink = open_sink(output_dir, OUTPUT_FORMAT, on_durable=lambda keys, task_name=output_dir: ledger.complete(task_name, [key.rsplit('_id_', 1)[-1] for key in keys]),
+                             background=WRITE_QUEUE_SIZE)
+            sinks.append(sink)
+            progress[keyword] = 0
+            scrape = make_scrape(keyword, output_dir, sink)
+
+            # 从旧版迁移：只在首次登记时扫描一次已有输出（键为 {时间}_id_{推文ID}）
+            processed_ids = set()
+            if not ledger.has_task(output_dir):
+                for record_key in sink.completed_keys():
+                    match = re.search(r'_id_(\d+)$', record_key)
+                    if match:
+                        processed_ids.add(match.group(1))
 
-            # --- 搜索或加载URL列表（这部分逻辑不变，但使用同一个driver）---
-            target_urls = []
             if os.path.exists(url_list_file):
-                print(f"找到任务 '{keyword}' 的链接列表文件，将从中加载链接。")
-                with open(url_list_file, 'r') as f:
-                    target_urls = json.load(f)
+                if not ledger.has_task(output_dir):
+                    print(f"找到任务 '{keyword}' 的链接列表文件，将从中加载链接。")
+                    with open(url_list_file, 'r') as f:
+                        target_urls = load_candidates(json.load(f))
+                    if not target_urls:
+                        print(f"任务 '{keyword}' 未能获取任何推文链接，跳过此任务。")
+                        continue
+                    ledger.add(output_dir, [(c['url'].split('/')[-1], c['url'], candidate_metrics(c)) for c in target_urls])
+                    ledger.complete(output_dir, processed_ids)
             else:
-                print("未找到此任务的链接列表文件，将执行新的搜索...")
-                # 注意：这里复用了主driver，而不是创建一个新的
-                target_urls = search_for_popular_tweets(driver, keyword, start_date, end_date, MIN_RETWEETS, SEARCH_LIMIT)
-                
-                if target_urls:
-                    with open(url_list_file, 'w') as f:
-                        json.dump(target_urls, f, indent=4)
-                    print(f"已将 {len(target_urls)} 个搜索到的链接保存至 '{url_list_file}'")
-
-            if not target_urls:
-                print(f"任务 '{keyword}' 未能获取任何推文链接，跳过此任务。")
-                continue
-                
-            # --- 检查已完成的任务 ---
-            processed_ids = set()
-            for filename in os.listdir(output_dir):
-                match = re.search(r'_id_(\d+).json$', filename)
-                if match:
-                    processed_ids.add(match.group(1))
-            
-            pending_urls = [url for url in target_urls if url.split('/')[-1] not in processed_ids]
-            
-            if not pending_urls:
-                print(f"任务 '{keyword}' 的所有链接均已处理完毕！")
-                continue
-
-            print(f"\n任务 '{keyword}': 总链接数: {len(target_urls)} | 已完成: {len(processed_ids)} | 待处理: {len(pending_urls)}")
-            
-            # --- 【重构核心】使用简单的for循环顺序处理，代替线程池 ---
-            processed_count = 0
-            total_pending = len(pending_urls)
-            for url in pending_urls:
-                # 调用重构后的函数，传入共享的driver实例
-                process_url_sequentially(driver, url, output_dir)
-                processed_count += 1
-                print(f"\n--- 任务 '{keyword}' 进度: {processed_count}/{total_pending} 个待办链接已处理完毕 ---\n")
+                windows = split_date_range(start_date, end_date, SEARCH_SHARD) if SEARCH_SHARD else [(start_date, end_date)]
+                print(f"未找到此任务的链接列表文件，将执行新的搜索（{len(windows)} 个时间窗口），搜索到的链接会立即开始采集...")
+                submit_window = make_search(keyword, output_dir, url_list_file, processed_ids, scrape)
+                for window in windows:
+                    submit_window(window)
+
+            # --- 检查已完成的任务：台账中上次中断或放弃的链接重新排队 ---
+            ledger.requeue(output_dir)
+            pending = [dict(payload or {}, url=url) for _, url, payload in ledger.pending(output_dir)]
+            counts = ledger.counts(output_dir)
+            print(f"任务 '{keyword}': 已登记链接数: {sum(counts.values())} | 已完成: {counts.get('done', 0)} | 待处理: {len(pending)}")
+            enqueue(keyword, output_dir, scrape, pending)
+
+        # --- 【重构核心】搜索作为生产者与采集并行：最多 SEARCH_CONCURRENCY 个会话同时搜索，其余会话采集已发现的链接 ---
+        for _ in range(min(SEARCH_CONCURRENCY, len(waiting_searches))):
+            start_next_search()
+        if pool.queue.empty():
+            print("\n所有任务的链接均已处理完毕！")
+            return
+        print(f"\n将使用 {pool.size} 个浏览器会话并行搜索和采集...")
+        pool.run()
+        if enricher:
+            leftovers = enricher.drain()
+            if leftovers:
+                print(f"\n采集剩余 {sum(len(batch) for batch in leftovers)} 个缓存中没有的用户资料...")
+                pool.run(leftovers, fetch_profiles)
+            unfinished = enricher.flush()
+            if unfinished:
+                print(f"有 {unfinished} 条记录所需的用户资料未能采集，已按缺少资料写出。")
+            print(f"用户资料: 缓存命中 {enricher.cache.hits} 次 / 未命中 {enricher.cache.misses} 次 | 本次采集 {enricher.fetched} 个用户，失败 {enricher.failed} 个")
+        if index:
+            index.report()
+        SCROLL_STATS.report()
+        METRICS.report('搜索与采集')
+
+        if pool.failures:
+            print(f"有 {len(pool.failures)} 个任务在重试后仍然失败:")
+            for failure in pool.failures:
+                if failure['item'] in url_tasks:
+                    keyword, _ = url_tasks[failure['item']].pop(0)  # 台账和全局索引已在放弃时 (give_up) 更新
+                    print(f"  [{failure['kind']}] 任务 '{keyword}': {failure['item']} (失败 {failure['attempts']} 次): {failure['error']}")
+                elif isinstance(failure['item'], tuple):
+                    print(f"  [{failure['kind']}] 用户资料批次 {', '.join(failure['item'])} (失败 {failure['attempts']} 次): {failure['error']}")
+                else:
+                    print(f"  [{failure['kind']}] 搜索 '{failure['item']}' (失败 {failure['attempts']} 次): {failure['error']}")
 
         print("\n所有任务均已处理完毕。")
+    finally:
+        for sink in sinks:
+            sink.close()
+        if enricher:
+            enricher.cache.close()
+        if index:
+            index.close()
+
+def main():
+    try:
+        with open(TASKS_FILE, 'r', encoding='utf-8') as f:
+            tasks = [line.strip().split(',') for line in f if line.strip() and not line.startswith('#')]
+        if not tasks:
+            print(f"{TASKS_FILE} 为空或格式不正确。")
+            return
+    except FileNotFoundError:
+        print(f"未找到任务配置文件 '{TASKS_FILE}'。")
+        with open(TASKS_FILE, 'w', encoding='utf-8') as f:
+            f.write("# 格式: 搜索关键词,开始日期(YYYY-MM-DD),结束日期(YYYY-MM-DD),保存文件夹名称\n")
+            f.write("Trump,2024-05-01,2024-05-02,Trump_May_2024\n")
+            f.write("Biden,2024-05-01,2024-05-02,Biden_May_2024\n")
+        print(f"已为您创建一个示例 '{TASKS_FILE}' 文件。")
+        return
 
+    sessions = SessionManager(ACCOUNT_COOKIE_FILES or [COOKIES_FILE], options_factory=get_chrome_options)
+    if not sessions.ensure_logged_in():
+        print("无法加载Cookies，程序无法继续执行。")
+        return
+
+    # --- 【重构核心】所有任务共用一个浏览器会话池，会话跨链接、跨任务复用 ---
+    pool = BrowserPool(lambda: create_logged_in_driver(sessions), size=MAX_WORKERS, pages_per_session=PAGES_PER_SESSION,
+                       backoff=BackoffPolicy(rate_limit_delay=PAUSE_ON_ERROR_SECONDS), on_logged_out=sessions.logged_out)
+    ledger = JobLedger(LEDGER_FILE)
+    global PARSER
+    PARSER = ParsePool(PARSE_PROCESSES) if PARSE_PROCESSES else None
+    try:
+        run_tasks(pool, ledger, tasks)
     except Exception as e:
         print(f"程序在执行过程中遇到未处理的严重错误: {e}")
     finally:
-        # --- 【重构核心】在程序完全结束时，关闭浏览器 ---
-        if driver:
-            print("所有任务完成，正在关闭浏览器...")
-            driver.quit()
+        # --- 【重构核心】在程序完全结束时，关闭会话池中的所有浏览器 ---
+        print(f"所有任务完成，正在关闭浏览器... (共启动过 {pool.sessions_started} 个浏览器会话)")
+        sessions.report()
+        pool.close()
+        if PARSER: PARSER.close()
+        ledger.close()
+        METRICS.close()
 
 if __name__ == "__main__":
     main()
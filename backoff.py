@@ -0,0 +1,87 @@
+# 失败分类与退避策略：只让出错的浏览器会话退避，失败的链接在重试预算内重新排队
+import random
+
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException, TimeoutException
+
+# --- 失败类型 ---
+FAILURE_TIMEOUT = 'timeout'  # 等待 article[data-testid='tweet'] 超时
+FAILURE_MISSING_SOURCE = 'missing_source'  # 页面已加载但找不到源帖子（通常是帖子已删除或不可见）
+FAILURE_CRASH = 'crash'  # 浏览器崩溃或会话失效
+FAILURE_RATE_LIMIT = 'rate_limit'  # 疑似触发了平台的频率限制
+FAILURE_LOGGED_OUT = 'logged_out'  # 登录已失效，页面跳转到登录页或显示登录按钮
+FAILURE_ERROR = 'error'  # 其他未分类的错误
+
+CRASH_MARKERS = ('chrome not reachable', 'invalid session id', 'session deleted', 'disconnected', 'target window already closed', 'connection refused', 'no such window')
+LOGGED_OUT_URL_MARKERS = ('/i/flow/login', 'x.com/login', 'twitter.com/login', '/account/access')
+LOGGED_OUT_MARKERS = ('data-testid="loginButton"',)
+RATE_LIMIT_MARKERS = ('Rate limit exceeded', 'Something went wrong. Try reloading.', '出错了。请尝试重新加载。', '请稍后再试')
+
+class ScrapeFailure(Exception):
+    """采集函数主动报告的失败，kind 为上面的失败类型之一"""
+
+    def __init__(self, kind, message=''):
+        super().__init__(message or kind)
+        self.kind = kind
+
+def classify_failure(error, driver=None):
+    """根据异常和当前页面内容判断失败类型"""
+    if isinstance(error, ScrapeFailure):
+        return error.kind
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return FAILURE_CRASH
+    message = str(error).lower()
+    if any(marker in message for marker in CRASH_MARKERS):
+        return FAILURE_CRASH
+    if driver is not None:
+        try:
+            current_url = driver.current_url
+            page_source = driver.page_source
+        except Exception:
+            return FAILURE_CRASH
+        if any(marker in current_url for marker in LOGGED_OUT_URL_MARKERS) or any(marker in page_source for marker in LOGGED_OUT_MARKERS):
+            return FAILURE_LOGGED_OUT
+        if any(marker in page_source for marker in RATE_LIMIT_MARKERS):
+            return FAILURE_RATE_LIMIT
+    if isinstance(error, TimeoutException):
+        return FAILURE_TIMEOUT
+    return FAILURE_ERROR
+
+class BackoffPolicy:
+    """按失败类型决定重试次数和会话退避时间（指数增长 + 随机抖动）
+
+    base_delays / retry_budgets 以失败类型为键；连续失败次数越多，退避时间越长，最长 max_delay 秒。
+    """
+
+    def __init__(self, rate_limit_delay=241, max_delay=1800, jitter=0.5, base_delays=None, retry_budgets=None):
+        self.base_delays = {
+            FAILURE_TIMEOUT: 20,
+            FAILURE_MISSING_SOURCE: 0,
+            FAILURE_CRASH: 5,
+            FAILURE_RATE_LIMIT: rate_limit_delay,
+            FAILURE_LOGGED_OUT: 0,
+            FAILURE_ERROR: 30,
+        }
+        self.base_delays.update(base_delays or {})
+        self.retry_budgets = {
+            FAILURE_TIMEOUT: 2,
+            FAILURE_MISSING_SOURCE: 1,
+            FAILURE_CRASH: 2,
+            FAILURE_RATE_LIMIT: 3,
+            FAILURE_LOGGED_OUT: 2,
+            FAILURE_ERROR: 1,
+        }
+        self.retry_budgets.update(retry_budgets or {})
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def should_retry(self, kind, attempts):
+        """attempts 为该链接已经失败的次数"""
+        return attempts <= self.retry_budgets.get(kind, 0)
+
+    def delay(self, kind, consecutive_failures):
+        """会话在连续第 consecutive_failures 次失败后应暂停的秒数"""
+        base = self.base_delays.get(kind, self.base_delays[FAILURE_ERROR])
+        if base <= 0:
+            return 0
+        delay = min(self.max_delay, base * 2 ** max(0, consecutive_failures - 1))
+        return random.uniform(delay * (1 - self.jitter), delay)
@@ -0,0 +1,1494 @@
+# 离线性能基准: python benchmark.py [基准名称 ...]
+# 使用 fake_driver 中的伪 WebDriver 和 fixture 页面，不需要登录 X，也不会启动浏览器
+import glob
+import importlib.util
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import re
+import shutil
+import signal
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from fnmatch import fnmatchcase
+from datetime import datetime, timedelta
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+import adaptive_wait
+import article_collector
+import instrumentation
+import lean_browser
+import tweet_parser
+import tweet_index
+from backoff import FAILURE_CRASH, FAILURE_LOGGED_OUT, FAILURE_RATE_LIMIT, FAILURE_TIMEOUT, BackoffPolicy, ScrapeFailure
+from browser_pool import BrowserPool, current_slot
+from job_ledger import JobLedger
+from profile_cache import ProfileCache, ProfileEnricher, normalize_user_id
+from session_manager import SessionManager, load_cookies
+from tab_session import TabDriver, tweet_pages
+from pipeline import ParsePool
+from tweet_index import TweetIndex
+from tweet_model import to_json
+import network_capture
+import output_sink
+from output_sink import iter_records, open_sink
+from fake_driver import (FakeDriver, FakePage, build_article_corpus, build_article_html, build_cascade_site, build_profile_site, build_recorded_tweet_detail, cascade_child_ids, profile_page_factory, build_search_site, build_thread_articles,
+                         build_thread_results, build_tweet_site, load_golden)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_RESULTS_FILE = 'benchmark_results.json'  # suite 基准每次运行的结果，下次运行时与之比较
+REGRESSION_TOLERANCE = 0.2  # 吞吐量下降或内存峰值增长超过这个比例时标记为退化
+instrumentation.METRICS.log_file = None  # 离线基准不在当前目录写 metrics.jsonl（instrumentation 基准会写到临时目录）
+
+def load_script(filename):
+    """按文件路径导入脚本（脚本文件名中带有 '.'，无法直接 import）"""
+    module_name = os.path.splitext(filename)[0].replace('.', '_')
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+class ScaledTime:
+    """替换脚本模块中的 time：time.sleep 按比例缩短，其余函数不变，使随机等待不会拖慢离线基准"""
+
+    def __init__(self, scale):
+        self.scale = scale
+
+    def sleep(self, seconds):
+        time.sleep(seconds * self.scale)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+def bench_incremental_collect(scrolls=30, batch_size=20):
+    """对比每次滚动的解析耗时：全页重新解析 vs 增量解析新推文"""
+    url = 'https://x.com/fixture_user/status/1'
+    modes = [('全页解析', article_collector.collect_page_articles), ('增量解析', article_collector.collect_new_articles)]
+    timings = {}
+    for mode_name, collect in modes:
+        driver = FakeDriver({url: FakePage(build_thread_articles(scrolls * batch_size), batch_size=batch_size)})
+        driver.get(url)
+        seen_tweets = set()
+        timings[mode_name] = []
+        for _ in range(scrolls):
+            start = time.perf_counter()
+            new_tweets = collect(driver, seen_tweets)
+            timings[mode_name].append((time.perf_counter() - start, len(new_tweets)))
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+    print(f"{'滚动':>4} | {'已加载':>6} | {'全页解析(ms)':>12} | {'增量解析(ms)':>12} | 新推文")
+    for i in range(scrolls):
+        full_seconds, _ = timings['全页解析'][i]
+        incremental_seconds, new_count = timings['增量解析'][i]
+        print(f"{i + 1:>4} | {(i + 1) * batch_size:>6} | {full_seconds * 1000:>12.2f} | {incremental_seconds * 1000:>12.2f} | {new_count}")
+    for mode_name, rows in timings.items():
+        print(f"{mode_name}: 总耗时 {sum(seconds for seconds, _ in rows) * 1000:.1f} ms, 共 {sum(count for _, count in rows)} 条")
+
+def bench_parser_backends(rounds=20):
+    """校验各解析后端的输出与原实现保存的参照输出（fixtures/parser_golden.json）逐字节一致，并报告每秒解析的推文数"""
+    cases = load_golden('parser_golden')
+    corpus = [case['html'] for case in cases]
+    variants = [
+        ('autotwi', lambda article, backend: tweet_parser.parse_tweet_article(article, backend=backend)),
+        ('retweet', lambda article, backend: tweet_parser.parse_tweet_article(article, last_time=True, backend=backend)),
+        ('profile', lambda article, backend: tweet_parser.parse_profile_tweet(article, backend=backend)),
+    ]
+    page_html = '<html><body>' + ''.join(corpus) + '</body></html>'
+    expected_page = json.dumps([case['autotwi'] for case in cases if case['autotwi']], ensure_ascii=False)
+    print(f"fixture 数量: {len(corpus)} | 当前默认后端: {tweet_parser.PARSER_BACKEND}")
+    failures = {}
+    for backend in tweet_parser.available_backends():
+        mismatches = 0
+        for variant, parse in variants:
+            for case in cases:
+                if json.dumps(parse(case['html'], backend), ensure_ascii=False, default=to_json) != json.dumps(case[variant], ensure_ascii=False):
+                    mismatches += 1
+        if json.dumps(tweet_parser.parse_page_articles(page_html, backend=backend), ensure_ascii=False, default=to_json) != expected_page:
+            mismatches += 1
+
+        parse = variants[0][1]
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for article_html in corpus:
+                parse(article_html, backend)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:>10}: {rounds * len(corpus) / elapsed:>9.0f} 条/秒 | 与原实现不一致: {mismatches}")
+        if mismatches:
+            failures[backend] = mismatches
+    assert not failures, f"解析结果与原实现不一致: {failures}"
+
+def bench_browser_pool(url_count=24, startup_seconds=0.3, navigation_seconds=0.02, sleep_scale=0.002):
+    """会话池处理一批帖子链接：对比每个链接启动一个浏览器与长期复用会话的耗时，并模拟一次浏览器崩溃"""
+    autotwi = load_script('autotwi_V2.0.py')
+    # 本基准只比较会话的创建与复用，滚动等待统一使用按比例缩短的固定等待
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    pages, urls = build_tweet_site(url_count)
+    crash_url = urls[url_count // 2]
+
+    def driver_factory():
+        time.sleep(startup_seconds)  # 模拟 Chrome 启动 + load_cookies 的开销
+        return FakeDriver(pages, latency=navigation_seconds, crash_urls=[crash_url])
+
+    print(f"{'模式':<14} | {'耗时(s)':>7} | {'启动浏览器':>8} | {'输出文件':>6}")
+    for mode_name, size, pages_per_session in [('每链接一个浏览器', 1, 1), ('会话池 x1', 1, 50), ('会话池 x4', 4, 50), ('会话池 x4 K=5', 4, 5)]:
+        with tempfile.TemporaryDirectory() as output_dir:
+            pool = BrowserPool(driver_factory, size=size, pages_per_session=pages_per_session, backoff=BackoffPolicy(base_delays={FAILURE_CRASH: 0}))
+            sink = open_sink(output_dir)
+            start = time.perf_counter()
+            pool.run(urls, lambda driver, url: autotwi.process_url_sequentially(driver, url, sink))
+            elapsed = time.perf_counter() - start
+            pool.close()
+            sink.close()
+            print(f"{mode_name:<14} | {elapsed:>7.2f} | {pool.sessions_started:>8} | {len(os.listdir(output_dir)):>6}")
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+    # 回调出错：页面掉线时 on_logged_out 抛出异常，重试用完后 on_give_up 也抛出异常，run() 仍要处理完其余链接并返回
+    logged_out_url = urls[1]
+
+    def handler(driver, url):
+        if url == logged_out_url:
+            raise ScrapeFailure(FAILURE_LOGGED_OUT)
+        return url
+
+    def failing_callback(*args):
+        raise RuntimeError("回调故障")
+    handler.on_give_up = failing_callback
+    pool = BrowserPool(lambda: FakeDriver(pages), size=2, pages_per_session=None, on_logged_out=failing_callback)
+    finished = []
+    runner = threading.Thread(target=lambda: finished.append(pool.run(urls, handler)), daemon=True)
+    runner.start()
+    runner.join(30)
+    pool.close()
+    assert finished, "回调出错后 run() 没有返回"
+    assert len(finished[0]) == url_count - 1 and len(pool.failures) == 1, (len(finished[0]), pool.failures)
+    print(f"回调出错: run() 正常返回，完成 {len(finished[0])}/{url_count}，放弃 {len(pool.failures)} 个")
+
+def bench_retweet_sessions(url_count=24, workers=2, startup_seconds=0.3, navigation_seconds=0.02, sleep_scale=0.002):
+    """二次采集脚本：每个任务启动一个浏览器 vs 每个工作线程复用一个会话，按单个链接的平均耗时对比（其中一个链接会让浏览器崩溃）"""
+    retweet = load_script('trueauto_retweet_V1.2.py')
+    retweet.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    pages, urls = build_tweet_site(url_count)
+    tasks = [{"source_filename": f"source_{i}", "url_to_scrape": url} for i, url in enumerate(urls)]
+    crash_url = urls[url_count // 2]
+
+    print(f"{'模式':<16} | {'耗时(s)':>7} | {'每链接(ms)':>9} | {'启动浏览器':>8} | 输出")
+    for mode_name, startup, pages_per_session in [('每任务一个浏览器', startup_seconds, 1), ('复用会话', startup_seconds, None), ('仅导航（下限）', 0.0, None)]:
+        def driver_factory():
+            time.sleep(startup)  # 模拟 Chrome 启动 + 打开 x.com + load_cookies 的开销
+            return FakeDriver(pages, latency=navigation_seconds, crash_urls=[crash_url])
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            pool = BrowserPool(driver_factory, size=workers, pages_per_session=pages_per_session, backoff=BackoffPolicy(base_delays={FAILURE_CRASH: 0}))
+            sink = open_sink(output_dir)
+            start = time.perf_counter()
+            pool.run(tasks, lambda driver, task: retweet.process_url(driver, task, sink))
+            elapsed = time.perf_counter() - start
+            pool.close()
+            sink.close()
+            print(f"{mode_name:<16} | {elapsed:>7.2f} | {elapsed * workers / url_count * 1000:>9.1f} | {pool.sessions_started:>8} | {len(os.listdir(output_dir))}")
+    retweet.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_user_batch(user_count=30, workers=3, pace=(5, 12), startup_seconds=0.3, navigation_seconds=0.05, sleep_scale=0.01):
+    """用户资料批量采集：单会话 + 全局等待 vs 会话池 + 每会话各自限速；随后模拟中断续传、出错用户重试和 TTL 过期"""
+    user = load_script('user_autotwi.py')
+    saved = (user.USERS_FILE, user.OUTPUT_DIR, user.COOKIES_FILE, user.LEDGER_FILE, user.MAX_WORKERS, user.PACE_SECONDS, user.USER_TTL_DAYS, user.create_logged_in_driver)
+    user.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    pages, user_ids = build_profile_site(user_count)
+    crash_urls = [f"https://x.com/{user_ids[user_count // 2]}"]
+
+    def driver_factory(sessions=None):
+        time.sleep(startup_seconds)
+        return FakeDriver(pages, latency=navigation_seconds, crash_urls=crash_urls)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        user.USERS_FILE, user.COOKIES_FILE = os.path.join(work_dir, 'users.txt'), os.path.join(work_dir, 'x_cookies.json')
+        with open(user.USERS_FILE, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(user_ids) + '\n')
+        with open(user.COOKIES_FILE, 'w') as f:
+            json.dump([], f)
+        user.create_logged_in_driver = driver_factory
+        user.PACE_SECONDS = (pace[0] * sleep_scale, pace[1] * sleep_scale)  # 每会话限速同样按比例缩短
+
+        def run(label, output_dir, size, ttl_days=None):
+            user.OUTPUT_DIR, user.LEDGER_FILE, user.MAX_WORKERS, user.USER_TTL_DAYS = output_dir, os.path.join(output_dir + '.sqlite3'), size, ttl_days
+            start = time.perf_counter()
+            user.main()
+            elapsed = time.perf_counter() - start
+            files = os.listdir(output_dir)
+            rows.append((label, elapsed, sum(not f.endswith('_error.json') for f in files), sum(f.endswith('_error.json') for f in files)))
+
+        run('单会话 + 全局等待', os.path.join(work_dir, 'serial'), 1)
+        run(f'会话池 x{workers}', os.path.join(work_dir, 'pool'), workers)
+        crash_urls.clear()
+        run('重新运行（重试出错用户）', os.path.join(work_dir, 'pool'), workers)
+        run('重新运行（TTL 未过期）', os.path.join(work_dir, 'pool'), workers, ttl_days=30)
+        run('重新运行（TTL = 0）', os.path.join(work_dir, 'pool'), workers, ttl_days=0)
+
+        # 从旧版迁移（还没有任务台账）：一半的用户文件写于 40 天前，TTL 30 天时只重新采集这些用户
+        migrated_dir = os.path.join(work_dir, 'migrated')
+        shutil.copytree(os.path.join(work_dir, 'serial'), migrated_dir)
+        profile_files = sorted(f for f in os.listdir(migrated_dir) if not f.endswith('_error.json'))
+        stale_at = time.time() - 40 * 86400
+        for filename in profile_files[::2]:
+            os.utime(os.path.join(migrated_dir, filename), (stale_at, stale_at))
+        mtimes = {filename: os.path.getmtime(os.path.join(migrated_dir, filename)) for filename in profile_files}
+        run('从旧版迁移（半数已过期）', migrated_dir, workers, ttl_days=30)
+        refreshed = [filename for filename in profile_files if os.path.getmtime(os.path.join(migrated_dir, filename)) != mtimes[filename]]
+        assert refreshed == profile_files[::2], f"迁移后重新采集了 {len(refreshed)} 个用户，应为已过期的 {len(profile_files[::2])} 个"
+
+    print(f"\n用户数: {user_count} | 会话限速: {pace[0]}~{pace[1]} 秒 (按 {sleep_scale} 缩放) | 其中一个用户的主页会让浏览器崩溃")
+    print(f"{'运行':<16} | {'耗时(s)':>7} | {'用户文件':>6} | _error.json")
+    for label, elapsed, ok, errors in rows:
+        print(f"{label:<16} | {elapsed:>7.2f} | {ok:>6} | {errors}")
+    print(f"从旧版迁移: {len(profile_files)} 个已有用户文件中 {len(profile_files[::2])} 个写于 40 天前，按 TTL 30 天重新采集了 {len(refreshed)} 个")
+    (user.USERS_FILE, user.OUTPUT_DIR, user.COOKIES_FILE, user.LEDGER_FILE, user.MAX_WORKERS, user.PACE_SECONDS, user.USER_TTL_DAYS, user.create_logged_in_driver) = saved
+    user.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_profile_cache(url_count=12, workers=3, entries=20000, max_entries=5000, sleep_scale=0.002):
+    """用户资料缓存：LRU 容量上限与读写速度；资料附加阶段冷/热缓存下访问的用户主页数量与附加率"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = ProfileCache(os.path.join(work_dir, 'lru.sqlite3'), max_entries=max_entries)
+        start = time.perf_counter()
+        for i in range(entries):
+            cache.put(f"user_{i}", {"followers_count": i, "bio": "x" * 80})
+            if i % 10 == 0:
+                cache.get('user_0')  # 经常使用的用户不会被淘汰
+        put_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        found = cache.get_many(f"user_{i}" for i in range(entries))
+        get_seconds = time.perf_counter() - start
+        kept = cache.connection().execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+        cache.close()
+        print(f"写入 {entries} 条: {entries / put_seconds:.0f} 条/秒 | 批量读取: {entries / get_seconds:.0f} 条/秒 | 容量上限 {max_entries}: 保留 {kept} 条 | "
+              f"常用用户仍在缓存中: {'user_0' in found} | 最早写入的用户已淘汰: {'user_1' not in found}")
+
+        autotwi = load_script('autotwi_V2.0.py')
+        user_module = sys.modules['user_autotwi']
+        autotwi.time = adaptive_wait.time = user_module.time = ScaledTime(sleep_scale)
+        adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+        pages, urls = build_tweet_site(url_count)
+        cache = ProfileCache(os.path.join(work_dir, 'profiles.sqlite3'))
+        print(f"{'运行':<12} | {'耗时(s)':>7} | {'主页访问':>6} | {'附加资料的推文':>12}")
+        for label, enabled in [('不附加', False), ('冷缓存(首个任务)', True), ('热缓存(后续任务)', True)]:
+            enricher = ProfileEnricher(cache, batch_size=10)
+            drivers = []
+
+            def driver_factory():
+                drivers.append(FakeDriver(pages, page_factory=profile_page_factory))
+                return drivers[-1]
+
+            def fetch_profiles(driver, batch):
+                enricher.fetch_batch(driver, batch, user_module.fetch_profile)
+
+            def enrich(record, write):
+                for batch in enricher.enrich(record, write):
+                    pool.submit(fetch_profiles, batch, priority=float('-inf'))
+
+            with tempfile.TemporaryDirectory() as output_dir:
+                sink = open_sink(output_dir, 'jsonl')
+                pool = BrowserPool(driver_factory, size=workers)
+                start = time.perf_counter()
+                pool.run(urls, lambda driver, url: autotwi.process_url_sequentially(driver, url, sink, enrich if enabled else None))
+                pool.run(enricher.drain(), fetch_profiles)
+                enricher.flush()
+                elapsed = time.perf_counter() - start
+                pool.close()
+                sink.close()
+                tweets = [tweet for _, record in iter_records(output_dir) for tweet in [record] + record['replies'] + record['retweets_with_comment']]
+            visits = sum(1 for driver in drivers for url in driver.visited if '/status/' not in url)
+            attached = sum(1 for tweet in tweets if tweet.get('profile'))
+            if enabled:  # 记录等资料采集完才写出：采集到资料的用户，其推文都带有资料
+                missing = set(cache.missing([tweet['user_id'] for tweet in tweets]))
+                assert attached == sum(1 for tweet in tweets if normalize_user_id(tweet['user_id']) not in missing) > 0, (label, attached)
+            print(f"{label:<12} | {elapsed:>7.2f} | {visits:>6} | {attached:>5} / {len(tweets)} ({attached / len(tweets):.0%})")
+        cache.close()
+    autotwi.time = adaptive_wait.time = user_module.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_user_timeline(tweet_count=3000, target=2000, window=40, batch_size=20, sleep_scale=0.0005):
+    """用户主页时间线（虚拟列表只保留最近 window 条）：旧版滚动3次后解析整页 vs 边滚动边采集；对比采集数量、截止日期和内存峰值"""
+    user = load_script('user_autotwi.py')
+    user.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    pages, (user_id,) = build_profile_site(1, tweets_per_user=tweet_count, batch_size=batch_size, window=window)
+    url = f"https://x.com/{user_id}"
+
+    def legacy(driver):
+        for _ in range(3):
+            adaptive_wait.scroll_and_wait(driver, (2, 3), 'profile')
+        return tweet_parser.parse_page_articles(driver.page_source, profile=True, limit=target)
+
+    print(f"时间线: {tweet_count} 条 (每小时一条) | 目标: {target} 条 | DOM 中最多保留 {window} 条")
+    print(f"{'模式':<20} | {'采集':>5} | {'重复':>4} | {'耗时(s)':>7} | {'内存峰值(KB)':>11}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        sink = open_sink(output_dir, 'jsonl', name='timeline')
+        collected = []
+        cases = [
+            ('旧版: 滚动3次后解析', lambda driver: legacy(driver)),
+            ('流式采集 -> 列表', lambda driver: user.stream_timeline(driver, collected.append, target) and collected),
+            ('流式采集 -> JSONL', lambda driver: user.stream_timeline(driver, lambda tweet: sink.write(tweet, tweet['post_url']), target)),
+            ('流式采集 截止 05-20', lambda driver: user.stream_timeline(driver, collected.append, target, since='2024-05-20') and collected),
+        ]
+        for mode_name, run in cases:
+            collected.clear()
+            driver = FakeDriver(pages)
+            driver.get(url)
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = run(driver)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if isinstance(result, int):
+                sink.flush()
+                urls = [key for key, _ in output_sink._iter_jsonl(sink.current_path())]
+            else:
+                urls = [tweet['post_url'] for tweet in result]
+            print(f"{mode_name:<20} | {len(urls):>5} | {len(urls) - len(set(urls)):>4} | {elapsed:>7.2f} | {peak / 1024:>11.0f}")
+            if '截止' in mode_name:
+                print(f"  最早的帖子: {min(tweet['post_time'] for tweet in result)} | 预期条数: {(datetime(2024, 6, 1) - datetime(2024, 5, 20)) // timedelta(hours=1) + 1}")
+        sink.close()
+    user.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_adaptive_wait(scrolls=4, scroll_latency=0.3):
+    """对比固定随机等待与自适应等待下 scroll_and_collect 的实际耗时（新推文在 scroll_latency 秒后出现）"""
+    autotwi = load_script('autotwi_V2.0.py')
+    url = 'https://x.com/fixture_user/status/1'
+    pages = {url: FakePage(build_thread_articles(scrolls * 10 + 10), batch_size=10)}
+    for adaptive in (False, True):
+        adaptive_wait.ADAPTIVE_SCROLL_WAIT = adaptive
+        adaptive_wait.SCROLL_STATS.reset()
+        driver = FakeDriver(pages, scroll_latency=scroll_latency)
+        driver.get(url)
+        start = time.perf_counter()
+        collected = autotwi.scroll_and_collect(driver, set(), max_scrolls=scrolls)
+        print(f"{'自适应等待' if adaptive else '固定随机等待'}: {scrolls} 次滚动耗时 {time.perf_counter() - start:.2f}s，采集 {len(collected)} 条")
+        adaptive_wait.SCROLL_STATS.report()
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_output_sink(record_count=5000):
+    """对比三种输出格式写入 record_count 条带回复/引用的记录的耗时、文件数，以及断点续传扫描和第二阶段读取的耗时"""
+    corpus = build_article_corpus()
+    source = tweet_parser.parse_tweet_article(corpus[0])
+    children = [tweet_parser.parse_tweet_article(article_html) for article_html in corpus[1:21]]
+    formats = ['json', 'jsonl'] + (['parquet'] if output_sink.pa is not None else [])
+    late_from = record_count // 2
+    print(f"{'格式':<8} | {'写入(s)':>7} | {'文件数':>6} | {'续传扫描(s)':>10} | {'读取全部(s)':>10}")
+    for output_format in formats:
+        with tempfile.TemporaryDirectory() as output_dir:
+            sink = open_sink(output_dir, output_format)
+            start = time.perf_counter()
+            for i in range(record_count):
+                record = dict(source, post_url=f"https://x.com/fixture_user/status/{i}", replies=children, retweets_with_comment=children[:10])
+                if i >= late_from:
+                    # 后半部分才出现的附加字段（用户资料、级联信息、未声明的字段），第一批数据中没有
+                    record.update(profile={"user_id": "fixture_user", "followers_count": i}, cascade={"parent": None, "root": str(i), "depth": 0}, note=f"late {i}")
+                sink.write(record, f"2024-05-01_12-00-00_id_{i}")
+            sink.close()
+            write_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            completed = open_sink(output_dir, output_format).completed_keys()
+            scan_seconds = time.perf_counter() - start
+            assert len(completed) == record_count
+            read_cell = '-'
+            if output_format == 'parquet':
+                # 后来才出现的字段没有因为第一批数据决定 schema 而丢失
+                parts = sorted(glob.glob(os.path.join(output_dir, 'tweets-[0-9]*.parquet')))
+                table = output_sink.pa.concat_tables(output_sink.pq.read_table(path, columns=['profile', 'cascade', output_sink.EXTRA_FIELD]) for path in parts).to_pydict()
+                for column in table.values():
+                    assert sum(value is not None for value in column) == record_count - late_from
+                assert json.loads(table['profile'][-1])['followers_count'] == record_count - 1
+            start = time.perf_counter()
+            records = dict(iter_records(output_dir))
+            read_cell = f"{time.perf_counter() - start:.2f}"
+            assert len(records) == record_count
+            # 读回的记录与写入时一致（Parquet 由主表和子表重建嵌套列表）
+            for i in (0, late_from, record_count - 1):
+                record = dict(source, post_url=f"https://x.com/fixture_user/status/{i}", replies=children, retweets_with_comment=children[:10])
+                if i >= late_from:
+                    record.update(profile={"user_id": "fixture_user", "followers_count": i}, cascade={"parent": None, "root": str(i), "depth": 0}, note=f"late {i}")
+                expected = json.loads(json.dumps(record, ensure_ascii=False, default=to_json))
+                actual = records[f"2024-05-01_12-00-00_id_{i}"]
+                assert actual == expected, (output_format, i, {key: (actual.get(key), value) for key, value in expected.items() if actual.get(key) != value})
+            print(f"{output_format:<8} | {write_seconds:>7.2f} | {len(os.listdir(output_dir)):>6} | {scan_seconds:>10.3f} | {read_cell:>10}")
+
+def bench_job_ledger(job_count=100000, done_ratio=0.9, workers=8):
+    """对比断点续传的启动耗时：扫描输出目录 vs 查询任务台账；并测量多线程同时领取/完成任务的吞吐量"""
+    urls = [f"https://x.com/fixture_user/status/{1750000000000000000 + i}" for i in range(job_count)]
+    done_count = int(job_count * done_ratio)
+    with tempfile.TemporaryDirectory() as output_dir:
+        for url in urls[:done_count]:
+            open(os.path.join(output_dir, f"2024-05-01_12-00-00_id_{url.split('/')[-1]}.json"), 'w').close()
+        start = time.perf_counter()
+        processed_ids = set()
+        for filename in os.listdir(output_dir):
+            match = re.search(r'_id_(\d+).json$', filename)
+            if match:
+                processed_ids.add(match.group(1))
+        pending_urls = [url for url in urls if url.split('/')[-1] not in processed_ids]
+        print(f"扫描输出目录: {time.perf_counter() - start:.3f}s | 待处理 {len(pending_urls)}")
+
+        ledger = JobLedger(os.path.join(output_dir, 'ledger.sqlite3'))
+        start = time.perf_counter()
+        ledger.add('task', [(url.split('/')[-1], url, None) for url in urls])
+        ledger.complete('task', [url.split('/')[-1] for url in urls[:done_count]])
+        print(f"首次登记 {job_count} 个任务: {time.perf_counter() - start:.3f}s")
+        start = time.perf_counter()
+        ledger.requeue('task')
+        pending = ledger.pending('task')
+        print(f"查询任务台账: {time.perf_counter() - start:.3f}s | 待处理 {len(pending)}")
+
+        claimed = []
+        def worker(keys):
+            for key in keys:
+                if ledger.claim('task', key):
+                    claimed.append(key)
+                    ledger.complete('task', [key])
+        keys = [key for key, _, _ in pending]
+        # 每个线程都尝试领取全部任务，验证同一个任务只会被领取一次
+        threads = [threading.Thread(target=worker, args=(keys,)) for _ in range(workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        print(f"{workers} 个线程竞争领取 {len(keys)} 个任务: {elapsed:.2f}s | 成功领取 {len(claimed)} 次 (重复 {len(claimed) - len(set(claimed))}) | {ledger.counts('task')}")
+        ledger.close()
+
+def _write_then_crash(output_dir, ledger_path, output_format, record_count):
+    """在子进程中运行：写入 record_count 条记录（落盘后在台账中标记完成），不调用 close 就杀死自己，模拟采集中途崩溃"""
+    source = tweet_parser.parse_tweet_article(build_article_corpus()[0])
+    ledger = JobLedger(ledger_path)
+    sink = open_sink(output_dir, output_format, on_durable=lambda keys: ledger.complete(output_dir, keys))
+    for i in range(record_count):
+        sink.write(dict(source, post_url=f"https://x.com/fixture_user/status/{i}", replies=[source]), str(i))
+    os.kill(os.getpid(), getattr(signal, 'SIGKILL', signal.SIGTERM))
+
+def bench_crash_resume(record_count=1234, total_count=2000):
+    """JSONL / Parquet 写入器在两次 flush 之间进程被杀死：台账中已完成的记录必须都能从输出中读回，续传后所有记录都已写出"""
+    formats = ['jsonl'] + (['parquet'] if output_sink.pa is not None else [])
+    print(f"{'格式':<8} | {'崩溃前写入':>8} | {'台账已完成':>8} | {'输出中可读':>8} | {'丢失':>4} | 续传后完成")
+    for output_format in formats:
+        with tempfile.TemporaryDirectory() as root:
+            output_dir, ledger_path = os.path.join(root, 'out'), os.path.join(root, 'ledger.sqlite3')
+            ledger = JobLedger(ledger_path)
+            ledger.add(output_dir, [(str(i), None, None) for i in range(total_count)])
+            process = multiprocessing.get_context('spawn').Process(target=_write_then_crash, args=(output_dir, ledger_path, output_format, record_count))
+            process.start()
+            process.join()
+            assert process.exitcode != 0
+            done = {key for key, _, _, state in ledger.jobs(output_dir) if state == 'done'}
+            readable = open_sink(output_dir, output_format).completed_keys()
+            if output_format == 'parquet':
+                for path in glob.glob(os.path.join(output_dir, '*.parquet')):
+                    output_sink.pq.read_table(path)  # 主表和子表的每个分片都完整可读
+            lost = done - readable
+            # 续传：重新排队后写出剩余的记录
+            ledger.requeue(output_dir)
+            sink = open_sink(output_dir, output_format, on_durable=lambda keys: ledger.complete(output_dir, keys))
+            for key, _, _ in ledger.pending(output_dir):
+                sink.write({"post_url": f"https://x.com/fixture_user/status/{key}"}, key)
+            sink.close()
+            resumed = ledger.counts(output_dir).get('done', 0)
+            print(f"{output_format:<8} | {record_count:>8} | {len(done):>8} | {len(readable):>8} | {len(lost):>4} | {resumed}/{total_count}")
+            assert done and not lost, f"{output_format}: 台账中已完成但无法读取的记录 {len(lost)} 条"
+            assert resumed == total_count and len(open_sink(output_dir, output_format).completed_keys()) == total_count
+            ledger.close()
+
+def bench_search_pipeline(task_count=4, urls_per_task=20, workers=3, sleep_scale=0.05):
+    """多个任务：逐个任务先搜索再采集（旧流程） vs 搜索作为生产者、链接即时进入共享采集队列"""
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    pages, urls = build_tweet_site(task_count * urls_per_task)
+    keywords = [f"fixture{t}" for t in range(task_count)]
+    for t, keyword in enumerate(keywords):
+        task_urls = urls[t * urls_per_task:(t + 1) * urls_per_task]
+        search_url = autotwi.build_search_url(keyword, '2024-05-01', '2024-05-02', autotwi.MIN_RETWEETS)
+        pages[search_url] = FakePage([pages[url].header_articles[0] for url in task_urls], batch_size=2)
+
+    def driver_factory():
+        return FakeDriver(pages, latency=0.02)
+
+    # 记录第一条数据写出的时间
+    process_url = autotwi.process_url_sequentially
+    first_record = {}
+    def timed_process_url(driver, url, sink, enrich=None):
+        process_url(driver, url, sink, enrich)
+        first_record.setdefault('at', time.perf_counter())
+    autotwi.process_url_sequentially = timed_process_url
+
+    rows = []
+    with tempfile.TemporaryDirectory() as root:
+        first_record.clear()
+        pool = BrowserPool(driver_factory, size=workers)
+        start = time.perf_counter()
+        for keyword in keywords:
+            sink = open_sink(os.path.join(root, 'serial', keyword))
+            found = pool.run([keyword], lambda driver, kw: autotwi.search_for_popular_tweets(driver, kw, '2024-05-01', '2024-05-02', autotwi.MIN_RETWEETS, autotwi.SEARCH_LIMIT))[0]
+            pool.run([candidate['url'] for candidate in found], lambda driver, url: autotwi.process_url_sequentially(driver, url, sink))
+        rows.append(('逐个任务 搜索→采集', time.perf_counter() - start, first_record['at'] - start, sum(len(os.listdir(os.path.join(root, 'serial', k))) for k in keywords)))
+        pool.close()
+
+        for concurrency in (1, 2):
+            first_record.clear()
+            autotwi.SEARCH_CONCURRENCY = concurrency
+            output_root = os.path.join(root, f"pipeline{concurrency}")
+            ledger = JobLedger(os.path.join(root, f"ledger{concurrency}.sqlite3"))
+            pool = BrowserPool(driver_factory, size=workers)
+            start = time.perf_counter()
+            autotwi.run_tasks(pool, ledger, [[keyword, '2024-05-01', '2024-05-02', os.path.join(output_root, keyword)] for keyword in keywords])
+            elapsed = time.perf_counter() - start
+            outputs = sum(len([f for f in os.listdir(os.path.join(output_root, k)) if '_id_' in f]) for k in keywords)
+            rows.append((f"流水线 搜索并发={concurrency}", elapsed, first_record['at'] - start, outputs))
+            pool.close()
+            ledger.close()
+    autotwi.SEARCH_CONCURRENCY = 1
+    autotwi.process_url_sequentially = process_url
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+    print(f"{'模式':<18} | {'总耗时(s)':>8} | {'首条数据(s)':>10} | {'输出文件':>6}")
+    for mode_name, elapsed, first_seconds, outputs in rows:
+        print(f"{mode_name:<18} | {elapsed:>8.2f} | {first_seconds:>10.2f} | {outputs:>6}")
+
+def bench_search_shards(tweet_count=1500, days=7, max_results=80, workers=3, sleep_scale=0.01):
+    """搜索结果深度受限时：整个日期范围只搜索一次 vs 按天 / 按小时分片（达到上限的窗口继续细分）的召回率与搜索次数"""
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    page_factory, all_urls = build_search_site(tweet_count, days=days, max_results=max_results)
+    search_loads = []
+    def counting_factory(url):
+        search_loads.append(url)
+        return page_factory(url)
+    # 本基准只关心搜索阶段，采集函数替换为空操作
+    process_url = autotwi.process_url_sequentially
+    autotwi.process_url_sequentially = lambda driver, url, sink, enrich=None: None
+    saved = autotwi.SEARCH_SHARD, autotwi.SEARCH_LIMIT, autotwi.SEARCH_CONCURRENCY
+    autotwi.SEARCH_LIMIT, autotwi.SEARCH_CONCURRENCY = tweet_count * 2, workers
+    end_date = (datetime.strptime('2024-05-01', '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
+    rows = []
+    with tempfile.TemporaryDirectory() as root:
+        for shard in (None, 'day', 'hour'):
+            autotwi.SEARCH_SHARD = shard
+            search_loads.clear()
+            output_dir = os.path.join(root, str(shard))
+            ledger = JobLedger(os.path.join(root, f"ledger-{shard}.sqlite3"))
+            pool = BrowserPool(lambda: FakeDriver(latency=0.02, page_factory=counting_factory), size=workers)
+            start = time.perf_counter()
+            autotwi.run_tasks(pool, ledger, [['fixture', '2024-05-01', end_date, output_dir], ['bad date', '2024/05/01', end_date, os.path.join(root, 'bad')]])  # 日期格式错误的任务只跳过自己
+            elapsed = time.perf_counter() - start
+            pool.close()
+            ledger.close()
+            with open(os.path.join(output_dir, 'urls_to_process.json')) as f:
+                found = [candidate['url'] for candidate in json.load(f)]
+            assert len(found) == len(set(found))
+            assert not os.path.exists(os.path.join(root, 'bad'))
+            rows.append((str(shard), len(search_loads), len(found), elapsed))
+
+        # 某一天的搜索始终超时：重试期间继续占用搜索名额，重试次数用完后照常保存其他窗口找到的链接
+        autotwi.SEARCH_SHARD, autotwi.SEARCH_CONCURRENCY = 'day', workers - 1
+        search = autotwi.search_for_popular_tweets
+        active = {'now': 0, 'max': 0, 'failed': 0}
+        lock = threading.Lock()
+        def flaky_search(driver, keyword, start_date, *args, **kwargs):
+            with lock:
+                active['now'] += 1
+                active['max'] = max(active['max'], active['now'])
+            try:
+                if str(start_date).startswith('2024-05-03'):
+                    time.sleep(0.05)
+                    active['failed'] += 1
+                    raise TimeoutException("fixture: 搜索超时")
+                return search(driver, keyword, start_date, *args, **kwargs)
+            finally:
+                with lock:
+                    active['now'] -= 1
+        autotwi.search_for_popular_tweets = flaky_search
+        output_dir = os.path.join(root, 'flaky')
+        ledger = JobLedger(os.path.join(root, 'ledger-flaky.sqlite3'))
+        pool = BrowserPool(lambda: FakeDriver(latency=0.02, page_factory=page_factory), size=workers, backoff=BackoffPolicy(base_delays={FAILURE_TIMEOUT: 0}))
+        try:
+            autotwi.run_tasks(pool, ledger, [['fixture', '2024-05-01', end_date, output_dir]])
+        finally:
+            autotwi.search_for_popular_tweets = search
+            pool.close()
+            ledger.close()
+        assert os.path.exists(os.path.join(output_dir, 'urls_to_process.json')), "搜索窗口放弃后没有保存链接列表"
+        assert active['max'] <= autotwi.SEARCH_CONCURRENCY, f"同时搜索 {active['max']} 个，超过 SEARCH_CONCURRENCY={autotwi.SEARCH_CONCURRENCY}"
+        flaky_row = (active['failed'], len(pool.failures), active['max'])
+    autotwi.SEARCH_SHARD, autotwi.SEARCH_LIMIT, autotwi.SEARCH_CONCURRENCY = saved
+    autotwi.process_url_sequentially = process_url
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+    print(f"范围内帖子: {len(all_urls)} | 单次搜索最多返回: {max_results}")
+    print(f"{'分片':<6} | {'搜索次数':>6} | {'找到链接':>6} | {'召回率':>6} | {'耗时(s)':>7} | {'链接/秒':>6}")
+    for shard, searches, found, elapsed in rows:
+        print(f"{shard:<6} | {searches:>6} | {found:>6} | {found / len(all_urls):>6.1%} | {elapsed:>7.2f} | {found / elapsed:>6.1f}")
+    print(f"一个窗口始终超时: 失败 {flaky_row[0]} 次后放弃 {flaky_row[1]} 个窗口 | 最多同时搜索 {flaky_row[2]} 个 (SEARCH_CONCURRENCY={workers - 1}) | 链接列表已保存")
+
+def bench_network_capture(thread_size=300, rounds=5, url_count=8, sleep_scale=0.002):
+    """校验 GraphQL 映射与 DOM 解析的记录一致，对比两者每秒处理的推文数，以及完整处理帖子页的耗时"""
+    response, expected = build_recorded_tweet_detail()
+    mapped = [network_capture.map_tweet_result(result) for result in network_capture.iter_tweet_results(response)]
+    print(f"真实结构 fixture: {len(expected)} 条推文 | 与期望输出不一致: {sum(a != b for a, b in zip(mapped, expected)) + abs(len(mapped) - len(expected))}")
+    assert mapped == expected, [(a, b) for a, b in zip(mapped, expected) if a != b]
+
+    articles, results = build_thread_articles(thread_size), build_thread_results(thread_size)
+    dom_records = [tweet_parser.parse_tweet_article(article_html) for _, article_html in articles]
+    json_records = [network_capture.map_tweet_result(result) for result in results]
+    mismatches = sum(a != b for a, b in zip(dom_records, json_records))
+    profile_mismatches = sum(tweet_parser.parse_profile_tweet(article_html) != network_capture.map_tweet_result(result, profile=True) for (_, article_html), result in zip(articles, results))
+    print(f"合成回复 fixture: {thread_size} 条 | DOM 与 JSON 记录不一致: {mismatches} | 用户时间线记录不一致: {profile_mismatches}")
+    assert mismatches == profile_mismatches == 0, next((a, b) for a, b in zip(dom_records, json_records) if a != b)
+    payload = json.dumps({"data": {"entries": [{"tweet_results": {"result": result}} for result in results]}})
+    for mode_name, run in [(f'DOM 解析 ({tweet_parser.PARSER_BACKEND})', lambda: [tweet_parser.parse_tweet_article(article_html) for _, article_html in articles]),
+                           ('JSON 映射', lambda: [network_capture.map_tweet_result(r) for r in network_capture.iter_tweet_results(json.loads(payload))])]:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            run()
+        print(f"{mode_name:>22}: {rounds * thread_size / (time.perf_counter() - start):>9.0f} 条/秒")
+
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    pages, urls = build_tweet_site(url_count, replies_per_tweet=15, quotes_per_tweet=10)  # 数量低于抽样上限，两种模式的输出可以逐条比较
+    outputs = {}
+    for network_log in (False, True):
+        driver = FakeDriver(pages, network_log=network_log)
+        if network_log:
+            driver.capture = network_capture.TimelineCapture(driver)
+        with tempfile.TemporaryDirectory() as output_dir:
+            sink = open_sink(output_dir, 'jsonl')
+            start = time.perf_counter()
+            for url in urls:
+                autotwi.process_url_sequentially(driver, url, sink)
+            elapsed = time.perf_counter() - start
+            sink.close()
+            outputs[network_log] = [record for _, record in iter_records(output_dir)]
+        capture = getattr(driver, 'capture', None)
+        print(f"{'网络捕获' if network_log else 'DOM 解析'}: {len(urls)} 个帖子耗时 {elapsed:.2f}s，读取响应 {capture.responses if capture else 0} 个")
+    print(f"两种模式输出的记录一致: {outputs[False] == outputs[True]}")
+    assert outputs[False] == outputs[True]
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_retweet_cascade(roots=8, branching=4, top_k=2, depth=3, workers=4, sleep_scale=0.002):
+    """级联模式：两个有重叠根帖子的stage共用一个会话池逐层采集，校验去重、传播边与树结构一致，以及断点续传"""
+    retweet = load_script('trueauto_retweet_V1.2.py')
+    saved = (retweet.CASCADE_TOP_K, retweet.CASCADE_DEPTH, retweet.CASCADE_OUTPUT_DIR, retweet.create_logged_in_driver)
+    retweet.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    page_factory, seed_records = build_cascade_site(roots, branching=branching)
+    retweet.create_logged_in_driver = lambda: FakeDriver(page_factory=page_factory)
+    with tempfile.TemporaryDirectory() as work_dir:
+        stage_folders = []
+        for index, records in enumerate([seed_records[:roots * 3 // 4], seed_records[roots // 4:]]):  # 两个stage共享一半根帖子
+            stage_folder = os.path.join(work_dir, f"stage{index + 1}")
+            stage_folders.append(stage_folder)
+            for record in records:
+                open_sink(stage_folder).write(record, retweet.record_filename(record, record['post_url'])[:-5])
+
+        print(f"根帖子: {roots} | 每层跟进前 {top_k} 条 | 最多 {depth} 层 | 会话数: {workers}")
+        print(f"{'配置':<12} | {'耗时(s)':>7} | {'采集推文':>6} | {'传播边':>6} | {'树结构错误':>8} | 续传后待处理")
+        for mode_name, k, d in [('二次采集等价', 1, 1), ('级联', top_k, depth)]:
+            output_dir = os.path.join(work_dir, f"cascade-{k}-{d}")
+            retweet.CASCADE_TOP_K, retweet.CASCADE_DEPTH, retweet.CASCADE_OUTPUT_DIR = k, d, output_dir
+            ledger = JobLedger(os.path.join(work_dir, f"ledger-{k}-{d}.sqlite3"))
+            pool = BrowserPool(retweet.create_logged_in_driver, size=workers, pages_per_session=None)
+            start = time.perf_counter()
+            retweet.run_cascade(pool, ledger, stage_folders)
+            elapsed = time.perf_counter() - start
+            with open(os.path.join(output_dir, retweet.CASCADE_EDGES_FILE), encoding='utf-8') as f:
+                edges = [json.loads(line) for line in f]
+            # 重建传播树：每条边的子节点必须是父节点的前 k 个子节点之一，且每个父节点恰好有 k 个子节点（最后一层除外）
+            children = {}
+            for edge in edges:
+                children.setdefault(edge['parent'], []).append(int(edge['child']))
+            errors = sum(sorted(kids) != cascade_child_ids(int(parent), branching, k) for parent, kids in children.items())
+            errors += sum(1 for edge in edges if edge['state'] != 'done' or edge['depth'] > d)
+            expected_nodes = roots * sum(k ** level for level in range(1, d + 1))
+            errors += abs(len(edges) - expected_nodes)
+            if (k, d) == (1, 1):
+                legacy_urls = {task['url_to_scrape'] for stage_folder in stage_folders for task in retweet.find_all_top_retweets(stage_folder, None)}
+                errors += len(legacy_urls ^ {edge['url'] for edge in edges})
+            scraped = len(os.listdir(output_dir)) - 1  # 去掉传播边文件
+            retweet.run_cascade(pool, ledger, stage_folders)  # 第二次运行应当没有待处理的任务
+            remaining = len(ledger.pending(output_dir))
+            pool.close()
+            ledger.close()
+            print(f"{mode_name:<12} | {elapsed:>7.2f} | {scraped:>6} | {len(edges):>6} | {errors:>8} | {remaining}")
+
+    retweet.CASCADE_TOP_K, retweet.CASCADE_DEPTH, retweet.CASCADE_OUTPUT_DIR, retweet.create_logged_in_driver = saved
+    retweet.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_instrumentation(calls=200000, url_count=24, workers=2, navigation_seconds=0.02, sleep_scale=0.002):
+    """计时层的开销：单次 stage() 的耗时，以及开启/关闭计时时会话池处理同一批链接的总耗时；并打印阶段汇总表、校验 JSON 日志"""
+    metrics = instrumentation.METRICS
+    for enabled in (False, True):
+        instrumentation.INSTRUMENTATION = enabled
+        metrics.begin('overhead')
+        start = time.perf_counter()
+        for _ in range(calls):
+            with metrics.stage(instrumentation.STAGE_PARSE):
+                pass
+            metrics.count(instrumentation.COUNT_NEW)
+        elapsed = time.perf_counter() - start
+        metrics.local.record = None
+        print(f"计时{'开启' if enabled else '关闭'}: 每次 stage()+count() {elapsed / calls * 1e9:.0f} ns")
+
+    retweet = load_script('trueauto_retweet_V1.2.py')
+    retweet.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    pages, urls = build_tweet_site(url_count)
+    tasks = [{"source_filename": f"source_{i}", "url_to_scrape": url} for i, url in enumerate(urls)]
+    crash_url = urls[url_count // 2]
+    with tempfile.TemporaryDirectory() as log_dir:
+        metrics.log_file = os.path.join(log_dir, 'metrics.jsonl')
+        for enabled in (False, True):
+            instrumentation.INSTRUMENTATION = enabled
+            metrics.reset()
+            pool = BrowserPool(lambda: FakeDriver(pages, latency=navigation_seconds, crash_urls=[crash_url]), size=workers, pages_per_session=None,
+                               backoff=BackoffPolicy(base_delays={FAILURE_CRASH: 0}))
+            with tempfile.TemporaryDirectory() as output_dir:
+                sink = open_sink(output_dir)
+                start = time.perf_counter()
+                pool.run(tasks, lambda driver, task: retweet.process_url(driver, task, sink))
+                elapsed = time.perf_counter() - start
+                pool.close()
+                sink.close()
+            print(f"计时{'开启' if enabled else '关闭'}: {url_count} 个链接耗时 {elapsed:.2f}s")
+        metrics.report('instrumentation 基准')
+        metrics.close()
+        with open(metrics.log_file, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        statuses = {}
+        for line in lines:
+            statuses[line['status']] = statuses.get(line['status'], 0) + 1
+        print(f"JSON 日志: {len(lines)} 行 {statuses} | 每行阶段: {sorted(lines[0]['stages'])}")
+    metrics.log_file = None
+    metrics.reset()
+    retweet.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def _measure(run):
+    """运行 run() -> (处理数量, 失败数量)，返回耗时、吞吐量和 tracemalloc 记录的内存峰值"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    items, failures = run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'items': items, 'failures': failures, 'seconds': elapsed, 'throughput': items / max(elapsed, 1e-9), 'peak_kb': peak / 1024}
+
+def bench_suite(url_count=24, user_count=12, workers=3, latency=(0.01, 0.03), failure_rates=None, sleep_scale=0.002, seed=7):
+    """入口函数回归基准：在带随机延迟和注入失败的伪站点上依次运行各入口函数，报告吞吐量和内存峰值，并与上次运行的结果比较"""
+    failure_rates = failure_rates or {FAILURE_TIMEOUT: 0.05, FAILURE_RATE_LIMIT: 0.03, FAILURE_CRASH: 0.02}
+    autotwi, retweet, user = load_script('autotwi_V2.0.py'), load_script('trueauto_retweet_V1.2.py'), load_script('user_autotwi.py')
+    saved_output_dir = user.OUTPUT_DIR
+    autotwi.time = retweet.time = user.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    backoff = BackoffPolicy(base_delays={kind: 0 for kind in (FAILURE_TIMEOUT, FAILURE_RATE_LIMIT, FAILURE_CRASH)})  # 注入的失败不需要真的退避
+    pages, urls = build_tweet_site(url_count)
+    profile_pages, user_ids = build_profile_site(user_count)
+    search_factory, _ = build_search_site(2000, max_results=150, batch_size=20)
+    corpus = build_article_corpus()
+    sessions = []
+
+    def make_factory(site):
+        def driver_factory():
+            driver = FakeDriver(site, latency=latency, failure_rates=failure_rates, seed=seed + len(sessions))
+            sessions.append(driver)
+            return driver
+        return driver_factory
+
+    def run_pool(site, items, handler):
+        pool = BrowserPool(make_factory(site), size=workers, pages_per_session=None, backoff=backoff)
+        pool.run(items, handler)
+        pool.close()
+        return len(pool.failures)
+
+    def parse_articles():
+        parsed = [tweet_parser.parse_tweet_article(article_html) for _ in range(20) for article_html in corpus]
+        return sum(1 for record in parsed if record), 0
+
+    def scroll_collect():
+        driver = FakeDriver({'https://x.com/fixture_user/status/1': FakePage(build_thread_articles(600), batch_size=20)})
+        driver.get('https://x.com/fixture_user/status/1')
+        return len(autotwi.scroll_and_collect(driver, set(), max_scrolls=30)), 0
+
+    def search():
+        driver = FakeDriver(page_factory=search_factory)
+        return len(autotwi.search_for_popular_tweets(driver, 'fixture', '2024-05-01', '2024-05-08', 0, 150)), 0
+
+    rows = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        stage_dir = os.path.join(work_dir, 'stage1')
+        user.OUTPUT_DIR = os.path.join(work_dir, 'users')
+
+        def process_urls():
+            sink = open_sink(stage_dir)
+            failures = run_pool(pages, urls, lambda driver, url: autotwi.process_url_sequentially(driver, url, sink))
+            sink.close()
+            return len(os.listdir(stage_dir)), failures
+
+        def top_retweets():
+            tasks = [task for _ in range(10) for task in retweet.find_all_top_retweets(stage_dir, None)]
+            return len(tasks), 0
+
+        def scrape_users():
+            sink = open_sink(user.OUTPUT_DIR, name='users')
+            failures = run_pool(profile_pages, user_ids, lambda driver, user_id: user.scrape_user_profile(driver, user_id, sink))
+            sink.close()
+            return len([f for f in os.listdir(user.OUTPUT_DIR) if not f.endswith('_error.json')]), failures
+
+        for name, run in [('parse_tweet_article', parse_articles), ('scroll_and_collect', scroll_collect), ('search_for_popular_tweets', search),
+                          ('process_url_sequentially', process_urls), ('find_all_top_retweets', top_retweets), ('scrape_user_profile', scrape_users)]:
+            rows[name] = _measure(run)
+
+    previous = {}
+    if os.path.exists(BENCHMARK_RESULTS_FILE):
+        with open(BENCHMARK_RESULTS_FILE, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    injected = {kind: sum(driver.injected.get(kind, 0) for driver in sessions) for kind in failure_rates}
+    print(f"\n导航延迟 {latency[0]}~{latency[1]}s | 注入失败概率: {failure_rates} | 实际注入: {injected} | 会话池 x{workers}（共启动 {len(sessions)} 个伪浏览器）")
+    print(f"{'入口函数':<26} | {'数量':>6} | {'耗时(s)':>7} | {'吞吐(条/秒)':>10} | {'内存峰值(KB)':>11} | {'最终失败':>6} | 与上次相比")
+    regressions = 0
+    for name, row in rows.items():
+        notes = []
+        before = previous.get(name)
+        if before:
+            throughput_change = row['throughput'] / max(before['throughput'], 1e-9) - 1
+            memory_change = row['peak_kb'] / max(before['peak_kb'], 1e-9) - 1
+            notes.append(f"吞吐 {throughput_change:+.0%} 内存 {memory_change:+.0%}")
+            if throughput_change < -REGRESSION_TOLERANCE or memory_change > REGRESSION_TOLERANCE:
+                notes.append("[退化]")
+                regressions += 1
+        print(f"{name:<26} | {row['items']:>6} | {row['seconds']:>7.2f} | {row['throughput']:>10.0f} | {row['peak_kb']:>11.0f} | {row['failures']:>6} | {' '.join(notes) or '-'}")
+    with open(BENCHMARK_RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, ensure_ascii=False, indent=4)
+    print(f"结果已保存至 {BENCHMARK_RESULTS_FILE}" + (f"，{regressions} 项超过 {REGRESSION_TOLERANCE:.0%} 的退化阈值" if regressions else ""))
+    user.OUTPUT_DIR = saved_output_dir
+    autotwi.time = retweet.time = user.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_early_stop(url_count=20, replies_per_tweet=150, batch_size=20, sleep_scale=0.002):
+    """抽样感知的采集：候选数够抽样后提前停止滚动、没有转发的帖子跳过 /quotes，对比每个链接的页面加载和滚动次数"""
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    saved = autotwi.OVERSAMPLE_FACTOR, autotwi.SKIP_EMPTY_QUOTES
+    # 空的引用页面上等待推文出现会一直等到 20 秒超时，这里同样按 sleep_scale 缩短
+    autotwi.WebDriverWait = lambda driver, timeout: WebDriverWait(driver, timeout * sleep_scale, poll_frequency=timeout * sleep_scale / 10)
+    # 一半帖子有引用，另一半没有任何转发
+    pages, urls = build_tweet_site(url_count // 2, replies_per_tweet=replies_per_tweet, quotes_per_tweet=60, batch_size=batch_size)
+    empty_pages, empty_urls = build_tweet_site(url_count - url_count // 2, replies_per_tweet=replies_per_tweet, quotes_per_tweet=0, batch_size=batch_size, start_id=1760000000000000000)
+    pages.update(empty_pages)
+    all_urls = urls + empty_urls
+    metrics = instrumentation.METRICS
+    print(f"{'模式':<22} | {'页面加载/链接':>11} | {'滚动/链接':>8} | {'耗时(s)':>7} | {'回复样本':>8} | {'引用样本':>8} | 提前停止 | 跳过 /quotes")
+    for mode_name, factor, skip in [('旧版: 滚满3次 + 总是打开引用页', None, False), ('过采样 x2 + 跳过空引用页', 2.0, True), ('过采样 x1 + 跳过空引用页', 1.0, True)]:
+        autotwi.OVERSAMPLE_FACTOR, autotwi.SKIP_EMPTY_QUOTES = factor, skip
+        metrics.reset()
+        driver = FakeDriver(pages)
+        with tempfile.TemporaryDirectory() as output_dir:
+            sink = open_sink(output_dir, 'jsonl')
+            start = time.perf_counter()
+            for url in all_urls:
+                autotwi.process_url_sequentially(driver, url, sink)
+            elapsed = time.perf_counter() - start
+            sink.close()
+            records = [record for _, record in iter_records(output_dir)]
+        scrolls = metrics.stage_totals.get(instrumentation.STAGE_SCROLL, [0])[0]
+        reply_sizes = sorted({len(record['replies']) for record in records})
+        quote_sizes = sorted({len(record['retweets_with_comment']) for record in records})
+        print(f"{mode_name:<22} | {driver.navigations / len(all_urls):>11.2f} | {scrolls / len(all_urls):>8.2f} | {elapsed:>7.2f} | {str(reply_sizes):>8} | {str(quote_sizes):>8} | "
+              f"{metrics.counters.get(instrumentation.COUNT_EARLY_STOPS, 0):>8} | {metrics.counters.get(instrumentation.COUNT_QUOTES_SKIPPED, 0)}")
+    metrics.reset()
+    autotwi.OVERSAMPLE_FACTOR, autotwi.SKIP_EMPTY_QUOTES = saved
+    autotwi.WebDriverWait = WebDriverWait
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_lean_browser(workers=3):
+    """精简模式的离线检查：屏蔽规则命中的请求类型、不应被屏蔽的请求，以及每个会话池槽位使用各自的用户目录（页面加载耗时和内存对比见 python lean_browser.py）"""
+    patterns = lean_browser.blocked_url_patterns()
+    requests = [
+        ('字体', 'https://abs.twimg.com/responsive-web/client-web/chirp-regular-web.woff2', True),
+        ('头像', 'https://pbs.twimg.com/profile_images/1/photo_normal.jpg', True),
+        ('帖子图片', 'https://pbs.twimg.com/media/GAbCdEf?format=jpg&name=small', True),
+        ('视频分片', 'https://video.twimg.com/ext_tw_video/1/pu/vid/avc1/0/0/480x270/a.mp4', True),
+        ('视频清单', 'https://video.twimg.com/amplify_video/1/pl/a.m3u8?tag=14', True),
+        ('事件上报', 'https://x.com/i/api/1.1/jot/client_event.json', True),
+        ('广告统计', 'https://static.ads-twitter.com/uwt.js', True),
+        ('时间线接口', 'https://x.com/i/api/graphql/abc/TweetDetail?variables=%7B%7D', False),
+        ('页面脚本', 'https://abs.twimg.com/responsive-web/client-web/main.a1b2c3.js', False),
+        ('帖子页面', 'https://x.com/nasa/status/1750000000000000000', False),
+    ]
+    # CDP 的 setBlockedURLs 规则与 fnmatch 一样用 * 匹配任意字符
+    print(f"{'请求':<6} | {'应屏蔽':>4} | {'实际':>4} | 链接")
+    mismatches = 0
+    for label, url, expected in requests:
+        blocked = any(fnmatchcase(url, pattern) for pattern in patterns)
+        mismatches += blocked != expected
+        print(f"{label:<6} | {'是' if expected else '否':>4} | {'是' if blocked else '否':>4} | {url}")
+    print(f"屏蔽规则 {len(patterns)} 条 | 与预期不一致: {mismatches}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        saved_root = lean_browser.PROFILE_ROOT
+        lean_browser.PROFILE_ROOT = work_dir
+        profile_dirs = {}
+
+        def driver_factory():
+            driver = FakeDriver()
+            lean_browser.enable_request_blocking(driver)
+            profile_dirs.setdefault(lean_browser.persistent_profile_dir('bench'), 0)
+            return driver
+
+        pool = BrowserPool(driver_factory, size=workers, pages_per_session=2)
+        pool.run(range(workers * 4), lambda driver, item: time.sleep(0.01))
+        pool.close()
+        lean_browser.PROFILE_ROOT = saved_root
+        print(f"会话池 x{workers}: 启动 {pool.sessions_started} 个会话，使用 {len(profile_dirs)} 个用户目录: {sorted(os.path.basename(path) for path in profile_dirs)}")
+        print(f"主线程中的用户目录: {lean_browser.persistent_profile_dir('bench')}")
+
+def bench_session_manager(url_count=24, workers=2, cookie_count=15, navigation_seconds=0.3, cookie_latency=0.005, sessions_started=10, sleep_scale=0.002):
+    """登录会话管理：逐个 add_cookie vs 一次 Network.setCookies 的注入耗时；两个账号轮换时其中一个中途掉线，对比停用该账号和从更新后的 Cookies 文件恢复"""
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    autotwi.WebDriverWait = lambda driver, timeout: WebDriverWait(driver, timeout * sleep_scale, poll_frequency=timeout * sleep_scale / 10)  # 登录页上等待推文同样会等到超时
+    expiry = int(time.time()) + 86400 * 30
+
+    def write_jar(path, token):
+        cookies = [{'name': 'auth_token', 'value': token, 'domain': '.x.com', 'path': '/', 'secure': True, 'httpOnly': True, 'sameSite': 'None', 'expiry': expiry}]
+        cookies += [{'name': f'cookie_{i}', 'value': f'{token}-{i}', 'domain': '.x.com', 'path': '/', 'secure': True, 'httpOnly': False, 'sameSite': 'no_restriction'} for i in range(cookie_count - 1)]
+        with open(path, 'w') as f:
+            json.dump(cookies, f)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        jar_a, jar_b = os.path.join(work_dir, 'account_a.json'), os.path.join(work_dir, 'account_b.json')
+        write_jar(jar_a, 'token-a')
+        write_jar(jar_b, 'token-b')
+
+        print(f"{'注入方式':<28} | {'每个会话(ms)':>11} | {'导航':>4} | {'Cookie 命令':>10}")
+        for mode_name, inject in (('打开 x.com + 逐个 add_cookie', lambda driver: load_cookies(driver, jar_a)), ('Network.setCookies 批量注入', SessionManager([jar_a]).attach)):
+            drivers = [FakeDriver(latency=navigation_seconds, cookie_latency=cookie_latency) for _ in range(sessions_started)]
+            start = time.perf_counter()
+            for driver in drivers:
+                inject(driver)
+            elapsed = time.perf_counter() - start
+            commands = len(drivers[0].cookies) if mode_name.startswith('打开') else 1
+            print(f"{mode_name:<28} | {elapsed / sessions_started * 1000:>11.1f} | {drivers[0].navigations:>4} | {commands:>10}")
+
+        pages, urls = build_tweet_site(url_count)
+        print(f"\n{'掉线场景':<22} | {'完成链接':>6} | {'放弃':>4} | {'掉线检测':>6} | {'会话数':>5} | 各账号会话")
+        for scenario in ('停用掉线账号', 'Cookies 文件已更新'):
+            write_jar(jar_b, 'token-b')
+            revoked = set()
+            sessions = SessionManager([jar_a, jar_b])
+            sessions.ensure_logged_in()
+            detections = []
+
+            def on_logged_out(driver):
+                detections.append(driver.account)
+                if scenario == 'Cookies 文件已更新':
+                    write_jar(jar_b, 'token-b2')  # 模拟在其他地方重新登录后覆盖了 Cookies 文件
+                    os.utime(jar_b, (time.time() + 1, time.time() + 1))
+                sessions.logged_out(driver)
+
+            done = []
+
+            def handler(driver, url):
+                autotwi.process_url_sequentially(driver, url, sink)
+                done.append(url)
+                if len(done) == url_count // 4:
+                    revoked.add('token-b')  # 账号 b 中途掉线
+
+            with tempfile.TemporaryDirectory() as output_dir:
+                sink = open_sink(output_dir, 'jsonl')
+                pool = BrowserPool(lambda: sessions.attach(FakeDriver(pages, revoked_tokens=revoked)), size=workers, pages_per_session=None, on_logged_out=on_logged_out)
+                pool.run(urls, handler)
+                pool.close()
+                sink.close()
+                written = len({record['post_url'] for _, record in iter_records(output_dir)})
+            usage = ', '.join(f"{os.path.basename(path)} {count}{'(停用)' if path in sessions.expired else ''}" for path, count in sessions.sessions.items())
+            print(f"{scenario:<22} | {written:>6} | {len(pool.failures):>4} | {len(detections):>6} | {pool.sessions_started:>5} | {usage}")
+    autotwi.WebDriverWait = WebDriverWait
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_engagement_prefilter(card_count=300, workers=3, page_seconds=0.02, top=20, sleep_scale=0.002, seed=11):
+    """搜索结果按互动门槛预过滤、采集队列按互动量排序：对比打开的帖子页数量、总耗时，以及互动量最高的帖子被采集的先后"""
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    rng = random.Random(seed)
+    likes, articles = {}, []
+    for i in range(card_count):
+        like_count = int(rng.paretovariate(1.1) * 3) - 3  # 长尾分布：大多数帖子点赞很少，少数很多
+        href, article_html = build_article_html(1950000000000000000 + i, user_id='search_user', text=f"fixture search result {i}",
+                                                reply_count=like_count // 20, retweet_count=like_count // 10, like_count=like_count)
+        likes["https://x.com" + href] = like_count
+        articles.append((href, article_html))
+    search_page = FakePage(articles, batch_size=20)
+    top_urls = sorted(likes, key=lambda url: -likes[url])[:top]
+    # 本基准只关心进入采集队列的链接和顺序，每个帖子页的采集（页面加载 + 两个滚动阶段）用固定耗时代替
+    order = []
+    process_url = autotwi.process_url_sequentially
+    def fake_process_url(driver, url, sink, enrich=None):
+        time.sleep(page_seconds)
+        order.append(url)
+    autotwi.process_url_sequentially = fake_process_url
+    saved = autotwi.MIN_FAVES, autotwi.PRIORITIZE_BY_ENGAGEMENT, autotwi.SEARCH_LIMIT, autotwi.SEARCH_SHARD, autotwi.SEARCH_CONCURRENCY
+    autotwi.SEARCH_LIMIT, autotwi.SEARCH_SHARD, autotwi.SEARCH_CONCURRENCY = card_count, None, 1
+    rows = []
+    with tempfile.TemporaryDirectory() as root:
+        for mode_index, (mode_name, min_faves, prioritize, old_list) in enumerate([('旧版: 不过滤、按发现顺序', 0, False, False), (f'MIN_FAVES={saved[0]}', saved[0], False, False),
+                                                                                 (f'MIN_FAVES={saved[0]} + 按互动量排序', saved[0], True, False), ('旧版 urls_to_process.json', saved[0], True, True)]):
+            autotwi.MIN_FAVES, autotwi.PRIORITIZE_BY_ENGAGEMENT = min_faves, prioritize
+            order.clear()
+            output_dir = os.path.join(root, f"mode{mode_index}")  # 旁边还有台账数据库文件，不能按目录中的文件数命名
+            if old_list:
+                os.makedirs(output_dir)
+                with open(os.path.join(output_dir, 'urls_to_process.json'), 'w') as f:
+                    json.dump(list(likes), f)  # 旧版格式：只有链接，没有互动数据，全部保留
+            ledger = JobLedger(output_dir + '.sqlite3')
+            pool = BrowserPool(lambda: FakeDriver(latency=0.005, page_factory=lambda url: search_page if '/search?' in url else None), size=workers)
+            start = time.perf_counter()
+            autotwi.run_tasks(pool, ledger, [['fixture', '2024-05-01', '2024-05-08', output_dir]])
+            elapsed = time.perf_counter() - start
+            pool.close()
+            ledger.close()
+            position = {url: index for index, url in enumerate(order)}
+            first_likes = sum(likes[url] for url in order[:top]) / min(top, len(order))
+            top_rank = sum(position.get(url, len(order)) for url in top_urls) / len(top_urls) + 1
+            rows.append((mode_name, len(order), elapsed, first_likes, top_rank))
+    autotwi.MIN_FAVES, autotwi.PRIORITIZE_BY_ENGAGEMENT, autotwi.SEARCH_LIMIT, autotwi.SEARCH_SHARD, autotwi.SEARCH_CONCURRENCY = saved
+    autotwi.process_url_sequentially = process_url
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+    print(f"\n搜索结果 {card_count} 条（点赞数中位数 {sorted(likes.values())[card_count // 2]}，低于 {saved[0]} 的 {sum(v < saved[0] for v in likes.values())} 条） | 会话池 x{workers}")
+    print(f"{'模式':<24} | {'打开帖子页':>8} | {'耗时(s)':>7} | {f'前{top}个采集的平均点赞':>14} | {f'点赞前{top}的平均名次':>14}")
+    for mode_name, visits, elapsed, first_likes, top_rank in rows:
+        print(f"{mode_name:<24} | {visits:>8} | {elapsed:>7.2f} | {first_likes:>14.0f} | {top_rank:>14.1f}")
+
+def bench_tab_session(url_count=24, navigation_seconds=0.2, tabs=3, sleep_scale=0.002):
+    """多标签页模式：1 个浏览器 x 1 标签页、1 个浏览器 x N 标签页（空闲标签页预加载后面的链接）与 N 个浏览器的每分钟页面数（真实 Chrome 的内存对比见 python tab_session.py）"""
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    pages, urls = build_tweet_site(url_count)
+
+    print(f"{'模式':<18} | {'每分钟页面':>8} | {'浏览器':>4} | {'标签页':>4} | {'预加载命中':>8} | {'导航':>4} | 输出")
+    for mode_name, size, tab_count in (('1 浏览器 x 1 标签页', 1, 1), (f'1 浏览器 x {tabs} 标签页', 1, tabs), (f'{tabs} 浏览器 x 1 标签页', tabs, 1)):
+        drivers = []
+
+        def driver_factory():
+            drivers.append(FakeDriver(pages, latency=navigation_seconds))
+            return TabDriver(drivers[-1], tab_count) if tab_count > 1 else drivers[-1]
+
+        def handler(driver, url):
+            autotwi.process_url_sequentially(driver, url, sink)
+        handler.prefetch = tweet_pages
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            sink = open_sink(output_dir, 'jsonl')
+            pool = BrowserPool(driver_factory, size=size, pages_per_session=None)
+            start = time.perf_counter()
+            pool.run(urls, handler)
+            elapsed = time.perf_counter() - start
+            hits = sum(getattr(driver, 'hits', 0) for driver in pool.drivers)
+            gets = hits + sum(getattr(driver, 'misses', 0) for driver in pool.drivers)
+            pool.close()
+            sink.close()
+            written = len({record['post_url'] for _, record in iter_records(output_dir)})
+        hit_rate = f"{hits / gets:.0%}" if gets else '-'
+        print(f"{mode_name:<18} | {written / elapsed * 60:>8.0f} | {pool.sessions_started:>4} | {size * tab_count:>4} | {hit_rate:>8} | {sum(driver.navigations for driver in drivers):>4} | {written}/{url_count}")
+
+    # 多领取的任务不跟着退避的会话等待：会话 1 的第 2 个任务（第二批的第一个，此时已多领取了几个）超时后退避 backoff_seconds 秒，
+    # 它手上尚未开始的任务应由另一个会话处理完
+    backoff_seconds = 5
+    pool = BrowserPool(lambda: TabDriver(FakeDriver(pages, latency=0.02), tabs), size=2, pages_per_session=None,
+                       backoff=BackoffPolicy(base_delays={FAILURE_TIMEOUT: backoff_seconds}, retry_budgets={FAILURE_TIMEOUT: 0}, jitter=0))
+    first_slot_items = []
+
+    def flaky_handler(driver, url):
+        if current_slot() == 0:
+            first_slot_items.append(url)
+            if len(first_slot_items) == 2:
+                raise TimeoutException("fixture timeout")
+        driver.get(url)
+        return url
+    start = time.perf_counter()
+    done = pool.run(urls, flaky_handler)
+    elapsed = time.perf_counter() - start
+    pool.close()
+    print(f"一个会话退避 {backoff_seconds} 秒: 其余 {len(done)}/{url_count - 1} 个链接在 {elapsed:.2f} 秒内完成")
+    assert len(done) == url_count - 1 and elapsed < backoff_seconds, elapsed
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_pipeline(url_count=24, workers=3, replies_per_tweet=120, batch_size=40, processes=2, sleep_scale=0.02):
+    """分阶段流水线：浏览器线程中解析和写出 vs 解析进程池 + 后台写入线程，对比总耗时、浏览器线程占用的 CPU 时间、输出是否一致和背压等待次数"""
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)  # 滚动后的随机等待代表浏览器 I/O，流水线模式下解析与之重叠
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    saved = autotwi.OVERSAMPLE_FACTOR, autotwi.REPLY_RETWEET_LIMIT, tweet_parser.PARSER_BACKEND, os.environ.get('TWEET_PARSER_BACKEND')
+    autotwi.OVERSAMPLE_FACTOR, autotwi.REPLY_RETWEET_LIMIT = None, 10000  # 不抽样，两种模式的输出可以逐条比较
+    tweet_parser.PARSER_BACKEND = os.environ['TWEET_PARSER_BACKEND'] = 'bs4'  # 解析进程也使用最慢的后端，让解析耗时更明显
+    pages, urls = build_tweet_site(url_count, replies_per_tweet=replies_per_tweet, quotes_per_tweet=replies_per_tweet // 2, batch_size=batch_size)
+    metrics = instrumentation.METRICS
+    print(f"浏览器会话 x{workers} | 每次滚动新出现 {batch_size} 条推文 | 随机等待按 {sleep_scale} 缩放 | 解析后端 bs4 | CPU 核数 {os.cpu_count()}")
+    print(f"{'模式':<24} | {'耗时(s)':>7} | {'浏览器线程 CPU(s)':>14} | {'输出':>5} | {'回复/引用':>9} | 背压等待")
+    baseline = None
+    for mode_name, parse_processes, write_queue in (('浏览器线程中解析和写出', 0, 0), (f'解析进程池 x{processes} + 后台写入', processes, 100), (f'解析进程池 x{processes} + 队列上限 1', processes, 1)):
+        autotwi.PARSER = ParsePool(parse_processes, max_pending=1 if write_queue == 1 else None) if parse_processes else None
+        metrics.reset()
+        cpu = []
+
+        def handler(driver, url):
+            started = time.thread_time()
+            autotwi.process_url_sequentially(driver, url, sink)
+            cpu.append(time.thread_time() - started)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            sink = open_sink(output_dir, 'jsonl', background=write_queue)
+            pool = BrowserPool(lambda: FakeDriver(pages), size=workers, pages_per_session=None)
+            start = time.perf_counter()
+            pool.run(urls, handler)
+            sink.close()
+            elapsed = time.perf_counter() - start
+            pool.close()
+            records = {record['post_url']: (sorted(reply['post_url'] for reply in record['replies']), sorted(quote['post_url'] for quote in record['retweets_with_comment']))
+                       for _, record in iter_records(output_dir)}
+        if autotwi.PARSER:
+            autotwi.PARSER.close()
+        baseline = baseline or records
+        children = sum(len(replies) + len(quotes) for replies, quotes in records.values())
+        same = '一致' if records == baseline else '不一致'
+        print(f"{mode_name:<24} | {elapsed:>7.2f} | {sum(cpu):>14.2f} | {len(records):>5} | {children:>5} {same} | {metrics.counters.get(instrumentation.COUNT_BACKPRESSURE, 0)}")
+    metrics.reset()
+    autotwi.PARSER = None
+    autotwi.OVERSAMPLE_FACTOR, autotwi.REPLY_RETWEET_LIMIT, tweet_parser.PARSER_BACKEND = saved[:3]
+    if saved[3] is None:
+        del os.environ['TWEET_PARSER_BACKEND']
+    else:
+        os.environ['TWEET_PARSER_BACKEND'] = saved[3]
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def bench_tweet_index(id_count=10000000, lookups=200000, task_count=4, urls_per_task=20, overlap=10, workers=3, sleep_scale=0.02, seed=5):
+    """全局推文索引：1000 万条推文 ID 在不同结构中的内存和查询耗时；多个任务搜索到重复帖子时，按任务去重 vs 全局去重打开的帖子页数"""
+    rng = random.Random(seed)
+    ids = array('q')
+    tweet_id = 1750000000000000000
+    for _ in range(id_count):
+        tweet_id += rng.randint(2, 1 << 20)  # 间隔至少为 2，ID + 1 一定不在索引中
+        ids.append(tweet_id)
+    hits = [ids[rng.randrange(id_count)] for _ in range(lookups // 2)]
+    queries = hits + [tweet_id + 1 for tweet_id in hits]
+    rng.shuffle(queries)
+
+    def url_of(tweet_id):
+        return f"https://x.com/user{tweet_id % 1000}/status/{tweet_id}"
+
+    def measure_lookups(contains, keys):
+        start = time.perf_counter()
+        found = sum(1 for key in keys if contains(key))
+        return (time.perf_counter() - start) / len(keys) * 1e9, found
+
+    rows = []
+    start = time.perf_counter()
+    urls = set(url_of(tweet_id) for tweet_id in ids)
+    built = time.perf_counter() - start
+    size = sys.getsizeof(urls) + sum(sys.getsizeof(url) for url in urls)
+    rows.append(('URL 字符串 set (原 seen_tweets)', size, built, *measure_lookups(urls.__contains__, [url_of(q) for q in queries])))
+    del urls
+    start = time.perf_counter()
+    numbers = set(ids)
+    built = time.perf_counter() - start
+    size = sys.getsizeof(numbers) + sum(sys.getsizeof(tweet_id) for tweet_id in numbers)
+    rows.append(('整数 set', size, built, *measure_lookups(numbers.__contains__, queries)))
+    del numbers
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'tweet_index.sqlite3')
+        start = time.perf_counter()
+        connection = sqlite3.connect(path)
+        connection.executescript(tweet_index.SCHEMA)
+        with connection:
+            connection.executemany("INSERT INTO tweets (tweet_id, task, claimed_at) VALUES (?, 'bench', 0)", ((tweet_id,) for tweet_id in ids))
+        connection.close()
+        written = time.perf_counter() - start
+        start = time.perf_counter()
+        index = TweetIndex(path)
+        loaded = time.perf_counter() - start
+        rows.append(('TweetIndex 排序 array(q) + 二分', sys.getsizeof(index.ids), loaded, *measure_lookups(index.__contains__, queries)))
+        exact = measure_lookups(lambda q: index.owner(q) is not None, queries[:lookups // 10])
+        disk = os.path.getsize(path)
+        index.close()
+    del ids
+
+    print(f"{id_count} 条推文 ID | 查询 {len(queries)} 次 (一半命中) | 内存按 sys.getsizeof 统计（含 set 中每个对象）")
+    print(f"{'结构':<30} | {'内存(MB)':>8} | {'每条(字节)':>9} | {'构建/加载(s)':>11} | {'查询(ns/次)':>10} | 命中")
+    for name, size, built, per_lookup, found in rows:
+        print(f"{name:<30} | {size / 1024 / 1024:>8.0f} | {size / id_count:>9.1f} | {built:>11.1f} | {per_lookup:>10.0f} | {found}")
+    print(f"SQLite 备份: 写入 {written:.1f}s | 文件 {disk / 1024 / 1024:.0f} MB | 精确查询归属 {exact[0] / 1000:.1f} us/次 (命中 {exact[1]})")
+
+    # --- 多个任务的搜索结果互相重叠：相邻任务共享 overlap 条帖子 ---
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    step = urls_per_task - overlap
+    pages, urls = build_tweet_site(step * (task_count - 1) + urls_per_task)
+    keywords = [f"overlap{t}" for t in range(task_count)]
+    for t, keyword in enumerate(keywords):
+        search_url = autotwi.build_search_url(keyword, '2024-05-01', '2024-05-02', autotwi.MIN_RETWEETS)
+        pages[search_url] = FakePage([pages[url].header_articles[0] for url in urls[t * step:t * step + urls_per_task]], batch_size=2)
+    drivers = []
+
+    def driver_factory():
+        drivers.append(FakeDriver(pages, latency=0.02))
+        return drivers[-1]
+
+    print(f"\n{task_count} 个任务各搜索到 {urls_per_task} 条帖子，相邻任务重叠 {overlap} 条（共 {len(urls)} 条不同的帖子）")
+    print(f"{'模式':<10} | {'耗时(s)':>7} | {'打开帖子页':>9} | {'输出记录':>7} | {'引用':>4}")
+    for mode_name, dedupe in (('按任务去重', False), ('全局去重', True)):
+        autotwi.GLOBAL_DEDUPE = dedupe
+        drivers.clear()
+        instrumentation.METRICS.reset()
+        with tempfile.TemporaryDirectory() as root:
+            autotwi.TWEET_INDEX_FILE = os.path.join(root, 'tweet_index.sqlite3')
+            ledger = JobLedger(os.path.join(root, 'ledger.sqlite3'))
+            pool = BrowserPool(driver_factory, size=workers, pages_per_session=None)
+            start = time.perf_counter()
+            autotwi.run_tasks(pool, ledger, [[keyword, '2024-05-01', '2024-05-02', os.path.join(root, keyword)] for keyword in keywords])
+            elapsed = time.perf_counter() - start
+            pool.close()
+            ledger.close()
+            records = sum(len(list(iter_records(os.path.join(root, keyword)))) for keyword in keywords)
+            references = sum(1 for keyword in keywords if os.path.exists(os.path.join(root, keyword, tweet_index.REFERENCES_FILE))
+                             for _ in open(os.path.join(root, keyword, tweet_index.REFERENCES_FILE), encoding='utf-8'))
+        opened = sum(1 for driver in drivers for url in driver.visited if '/status/' in url and not url.endswith('/quotes'))
+        print(f"{mode_name:<10} | {elapsed:>7.2f} | {opened:>9} | {records:>7} | {references:>4}")
+
+    # 登记重复帖子的任务采集失败并放弃：帖子应转交给只记录了引用的任务，仍然出现在某个任务的输出中
+    shared_url = urls[step]  # 任务 0 和任务 1 都搜索到的第一条帖子
+    process_url = autotwi.process_url_sequentially
+    failures_left = [BackoffPolicy().retry_budgets[FAILURE_TIMEOUT] + 1]  # 第一个领取它的任务用完全部重试
+
+    autotwi.GLOBAL_DEDUPE = True
+    with tempfile.TemporaryDirectory() as root:
+        def flaky_process_url(driver, url, sink, enrich=None):
+            if url == shared_url and failures_left[0]:
+                # 等任务 1 搜索到它并记录引用后再失败，否则帖子只是被撤销登记、由后搜索的任务正常领取
+                deadline = time.time() + 30
+                while not os.path.exists(os.path.join(root, keywords[1], tweet_index.REFERENCES_FILE)) and time.time() < deadline:
+                    time.sleep(0.01)
+                failures_left[0] -= 1
+                raise TimeoutException("fixture timeout")
+            return process_url(driver, url, sink, enrich)
+        autotwi.process_url_sequentially = flaky_process_url
+        autotwi.TWEET_INDEX_FILE = os.path.join(root, 'tweet_index.sqlite3')
+        ledger = JobLedger(os.path.join(root, 'ledger.sqlite3'))
+        pool = BrowserPool(driver_factory, size=workers, pages_per_session=None, backoff=BackoffPolicy(base_delays={FAILURE_TIMEOUT: 0}))
+        autotwi.run_tasks(pool, ledger, [[keyword, '2024-05-01', '2024-05-02', os.path.join(root, keyword)] for keyword in keywords])
+        pool.close()
+        holders = [keyword for keyword in keywords for _, record in iter_records(os.path.join(root, keyword)) if record['post_url'] == shared_url]
+        states = [state for keyword in keywords[:2] for key, _, _, state in ledger.jobs(os.path.join(root, keyword)) if key == shared_url.split('/')[-1]]
+        ledger.close()
+    print(f"领取者放弃采集后转交: 帖子保存在 {holders} | 两个任务台账中的状态 {sorted(states)}")
+    assert len(holders) == 1 and sorted(states) == ['done', 'failed'], (holders, states)
+    autotwi.process_url_sequentially = process_url
+    instrumentation.METRICS.reset()
+    autotwi.GLOBAL_DEDUPE = False
+    autotwi.TWEET_INDEX_FILE = tweet_index.TWEET_INDEX_FILE
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+def build_golden_record(case, user):
+    """按 fixtures/record_golden.json 中一项的输入构造记录，覆盖各脚本附加字段的方式
+
+    生成该文件时，同一段代码在改动前（每条推文一个字典）的版本上运行，expected 即当时写出的内容。
+    """
+    kind, data = case['kind'], case['input']
+    if kind == 'tweet':
+        # autotwi / trueauto 写出的源帖子：回复、引用、资料附加阶段的 profile、级联模式的 cascade
+        parse = lambda article_html: tweet_parser.parse_tweet_article(article_html, last_time=data['last_time'])
+        record = parse(data['source'])
+        record['replies'] = [parse(article_html) for article_html in data['replies']]
+        record['retweets_with_comment'] = [parse(article_html) for article_html in data['quotes']]
+        for tweet in [record] + record['replies'] + record['retweets_with_comment']:
+            tweet['profile'] = data['profiles'].get(tweet['user_id'])
+        if data.get('cascade'):
+            record['cascade'] = data['cascade']
+        return record
+    if kind == 'graphql':
+        return [network_capture.map_tweet_result(result, profile=data['profile']) for result in network_capture.iter_tweet_results(data['response'])]
+    if kind == 'timeline':
+        # user_autotwi 逐条写入 timelines 子文件夹的帖子
+        return [{"profile_user_id": data['user_id'], **tweet_parser.parse_profile_tweet(article_html)} for article_html in data['articles']]
+    driver = FakeDriver({f"https://x.com/{data['user_id']}": FakePage([], profile_html=data['profile_html'])})
+    record = user.fetch_profile(driver, data['user_id'])
+    record['scraped_timestamp'] = data['scraped_timestamp']  # 抓取时间随运行变化，固定后再比较
+    record['recent_tweets'] = [tweet_parser.parse_profile_tweet(article_html) for article_html in data['articles']]
+    return record
+
+def check_record_golden():
+    """各类记录按 JSON 文件 (indent=4) 和 JSONL 两种方式序列化，必须与 fixtures/record_golden.json 中改动前的输出逐字节一致；返回比较的记录数"""
+    user = load_script('user_autotwi.py')
+    user.time = ScaledTime(0)
+    cases = load_golden('record_golden')
+    mismatches = []
+    try:
+        for case in cases:
+            record = build_golden_record(case, user)
+            for options in ({'indent': 4}, {}):
+                if json.dumps(record, ensure_ascii=False, default=to_json, **options) != json.dumps(case['expected'], ensure_ascii=False, **options):
+                    mismatches.append(case['name'])
+    finally:
+        user.time = time
+    assert not mismatches, f"与改动前的字典输出不一致: {sorted(set(mismatches))}"
+    return len(cases)
+
+def bench_record_model(tweet_count=5000, url_count=6, replies_per_tweet=150, sleep_scale=0.0):
+    """推文记录：每条一个字典 vs __slots__ 记录 (tweet_model)，对比常驻内存、交给解析进程时的序列化大小和每个源帖子处理过程中的内存峰值
+
+    先校验各类记录写出的 JSON 与改动前保存的参照输出逐字节一致 (check_record_golden)。
+    """
+    print(f"与改动前的字典输出逐字节一致: {check_record_golden()} 类记录")
+    record = tweet_parser.parse_tweet_article(build_article_corpus()[0])
+    expected_emojis = record['emojis'] + ['🚀']
+    record['emojis'].append('🚀')  # 与字典一样，修改取出的列表会反映在写出的内容中
+    assert json.loads(json.dumps(record, default=to_json))['emojis'] == expected_emojis
+    build_record = tweet_parser._build_record
+    modes = (('字典', lambda *args: build_record(*args).to_dict()), ('__slots__ 记录', build_record))  # 字典模式按改动前的结构保存同样的字段，只用于比较内存
+    articles = [article_html for _, article_html in build_thread_articles(tweet_count)]
+    print(f"{tweet_count} 条回复推文 | 解析后端 {tweet_parser.PARSER_BACKEND} | 内存按 tracemalloc 统计")
+    print(f"{'记录结构':<14} | {'常驻内存(KB)':>11} | {'每条(字节)':>9} | {'pickle(KB)':>10}")
+    for mode_name, build in modes:
+        tweet_parser._build_record = build
+        tracemalloc.start()
+        records = [tweet_parser.parse_tweet_article(article_html) for article_html in articles]
+        resident = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{mode_name:<14} | {resident / 1024:>11.0f} | {resident / tweet_count:>9.0f} | {len(pickle.dumps(records)) / 1024:>10.0f}")
+        del records
+
+    # 完整处理源帖子：不抽样，所有回复和引用在写出前都留在内存中
+    autotwi = load_script('autotwi_V2.0.py')
+    autotwi.time = adaptive_wait.time = ScaledTime(sleep_scale)
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = False
+    saved = autotwi.OVERSAMPLE_FACTOR, autotwi.REPLY_RETWEET_LIMIT
+    autotwi.OVERSAMPLE_FACTOR, autotwi.REPLY_RETWEET_LIMIT = None, 10000
+    pages, urls = build_tweet_site(url_count, replies_per_tweet=replies_per_tweet, quotes_per_tweet=replies_per_tweet // 2, batch_size=replies_per_tweet // 3)  # 3 次滚动内取完
+    excluded = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, sys.modules[FakeDriver.__module__].__file__)]
+
+    def scraper_memory():
+        # 当前仍在内存中、且不是由伪浏览器或 tracemalloc 自身分配的内存
+        return sum(stat.size for stat in tracemalloc.take_snapshot().filter_traces(excluded).statistics('filename'))
+
+    def run(output_dir, held=None):
+        """逐个处理源帖子并写出 JSON，返回每个源帖子的内存峰值；held 不为 None 时在每次写出前记录采集数据的占用（快照本身会抬高峰值，所以分开运行）"""
+        sink = open_sink(output_dir)
+        write = sink.write
+        if held is not None:
+            def measured_write(record, key, filename=None):
+                held.append(scraper_memory() - baseline)
+                return write(record, key, filename)
+            sink.write = measured_write
+        driver = FakeDriver(pages)
+        random.seed(1)
+        peaks = []
+        tracemalloc.start()
+        for url in urls:
+            baseline = scraper_memory() if held is not None else 0
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            autotwi.process_url_sequentially(driver, url, sink)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        tracemalloc.stop()
+        sink.close()
+        return peaks
+
+    print(f"\n{url_count} 个源帖子，每个 {replies_per_tweet} 条回复 + {replies_per_tweet // 2} 条引用，逐个处理并写出 JSON")
+    print("写出时占用 = 写出前一刻仍在内存中的采集数据（不含伪浏览器生成的页面）；内存峰值包含伪浏览器页面")
+    print(f"{'记录结构':<14} | {'写出时占用(KB)':>13} | {'每个源帖子内存峰值(KB)':>20} | {'写出文件':>6}")
+    with tempfile.TemporaryDirectory() as root:
+        for mode_name, build in modes:
+            tweet_parser._build_record = build
+            output_dir = os.path.join(root, mode_name)
+            peaks = run(output_dir)
+            held = []
+            run(os.path.join(root, mode_name + '-snapshot'), held)
+            print(f"{mode_name:<14} | {sum(held) / len(held) / 1024:>13.0f} | {sum(peaks) / len(peaks) / 1024:>20.0f} | {len(os.listdir(output_dir)):>6}")
+    tweet_parser._build_record = build_record
+    autotwi.OVERSAMPLE_FACTOR, autotwi.REPLY_RETWEET_LIMIT = saved
+    autotwi.time = adaptive_wait.time = time
+    adaptive_wait.ADAPTIVE_SCROLL_WAIT = True
+
+BENCHMARKS = {
+    'incremental_collect': bench_incremental_collect,
+    'parser_backends': bench_parser_backends,
+    'browser_pool': bench_browser_pool,
+    'retweet_sessions': bench_retweet_sessions,
+    'user_batch': bench_user_batch,
+    'profile_cache': bench_profile_cache,
+    'user_timeline': bench_user_timeline,
+    'adaptive_wait': bench_adaptive_wait,
+    'output_sink': bench_output_sink,
+    'job_ledger': bench_job_ledger,
+    'crash_resume': bench_crash_resume,
+    'search_pipeline': bench_search_pipeline,
+    'search_shards': bench_search_shards,
+    'network_capture': bench_network_capture,
+    'retweet_cascade': bench_retweet_cascade,
+    'instrumentation': bench_instrumentation,
+    'early_stop': bench_early_stop,
+    'lean_browser': bench_lean_browser,
+    'session_manager': bench_session_manager,
+    'engagement_prefilter': bench_engagement_prefilter,
+    'tab_session': bench_tab_session,
+    'pipeline': bench_pipeline,
+    'tweet_index': bench_tweet_index,
+    'record_model': bench_record_model,
+    'suite': bench_suite,
+}
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"未知的基准名称 '{name}'，可选: {', '.join(BENCHMARKS)}")
+            continue
+        print(f"\n{'='*20} {name} {'='*20}")
+        BENCHMARKS[name]()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# 浏览器会话池：N 个长期存活、已加载 Cookies 的浏览器会话从同一个任务队列中领取工作
+import itertools
+import queue
+import random
+import threading
+import time
+
+from backoff import FAILURE_CRASH, FAILURE_LOGGED_OUT, BackoffPolicy, classify_failure
+from instrumentation import COUNT_BACKOFFS, COUNT_RETRIES, METRICS, STAGE_SESSION
+
+_worker_state = threading.local()
+
+def current_slot():
+    """在会话池的工作线程中返回该线程的槽位编号（从 0 开始），其他线程返回 None；driver_factory 可据此区分会话"""
+    return getattr(_worker_state, 'slot', None)
+
+class BrowserPool:
+    """固定数量的浏览器会话，每个会话由一个工作线程独占，跨链接、跨任务复用
+
+    driver_factory() 负责创建一个已登录的 driver（离线时可传入返回 FakeDriver 的函数）。
+    每个会话处理 pages_per_session 个任务后自动重启（None 表示不按数量重启）；浏览器崩溃或失效时只重启出问题的会话。
+    handler 抛出异常时按 backoff 策略分类：只有出错的会话暂停，链接在重试预算内重新排队，其他会话继续工作。
+    pace=(最短, 最长) 秒时，每个会话在两个任务之间各自随机暂停，代替全局的固定等待。
+    任务按 priority 从小到大领取（默认 0），相同优先级按提交顺序。
+    driver_factory 返回多标签页会话 (tab_session.TabDriver) 时，每个会话一次领取几个任务，并按 handler.prefetch(item) 在空闲标签页中预加载它们的链接；
+    会话失败进入退避时，尚未开始的任务放回共享队列，不跟着它一起等待。
+    任务的重试次数用完、被放弃时调用 handler.on_give_up(item, error)（handler 定义了该属性时），用于释放任务占用的资源。
+    页面掉线（跳转到登录页）时先调用 on_logged_out(driver) 集中刷新登录状态（见 session_manager.SessionManager），再重启该会话。
+    这些回调出错时只记录日志：工作线程继续运行，任务照常标记完成，run() 不会卡在 queue.join()。
+    """
+
+    def __init__(self, driver_factory, size=2, pages_per_session=50, name='浏览器', backoff=None, pace=None, on_logged_out=None):
+        self.driver_factory = driver_factory
+        self.size = max(1, size)
+        self.pages_per_session = pages_per_session
+        self.name = name
+        self.backoff = backoff or BackoffPolicy()
+        self.pace = pace
+        self.on_logged_out = on_logged_out
+        self.queue = queue.PriorityQueue()
+        self.sequence = itertools.count()  # 相同优先级的任务按提交顺序领取
+        self.drivers = [None] * self.size
+        self.pages_served = [0] * self.size
+        self.consecutive_failures = [0] * self.size
+        self.resume_at = [0.0] * self.size
+        self.sessions_started = 0
+        self.stats = [{'done': 0, 'failed': 0, 'busy': 0.0, 'sessions': 0} for _ in range(self.size)]  # 每个会话的吞吐量和错误统计
+        self.started_at = time.time()
+        self.results = []
+        self.failures = []
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def log(self, slot, message):
+        print(f"[{time.strftime('%H:%M:%S')}] {self.name}-{slot + 1}: {message}")
+
+    def submit(self, handler, item, attempts=0, priority=0):
+        """向共享队列追加一个任务，运行中的 handler 也可以调用它继续派发新任务；priority 越小越先被领取"""
+        self.queue.put((priority, next(self.sequence), handler, item, attempts))
+
+    def run(self, items=(), handler=None):
+        """把 items 交给 handler(driver, item) 并行处理，直到队列清空；返回所有 handler 的返回值"""
+        for item in items:
+            self.submit(handler, item)
+        self.stopping.clear()
+        self.started_at = time.time()
+        workers = [threading.Thread(target=self._worker, args=(slot,), daemon=True) for slot in range(self.size)]
+        for worker in workers:
+            worker.start()
+        self.queue.join()
+        self.stopping.set()
+        for _ in workers:
+            self.queue.put((float('inf'), next(self.sequence), None, None, 0))  # 排在所有任务之后的结束标记
+        for worker in workers:
+            worker.join()
+        with self.lock:
+            results, self.results = self.results, []
+        return results
+
+    def session(self, slot):
+        """返回该槽位的 driver，不存在或已到期时创建新会话"""
+        if self.drivers[slot] is not None and self.pages_per_session and self.pages_served[slot] >= self.pages_per_session:
+            self.log(slot, f"已处理 {self.pages_served[slot]} 个页面，重启浏览器会话。")
+            self.recycle(slot)
+        if self.drivers[slot] is None:
+            with METRICS.stage(STAGE_SESSION):
+                self.drivers[slot] = self.driver_factory()
+            self.pages_served[slot] = 0
+            with self.lock:
+                self.sessions_started += 1
+            self.stats[slot]['sessions'] += 1
+        return self.drivers[slot]
+
+    def recycle(self, slot):
+        """关闭该槽位的浏览器，下次领取任务时会重新创建"""
+        driver, self.drivers[slot] = self.drivers[slot], None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def is_alive(self, slot):
+        """通过一次轻量的 current_url 调用判断浏览器会话是否还活着"""
+        try:
+            self.drivers[slot].current_url
+            return True
+        except Exception:
+            return False
+
+    def _handle_failure(self, slot, handler, item, attempts, error, priority=0):
+        """分类失败原因，安排该会话退避，并在重试预算内把链接重新放回队列"""
+        driver = self.drivers[slot]
+        kind = classify_failure(error, driver)
+        if kind == FAILURE_CRASH or (driver is not None and not self.is_alive(slot)):
+            kind = FAILURE_CRASH
+            self.recycle(slot)
+        elif kind == FAILURE_LOGGED_OUT:
+            if self.on_logged_out:
+                self._callback(slot, 'on_logged_out', self.on_logged_out, driver)
+            self.recycle(slot)  # 重启后的会话会注入刷新后（或轮换到的其他账号）的 Cookies
+        self.consecutive_failures[slot] += 1
+        attempts += 1
+        give_up = not self.backoff.should_retry(kind, attempts)
+        if not give_up:
+            self.submit(handler, item, attempts, priority)
+            METRICS.count(COUNT_RETRIES)
+            outcome = f"已重新排队 (第 {attempts} 次失败)"
+        else:
+            with self.lock:
+                self.failures.append({"item": item, "kind": kind, "attempts": attempts, "error": str(error).strip()})
+            outcome = f"重试次数已用完，放弃 (共失败 {attempts} 次)"
+        delay = self.backoff.delay(kind, self.consecutive_failures[slot])
+        if delay:
+            METRICS.count(COUNT_BACKOFFS)
+        self.resume_at[slot] = time.time() + max(delay, self.pace_delay())
+        self.log(slot, f"[{kind}] 处理 {item} 失败: {str(error).strip()} | {outcome}" + (f" | 此会话退避 {delay:.0f} 秒" if delay else ""))
+        if give_up and hasattr(handler, 'on_give_up'):
+            self._callback(slot, 'on_give_up', handler.on_give_up, item, error)
+
+    def _callback(self, slot, name, callback, *args):
+        """调用 handler 或会话池的回调，出错时记录日志而不是让异常结束工作线程"""
+        try:
+            callback(*args)
+        except Exception as e:
+            self.log(slot, f"{name} 回调出错: {str(e).strip()}")
+
+    def pace_delay(self):
+        return random.uniform(*self.pace) if self.pace else 0
+
+    def _worker(self, slot):
+        _worker_state.slot = slot
+        while True:
+            self._wait_turn(slot)
+            entry = self.queue.get()
+            if entry[2] is None:
+                self.queue.task_done()
+                return
+            batch = [entry] + self._lookahead(slot)
+            for index, entry in enumerate(batch):
+                if index and self._backing_off(slot):
+                    self._requeue(batch[index:])
+                    break
+                try:
+                    if index:
+                        self._wait_turn(slot)
+                    self._prefetch(slot, batch[index:])
+                    self._run(slot, *entry)
+                except Exception as e:  # 失败处理本身出错：记录后继续领取任务，工作线程不能退出
+                    self.log(slot, f"处理 {entry[3]} 时出现未处理的异常: {str(e).strip()}")
+                finally:
+                    self.queue.task_done()
+            release = getattr(self.drivers[slot], 'release', None)
+            if release:
+                release()
+
+    def _wait_turn(self, slot):
+        wait = self.resume_at[slot] - time.time()
+        if wait > 0 and not self.stopping.wait(wait) and self.consecutive_failures[slot]:
+            self.log(slot, "退避结束，继续领取任务。")
+
+    def _backing_off(self, slot):
+        """该会话刚失败、正在退避"""
+        return self.consecutive_failures[slot] and self.resume_at[slot] > time.time()
+
+    def _requeue(self, entries):
+        """把多领取、尚未开始的任务按原来的优先级和顺序放回共享队列，交给其他会话"""
+        for entry in entries:
+            self.queue.put(entry)
+            self.queue.task_done()
+
+    def _lookahead(self, slot):
+        """多标签页会话 (tab_session.TabDriver) 一次多领取几个任务，在空闲标签页中预加载；队列较短时不多领，以免其他会话闲着"""
+        tabs = getattr(self.drivers[slot], 'tabs', 1)
+        extra = []
+        while len(extra) < min(tabs - 1, self.queue.qsize() // self.size):
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry[2] is None:  # 结束标记属于其他工作线程，放回队列
+                self.queue.put(entry)
+                self.queue.task_done()
+                break
+            extra.append(entry)
+        return extra
+
+    def _prefetch(self, slot, entries):
+        """让空闲标签页预先加载当前及后面几个任务会打开的链接（handler.prefetch(item) 返回链接列表）"""
+        prefetch = getattr(self.drivers[slot], 'prefetch', None)
+        if prefetch is None:
+            return
+        try:
+            for _, _, handler, item, _ in entries:
+                for url in getattr(handler, 'prefetch', lambda item: ())(item):
+                    prefetch(url)
+        except Exception:
+            pass  # 预加载失败不影响任务本身，浏览器失效时由任务报告
+
+    def _run(self, slot, priority, sequence, handler, item, attempts):
+        started = time.time()
+        METRICS.begin(item, f"{self.name}-{slot + 1}")
+        try:
+            driver = self.session(slot)
+            self.pages_served[slot] += 1
+            result = handler(driver, item)
+        except Exception as e:
+            self.stats[slot]['failed'] += 1
+            self.stats[slot]['busy'] += time.time() - started
+            self._handle_failure(slot, handler, item, attempts, e, priority)
+            METRICS.end('failed', e)
+            return
+        METRICS.end()
+        self.stats[slot]['done'] += 1
+        self.stats[slot]['busy'] += time.time() - started
+        with self.lock:
+            self.results.append(result)
+        self.consecutive_failures[slot] = 0
+        self.resume_at[slot] = time.time() + self.pace_delay()
+        if not self.is_alive(slot):
+            self.log(slot, "浏览器会话已失效，将在下一个任务前重启。")
+            self.recycle(slot)
+
+    def report(self):
+        """打印每个会话的吞吐量（按本次 run 的总耗时计算）、错误率和重启次数"""
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        print(f"\n--- 浏览器会话统计 (共 {elapsed:.0f} 秒) ---")
+        for slot, stats in enumerate(self.stats):
+            attempts = stats['done'] + stats['failed']
+            error_rate = stats['failed'] / attempts if attempts else 0
+            print(f"{self.name}-{slot + 1}: 成功 {stats['done']} | 失败 {stats['failed']} ({error_rate:.1%}) | {stats['done'] / elapsed * 3600:.0f} 个/小时 | "
+                  f"平均每个任务 {stats['busy'] / attempts if attempts else 0:.1f} 秒 | 启动浏览器 {stats['sessions']} 次")
+
+    def close(self):
+        for slot in range(self.size):
+            self.recycle(slot)
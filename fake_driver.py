@@ -0,0 +1,633 @@
+# 离线基准/调试用的伪 WebDriver：无需真实的 X 账号和浏览器即可驱动采集函数
+import html
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from urllib.parse import unquote
+
+from selenium.common.exceptions import NoSuchElementException, NoSuchWindowException, TimeoutException, WebDriverException
+
+from backoff import FAILURE_CRASH, FAILURE_RATE_LIMIT, LOGGED_OUT_MARKERS, RATE_LIMIT_MARKERS
+from tweet_model import IP_LOCATION_NA
+from tweet_parser import parse_tweet_article
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')  # 由原始实现生成的参照输出
+PAGE_HEIGHT_PER_ARTICLE = 600  # 每条推文在伪页面中占用的高度（像素）
+
+def build_article_html(tweet_id, user_id='fixture_user', nickname=None, text='', post_time='2024-05-01T12:00:00.000Z', reply_count=0, retweet_count=0, like_count=0, hashtags=(), emojis=(), mentions=()):
+    """生成一段与 X 页面结构一致的单条推文 'article' HTML 片段"""
+    nickname = nickname or user_id
+    href = f"/{user_id}/status/{tweet_id}"
+    text_parts = [f"<span>{html.escape(text)}</span>"] if text else []
+    text_parts += [f'<div class="css-175oi2r r-xoduu5"><span><a href="/{html.escape(mention)}" role="link">@{html.escape(mention)}</a></span></div>' for mention in mentions]
+    text_parts += [f'<a href="/hashtag/{html.escape(tag)}" dir="ltr">#{html.escape(tag)}</a>' for tag in hashtags]
+    text_parts += [f'<img alt="{emoji}" src="https://abs-0.twimg.com/emoji/v2/svg/1f600.svg">' for emoji in emojis]
+
+    def metric_button(testid, count, label):
+        return f'<button data-testid="{testid}" aria-label="{count:,} {label}. {label}" role="button"><div><span><span>{count}</span></span></div></button>'
+
+    article_html = (
+        '<article data-testid="tweet" role="article" tabindex="0">'
+        f'<div data-testid="User-Name"><a href="/{user_id}" role="link"><div><span><span>{html.escape(nickname)}</span></span></div></a>'
+        f'<a href="/{user_id}" role="link" tabindex="-1"><div><span>@{user_id}</span></div></a>'
+        f'<a href="{href}" role="link"><time datetime="{post_time}">May 1</time></a></div>'
+        f'<div data-testid="tweetText" lang="en" dir="auto">{"".join(text_parts)}</div>'
+        '<div role="group">'
+        f'{metric_button("reply", reply_count, "Replies")}'
+        f'{metric_button("retweet", retweet_count, "reposts")}'
+        f'{metric_button("like", like_count, "Likes")}'
+        '</div></article>'
+    )
+    return href, article_html
+
+def build_tweet_result(tweet_id, user_id='fixture_user', nickname=None, text='', post_time='2024-05-01T12:00:00.000Z', reply_count=0, retweet_count=0, like_count=0, hashtags=(), emojis=(), mentions=(), quote_count=0):
+    """生成与 build_article_html 同一条推文对应的 GraphQL 推文对象（时间线 JSON 响应中的结构）
+
+    页面上的转发按钮按 retweet_count 显示；quote_count 只出现在接口数据中。
+    """
+    full_text = ' '.join([text] * bool(text) + [f"@{mention}" for mention in mentions] + [f"#{tag}" for tag in hashtags] + list(emojis))
+    hashtag_entities, mention_entities = [], []
+    for tag in hashtags:
+        start = full_text.index(f"#{tag}")
+        hashtag_entities.append({"indices": [start, start + len(tag) + 1], "text": tag})
+    for mention in mentions:
+        start = full_text.index(f"@{mention}")
+        mention_entities.append({"indices": [start, start + len(mention) + 1], "screen_name": mention})
+    created_at = datetime.strptime(post_time, '%Y-%m-%dT%H:%M:%S.000Z').strftime('%a %b %d %H:%M:%S +0000 %Y')
+    return {
+        "__typename": "Tweet", "rest_id": str(tweet_id),
+        "core": {"user_results": {"result": {"__typename": "User", "legacy": {"screen_name": user_id, "name": nickname or user_id}}}},
+        "legacy": {"created_at": created_at, "full_text": html.escape(full_text, quote=False), "display_text_range": [0, len(html.escape(full_text, quote=False))],
+                   "entities": {"hashtags": hashtag_entities, "urls": [], "user_mentions": mention_entities},
+                   "reply_count": reply_count, "retweet_count": retweet_count, "quote_count": quote_count, "favorite_count": like_count, "id_str": str(tweet_id)},
+    }
+
+def build_timeline_response(results, operation='TweetDetail'):
+    """把推文对象包装成一个时间线响应（TweetDetail 为帖子详情页，SearchTimeline 为搜索/引用页）"""
+    entries = [{"entryId": f"tweet-{result['rest_id']}", "content": {"entryType": "TimelineTimelineItem", "itemContent": {"itemType": "TimelineTweet", "tweet_results": {"result": result}}}} for result in results]
+    entries.append({"entryId": "cursor-bottom-0", "content": {"entryType": "TimelineTimelineCursor", "value": "fixture-cursor", "cursorType": "Bottom"}})
+    instructions = [{"type": "TimelineAddEntries", "entries": entries}]
+    if operation == 'TweetDetail':
+        return {"data": {"threaded_conversation_with_injections_v2": {"instructions": instructions}}}
+    return {"data": {"search_by_raw_query": {"search_timeline": {"timeline": {"instructions": instructions}}}}}
+
+def build_recorded_tweet_detail():
+    """按真实 TweetDetail 响应结构整理的边界用例，返回 (响应, 期望的 map_tweet_result 输出列表)
+
+    覆盖：TweetWithVisibilityResults 包装、新版 user.core 字段、开头的 @回复对象、t.co 链接与媒体短链、HTML 实体、
+    长推文 note_tweet、带引用的推文（被引用的原帖不单独出现）、转推（映射为原推文）、会话模块和游标条目。
+    """
+    def user(screen_name, name, new_layout=False):
+        if new_layout:
+            return {"user_results": {"result": {"__typename": "User", "core": {"screen_name": screen_name, "name": name}, "legacy": {"followers_count": 10}}}}
+        return {"user_results": {"result": {"__typename": "User", "legacy": {"screen_name": screen_name, "name": name}}}}
+
+    focal_text = "Breaking &amp; important: details at https://t.co/abc123 #News #Update 🚀 https://t.co/media1"
+    focal = {"__typename": "TweetWithVisibilityResults", "tweet": {
+        "__typename": "Tweet", "rest_id": "1790000000000000001", "core": user("newsdesk", "News Desk ✓", new_layout=True),
+        "legacy": {"created_at": "Thu May 02 08:30:15 +0000 2024", "full_text": focal_text, "display_text_range": [0, len(focal_text) - len(" https://t.co/media1")],
+                   "entities": {"hashtags": [{"text": "News"}, {"text": "Update"}], "urls": [{"url": "https://t.co/abc123", "display_url": "example.com/story…", "expanded_url": "https://example.com/story"}],
+                                "media": [{"url": "https://t.co/media1", "type": "photo"}]},
+                   "reply_count": 1532, "retweet_count": 12873, "quote_count": 421, "favorite_count": 98765}}}
+    reply_text = "@newsdesk @other Thanks for the update"
+    reply = {"__typename": "Tweet", "rest_id": "1790000000000000002", "core": user("reader_1", "Reader One"),
+             "legacy": {"created_at": "Thu May 02 09:00:00 +0000 2024", "full_text": reply_text, "display_text_range": [len("@newsdesk @other "), len(reply_text)],
+                        "entities": {"hashtags": [], "urls": []}, "reply_count": 0, "retweet_count": 0, "quote_count": 0, "favorite_count": 3}}
+    long_reply = {"__typename": "Tweet", "rest_id": "1790000000000000003", "core": user("long_writer", "Long Writer"),
+                  "legacy": {"created_at": "Thu May 02 09:05:00 +0000 2024", "full_text": "This is the truncated version…", "display_text_range": [0, 30],
+                             "entities": {"hashtags": [], "urls": []}, "reply_count": 2, "retweet_count": 1, "quote_count": 0, "favorite_count": 40},
+                  "note_tweet": {"note_tweet_results": {"result": {"text": "This is the full long text of a note tweet with a link https://t.co/long1 at the end.",
+                                                                   "entity_set": {"urls": [{"url": "https://t.co/long1", "display_url": "long.example/x"}]}}}}}
+    quote = {"__typename": "Tweet", "rest_id": "1790000000000000004", "core": user("quoter", "Quoter 😀"),
+             "legacy": {"created_at": "Thu May 02 10:00:00 +0000 2024", "full_text": "Quoting this 😀", "display_text_range": [0, 14],
+                        "entities": {"hashtags": [], "urls": []}, "reply_count": 0, "retweet_count": 5, "quote_count": 1, "favorite_count": 12},
+             "quoted_status_result": {"result": focal["tweet"]}}
+    retweet = {"__typename": "Tweet", "rest_id": "1790000000000000005", "core": user("retweeter", "Retweeter"),
+               "legacy": {"created_at": "Thu May 02 11:00:00 +0000 2024", "full_text": "RT @original: original text", "entities": {"hashtags": [], "urls": []},
+                          "reply_count": 0, "retweet_count": 0, "quote_count": 0, "favorite_count": 0,
+                          "retweeted_status_result": {"result": {"__typename": "Tweet", "rest_id": "1780000000000000009", "core": user("original", "Original"),
+                                                                 "legacy": {"created_at": "Wed May 01 23:59:59 +0000 2024", "full_text": "original text", "display_text_range": [0, 13],
+                                                                            "entities": {"hashtags": [], "urls": []}, "reply_count": 7, "retweet_count": 70, "quote_count": 0, "favorite_count": 700}}}}}
+    module_item = lambda result: {"entryId": f"conversationthread-{result['rest_id']}", "item": {"itemContent": {"itemType": "TimelineTweet", "tweet_results": {"result": result}}}}
+    response = {"data": {"threaded_conversation_with_injections_v2": {"instructions": [
+        {"type": "TimelineClearCache"},
+        {"type": "TimelineAddEntries", "entries": [
+            {"entryId": "tweet-1790000000000000001", "content": {"entryType": "TimelineTimelineItem", "itemContent": {"itemType": "TimelineTweet", "tweet_results": {"result": focal}}}},
+            {"entryId": "conversationthread-1", "content": {"entryType": "TimelineTimelineModule", "items": [module_item(reply), module_item(long_reply)]}},
+            {"entryId": "tweet-1790000000000000004", "content": {"entryType": "TimelineTimelineItem", "itemContent": {"tweet_results": {"result": quote}}}},
+            {"entryId": "tweet-1790000000000000005", "content": {"entryType": "TimelineTimelineItem", "itemContent": {"tweet_results": {"result": retweet}}}},
+            {"entryId": "tweet-tombstone", "content": {"entryType": "TimelineTimelineItem", "itemContent": {"tweet_results": {"result": {"__typename": "TweetTombstone"}}}}},
+            {"entryId": "cursor-bottom-1", "content": {"entryType": "TimelineTimelineCursor", "value": "abc", "cursorType": "Bottom"}},
+        ]},
+    ]}}}
+    na = IP_LOCATION_NA
+    expected = [
+        {"nickname": "News Desk ✓", "user_id": "newsdesk", "platform": "X", "post_time": "2024-05-02T08:30:15.000Z", "ip_location": na, "hashtags": "#News, #Update",
+         "post_text": "Breaking & important: details at\nexample.com/story…\n#News\n#Update\n🚀", "emojis": ["🚀"], "reply_count": 1532, "retweet_count": 12873, "like_count": 98765,
+         "post_url": "https://x.com/newsdesk/status/1790000000000000001"},
+        {"nickname": "Reader One", "user_id": "reader_1", "platform": "X", "post_time": "2024-05-02T09:00:00.000Z", "ip_location": na, "hashtags": "",
+         "post_text": "Thanks for the update", "emojis": [], "reply_count": 0, "retweet_count": 0, "like_count": 3, "post_url": "https://x.com/reader_1/status/1790000000000000002"},
+        {"nickname": "Long Writer", "user_id": "long_writer", "platform": "X", "post_time": "2024-05-02T09:05:00.000Z", "ip_location": na, "hashtags": "",
+         "post_text": "This is the full long text of a note tweet with a link\nlong.example/x\nat the end.", "emojis": [], "reply_count": 2, "retweet_count": 1, "like_count": 40,
+         "post_url": "https://x.com/long_writer/status/1790000000000000003"},
+        {"nickname": "Quoter 😀", "user_id": "quoter", "platform": "X", "post_time": "2024-05-02T10:00:00.000Z", "ip_location": na, "hashtags": "",
+         "post_text": "Quoting this\n😀", "emojis": ["😀"], "reply_count": 0, "retweet_count": 5, "like_count": 12, "post_url": "https://x.com/quoter/status/1790000000000000004"},
+        {"nickname": "Original", "user_id": "original", "platform": "X", "post_time": "2024-05-01T23:59:59.000Z", "ip_location": na, "hashtags": "",
+         "post_text": "original text", "emojis": [], "reply_count": 7, "retweet_count": 70, "like_count": 700, "post_url": "https://x.com/original/status/1780000000000000009"},
+    ]
+    return response, expected
+
+def _thread_params(count, start_id, user_prefix):
+    return [
+        dict(tweet_id=start_id + i, user_id=f"{user_prefix}{i % 97}", text=f"fixture reply number {i} with some words",
+             reply_count=i % 13, retweet_count=(i * 7) % 31, like_count=(i * 11) % 1200,
+             hashtags=('fixture',) if i % 5 == 0 else (), emojis=('😀',) * (1 + (i % 6 == 0)) if i % 3 == 0 else (),
+             mentions=(f"{user_prefix}{(i + 1) % 97}",) if i % 7 == 0 else ())
+        for i in range(count)
+    ]
+
+def build_thread_articles(count, start_id=1800000000000000000, user_prefix='reply_user'):
+    """批量生成 count 条回复推文，用作可无限滚动的帖子/搜索页面"""
+    return [build_article_html(**params) for params in _thread_params(count, start_id, user_prefix)]
+
+def build_thread_results(count, start_id=1800000000000000000, user_prefix='reply_user'):
+    """与 build_thread_articles 相同的 count 条推文的 GraphQL 推文对象"""
+    return [build_tweet_result(**params) for params in _thread_params(count, start_id, user_prefix)]
+
+def build_article_corpus():
+    """解析器一致性校验用的 article fixture 集合：常规推文 + 各种边界结构"""
+    corpus = [article_html for _, article_html in build_thread_articles(40)]
+    time_link = '<a href="/edge_user/status/{id}" role="link"><time datetime="2024-05-02T08:30:00.000Z">May 2</time></a>'
+    user_name = '<div data-testid="User-Name"><a href="/edge_user"><div><span><span>Edge &amp; User</span> <span>✓</span></span></div></a>' + time_link + '</div>'
+    edge_bodies = [
+        # 只显示缩写数字、aria-label 中没有数字
+        user_name + '<div data-testid="tweetText"><span>K/M counts</span></div><div role="group"><button data-testid="reply" aria-label="Reply"><span>1.2K</span></button><button data-testid="retweet" aria-label="Repost"><span>3M</span></button><button data-testid="like" aria-label="Like"><span> 17 </span></button></div>',
+        # 千位分隔符和“万”只能由宽松解析识别
+        user_name + '<div data-testid="tweetText">中文 推文</div><div role="group"><button data-testid="reply"><span>1,234</span></button><button data-testid="retweet"><span>2.5万</span></button><button data-testid="like"><span></span></button></div>',
+        # 互动数据在 div 而不是 button 上，且缺少点赞
+        user_name + '<div data-testid="tweetText"><span>div metrics</span></div><div data-testid="reply" aria-label="5 replies"></div><div data-testid="retweet"><span>9</span></div>',
+        # 正文中的注释、实体、空白、空 alt 与无 alt 的图片
+        user_name + '<div data-testid="tweetText">  line one &lt;b&gt; &amp;\n <!-- hidden --> <span> line two </span><img alt=""><img src="x.png"><img alt="🔥">tail 🎉 text<a href="/hashtag/边界?src=hashtag_click"><span>#</span>边界</a></div>',
+        # 带引用推文：两个 time、两个正文
+        user_name + '<div data-testid="tweetText"><span>outer</span></div><div role="link"><div data-testid="User-Name"><span>Quoted</span></div><a href="/quoted_user/status/{qid}"><time datetime="2023-01-01T00:00:00.000Z">Jan 1</time></a><div data-testid="tweetText"><span>inner quoted text #x</span><a href="/hashtag/quoted">#quoted</a></div></div><div role="group"><button data-testid="like" aria-label="1,024 Likes. Like"></button></div>',
+        # 没有 User-Name
+        time_link + '<div data-testid="tweetText"><span>no user name</span></div>',
+        # User-Name 中没有 span
+        '<div data-testid="User-Name"><a href="/edge_user">Plain</a></div>' + time_link + '<div data-testid="tweetText">no span</div>',
+        # 无法解析的缩写文本
+        user_name + '<div data-testid="tweetText">bad metric</div><button data-testid="reply"><span>K</span></button>',
+        # 没有正文
+        user_name,
+        # time 不在链接中
+        '<div data-testid="User-Name"><span>x</span></div><time datetime="2024-05-02T08:30:00.000Z">May 2</time>',
+        # 没有 time
+        '<div data-testid="tweetText">no time at all</div>',
+        # time 缺少 datetime 属性
+        '<a href="/edge_user/status/{id}"><time>May 2</time></a>',
+    ]
+    for i, body in enumerate(edge_bodies):
+        corpus.append('<article data-testid="tweet" role="article">' + body.format(id=1700000000000000000 + i, qid=1600000000000000000 + i) + '</article>')
+    return corpus
+
+def load_golden(name):
+    """读取 fixtures/{name}.json 中保存的参照输出
+
+    parser_golden.json: 每项为一段 article HTML 及原 autotwi / trueauto / user_autotwi 中 parse_tweet_article 对它的解析结果（无法解析时为 null）。
+    record_golden.json: 每项为一组输入（kind 为 tweet / graphql / timeline / user）及改动前（每条推文一个字典）按这些输入构造出的记录，由 benchmark.build_golden_record 生成；graphql 项的正文和转发数已按与 DOM 解析一致的映射更新。
+    """
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class FakePage:
+    """一个可滚动的伪页面：固定的头部推文 + 每次滚动追加一批推文（页面内容只读，可被多个 FakeDriver 共享）
+
+    results / header_results 为与推文一一对应的 GraphQL 推文对象；提供时，页面加载和每次滚动都会产生一个 operation 时间线响应。
+    """
+
+    def __init__(self, articles, header_articles=(), batch_size=10, window=None, results=None, header_results=(), operation='TweetDetail', profile_html=''):
+        self.profile_html = profile_html  # 用户主页顶部的资料区域
+        self.header_articles = list(header_articles)
+        self.articles = list(articles)
+        self.results = results
+        self.header_results = list(header_results)
+        self.operation = operation
+        self.batch_size = batch_size
+        self.window = window  # 模拟虚拟列表：只保留最近加载的 window 条推文在DOM中；None 表示全部保留
+
+    def initial_loaded(self):
+        return min(self.batch_size, len(self.articles))
+
+    def scrolled(self, loaded):
+        return min(loaded + self.batch_size, len(self.articles))
+
+    def visible_articles(self, loaded):
+        start = 0 if self.window is None else max(0, loaded - self.window)
+        return self.header_articles + self.articles[start:loaded]
+
+    def scroll_height(self, loaded):
+        return (len(self.header_articles) + loaded) * PAGE_HEIGHT_PER_ARTICLE
+
+    def render(self, loaded):
+        body = "".join(article_html for _, article_html in self.visible_articles(loaded))
+        return f'<html><head><title>X</title></head><body><main role="main">{self.profile_html}<section>{body}</section></main></body></html>'
+
+RATE_LIMIT_PAGE = FakePage([], profile_html=f'<div><span>{RATE_LIMIT_MARKERS[1]}</span></div>')  # 频率限制时显示的错误页面
+LOGIN_WALL_PAGE = FakePage([], profile_html=f'<div><a href="/login" {LOGGED_OUT_MARKERS[0]}>登录</a></div>')  # 登录失效后跳转到的登录页
+LOGIN_WALL_URL = 'https://x.com/i/flow/login'
+
+def build_search_site(tweet_count, start_date='2024-05-01', days=7, max_results=40, batch_size=10):
+    """生成一个模拟搜索结果深度限制的伪搜索站点，返回 (page_factory, 范围内的全部帖子链接)
+
+    tweet_count 条帖子均匀分布在 days 天内；任意 since:/until: 或 since_time:/until_time: 搜索
+    只返回窗口内互动量最高的 max_results 条，与真实搜索时间线“提前枯竭”的表现一致。
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    step = timedelta(days=days) / tweet_count
+    tweets = []
+    for i in range(tweet_count):
+        post_time = start + step * i
+        href, article_html = build_article_html(1900000000000000000 + i, user_id='search_user', text=f"fixture search result {i}",
+                                                post_time=post_time.strftime('%Y-%m-%dT%H:%M:%S.000Z'), retweet_count=(i * 37) % 500, like_count=(i * 53) % 5000)
+        tweets.append((post_time, (i * 37) % 500, (href, article_html)))
+
+    def parse_bound(query, name):
+        match = re.search(rf'{name}_time:(\d+)', query)
+        if match:
+            return datetime(1970, 1, 1) + timedelta(seconds=int(match.group(1)))
+        return datetime.strptime(re.search(rf'{name}:(\d{{4}}-\d{{2}}-\d{{2}})', query).group(1), '%Y-%m-%d')
+
+    def page_factory(url):
+        if '/search?' not in url:
+            return None
+        query = unquote(url)
+        since, until = parse_bound(query, 'since'), parse_bound(query, 'until')
+        in_window = sorted((t for t in tweets if since <= t[0] < until), key=lambda t: -t[1])[:max_results]
+        return FakePage([article for _, _, article in in_window], batch_size=batch_size)
+
+    return page_factory, ["https://x.com" + href for _, _, (href, _) in tweets]
+
+def build_tweet_site(count, replies_per_tweet=30, quotes_per_tweet=10, batch_size=10, start_id=1750000000000000000):
+    """生成 count 个源帖子的伪站点，返回 (pages, 帖子链接列表)
+
+    帖子页 = 源帖子 + 可滚动的回复；帖子链接 + '/quotes' = 可滚动的引用推文。
+    """
+    pages, urls = {}, []
+    for i in range(count):
+        href, source_html = build_article_html(
+            start_id + i, user_id='source_user', text=f"fixture source tweet {i}",
+            reply_count=replies_per_tweet, retweet_count=quotes_per_tweet, like_count=1000 + i,
+        )
+        url = "https://x.com" + href
+        urls.append(url)
+        source_result = build_tweet_result(
+            start_id + i, user_id='source_user', text=f"fixture source tweet {i}",
+            reply_count=replies_per_tweet, retweet_count=quotes_per_tweet, like_count=1000 + i, quote_count=quotes_per_tweet,
+        )
+        reply_args = (replies_per_tweet, 1810000000000000000 + i * 10000, 'reply_user')
+        quote_args = (quotes_per_tweet, 1820000000000000000 + i * 10000, 'quote_user')
+        pages[url] = FakePage(build_thread_articles(*reply_args), header_articles=[(href, source_html)], batch_size=batch_size,
+                              results=build_thread_results(*reply_args), header_results=[source_result])
+        pages[url + '/quotes'] = FakePage(build_thread_articles(*quote_args), batch_size=batch_size, results=build_thread_results(*quote_args), operation='SearchTimeline')
+    return pages, urls
+
+CASCADE_BASE_ID = 2100000000000000000
+CASCADE_TREE_SPAN = 10 ** 9  # 每棵传播树占用的推文ID范围
+
+def cascade_child_ids(tweet_id, branching, k=None):
+    """返回 build_cascade_site 中一条推文转发量最高的前 k 条（默认全部）引用推文的ID"""
+    tree, n = divmod(tweet_id - CASCADE_BASE_ID, CASCADE_TREE_SPAN)
+    return [CASCADE_BASE_ID + tree * CASCADE_TREE_SPAN + n * branching + 1 + j for j in range(branching if k is None else k)]
+
+def build_cascade_site(roots, branching=4, replies=5, batch_size=10):
+    """生成 roots 棵无限深的引用传播树，返回 (page_factory, 根帖子的第一阶段记录列表)
+
+    每棵树中第 n 个节点的引用页列出 n * branching + 1 ... n * branching + branching 号节点，
+    转发量按序号递减，因此前 K 条引用推文就是前 K 个子节点；推文ID见 cascade_child_ids。
+    """
+    def node_article(tweet_id, text):
+        n = (tweet_id - CASCADE_BASE_ID) % CASCADE_TREE_SPAN
+        return build_article_html(tweet_id, user_id='cascade_user', text=text, retweet_count=(branching - (n - 1) % branching) * 100 + n % 7, like_count=n % 1000)
+
+    def quote_articles(tweet_id):
+        return [node_article(child_id, f"fixture cascade quote {child_id}") for child_id in cascade_child_ids(tweet_id, branching)]
+
+    def page_factory(url):
+        match = re.search(r'/cascade_user/status/(\d+)(/quotes)?$', url)
+        if not match:
+            return None
+        tweet_id = int(match.group(1))
+        if match.group(2):
+            return FakePage(quote_articles(tweet_id), batch_size=batch_size)
+        return FakePage(build_thread_articles(replies, 1830000000000000000 + tweet_id % 10 ** 12 * 10, 'cascade_reply'),
+                        header_articles=[node_article(tweet_id, f"fixture cascade node {tweet_id}")], batch_size=batch_size)
+
+    seed_records = []
+    for tree in range(roots):
+        tweet_id = CASCADE_BASE_ID + tree * CASCADE_TREE_SPAN
+        _, article_html = node_article(tweet_id, f"fixture cascade node {tweet_id}")
+        record = parse_tweet_article(article_html)
+        record['retweets_with_comment'] = [parse_tweet_article(quote_html) for _, quote_html in quote_articles(tweet_id)]
+        seed_records.append(record)
+    return page_factory, seed_records
+
+def build_profile_html(user_id, nickname=None, bio='', following=0, followers=0):
+    """生成与 X 用户主页结构一致的资料区域 HTML"""
+    return (
+        f'<div data-testid="UserName"><div><span><span>{html.escape(nickname or user_id)}</span></span></div>'
+        f'<div data-testid="UserScreenName"><span>@{user_id}</span></div></div>'
+        f'<div data-testid="UserDescription"><span>{html.escape(bio)}</span></div>'
+        '<div><span data-testid="UserLocation"><span>Fixture City</span></span><span data-testid="UserJoinDate"><span>Joined May 2020</span></span></div>'
+        f'<a href="/{user_id}/following"><span><span>{following:,}</span></span><span>Following</span></a>'
+        f'<a href="/{user_id}/verified_followers"><span><span>{followers:,}</span></span><span>Followers</span></a>'
+    )
+
+def profile_page_factory(url):
+    """任意 https://x.com/{用户ID} 链接都返回该用户的主页（资料区域由用户ID确定性生成，没有推文）"""
+    match = re.fullmatch(r'https://x\.com/(\w+)/?', url)
+    if not match or match.group(1) in ('search', 'home', 'login'):
+        return None
+    user_id = match.group(1)
+    seed = sum(map(ord, user_id))
+    return FakePage([], profile_html=build_profile_html(user_id, bio=f"fixture bio of {user_id}", following=seed % 500, followers=seed * 37))
+
+def build_profile_site(user_count, tweets_per_user=20, batch_size=10, window=None, latest='2024-06-01T00:00:00'):
+    """生成 user_count 个用户主页的伪站点，返回 (pages, 用户ID列表)
+
+    每个用户的时间线从 latest 开始每小时一条帖子、由新到旧排列；window 模拟虚拟列表（见 FakePage）。
+    """
+    pages, user_ids = {}, []
+    latest = datetime.strptime(latest, '%Y-%m-%dT%H:%M:%S')
+    for i in range(user_count):
+        user_id = f"fixture_profile_{i}"
+        user_ids.append(user_id)
+        articles = [build_article_html(1760000000000000000 + i * 100000 + j, user_id=user_id, text=f"profile tweet {j}", like_count=j,
+                                       post_time=(latest - timedelta(hours=j)).strftime('%Y-%m-%dT%H:%M:%S.000Z')) for j in range(tweets_per_user)]
+        pages[f"https://x.com/{user_id}"] = FakePage(articles, batch_size=batch_size, window=window, profile_html=build_profile_html(user_id, bio=f"fixture bio {i}", following=i * 3, followers=i * 1000))
+    return pages, user_ids
+
+class FakeElement:
+    """find_element 返回的最小元素实现"""
+
+    def __init__(self, outer_html):
+        self.outer_html = outer_html
+
+    def get_attribute(self, name):
+        return self.outer_html if name == 'outerHTML' else None
+
+    def find_element(self, by, value):
+        raise NoSuchElementException(value)
+
+    def click(self):
+        pass
+
+class FakeDriver:
+    """按URL返回 FakePage 的伪 WebDriver，只实现采集脚本实际用到的接口
+
+    latency 模拟每次导航的耗时（秒，或 (最短, 最长) 的随机范围），scroll_latency 模拟滚动后新推文渲染出来的耗时；
+    访问 crash_urls 中的链接时模拟浏览器崩溃，之后所有调用都会抛出异常。
+    failure_rates={失败类型: 概率} 时每次导航按概率注入失败：timeout 页面加载超时、rate_limit 频率限制页面、crash 浏览器崩溃；
+    seed 固定随机数，使同一组参数每次注入的失败相同。
+    pages 中没有的链接交给 page_factory(url) 生成页面（例如按搜索语句动态生成的搜索结果页）。
+    network_log=True 时模拟打开了 performance 日志的 Chrome：页面产生的时间线响应可通过 get_log / execute_cdp_cmd 读取。
+    revoked_tokens 为一个集合时检查登录状态：没有 auth_token Cookie 或其值在集合中时，导航会跳转到登录页（集合可在运行中修改，模拟账号中途掉线）；
+    cookie_latency 模拟每次 add_cookie / Network.setCookies 命令的往返耗时。
+    支持多个标签页 (switch_to.new_window / switch_to.window)：用 window.location 脚本开始的导航在后台加载，
+    latency 之后该标签页才会响应其他命令；Cookies 由所有标签页共用。
+    """
+
+    def __init__(self, pages=None, latency=0.0, crash_urls=(), scroll_latency=0.0, page_factory=None, network_log=False, failure_rates=None, seed=None,
+                 revoked_tokens=None, cookie_latency=0.0):
+        self.pages = pages or {}
+        self.page_factory = page_factory
+        self.network_log = network_log
+        self.performance_log = []
+        self.response_bodies = {}
+        self.latency = latency
+        self.scroll_latency = scroll_latency
+        self.crash_urls = set(crash_urls)
+        self.failure_rates = failure_rates or {}
+        self.random = random.Random(seed)
+        self.injected = {}  # 失败类型 -> 注入次数
+        self.page = None
+        self.loaded = 0
+        self.url = 'about:blank'
+        self.cookies = []
+        self.revoked_tokens = revoked_tokens
+        self.cookie_latency = cookie_latency
+        self.crashed = False
+        self.quit_called = False
+        self.navigations = 0
+        self.visited = []
+        self.ready_at = 0.0  # 当前标签页后台导航完成的时间
+        self.handle = 'tab-1'
+        self.windows = {}  # 其他标签页 -> (url, page, loaded, ready_at)
+        self.switch_to = FakeSwitchTo(self)
+
+    def _check_alive(self):
+        if self.crashed or self.quit_called:
+            raise WebDriverException("chrome not reachable")
+        wait = self.ready_at - time.time()
+        if wait > 0:
+            time.sleep(wait)  # 与真实的 chromedriver 一样，等待当前标签页的导航完成后再执行命令
+
+    @property
+    def current_window_handle(self):
+        return self.handle
+
+    @property
+    def window_handles(self):
+        return sorted([self.handle, *self.windows], key=lambda handle: int(handle.split('-')[1]))
+
+    def _switch(self, handle, state=None):
+        if self.crashed or self.quit_called:
+            raise WebDriverException("chrome not reachable")
+        if handle == self.handle:
+            return
+        if state is None and handle not in self.windows:
+            raise NoSuchWindowException(f"no such window: {handle}")
+        self.windows[self.handle] = (self.url, self.page, self.loaded, self.ready_at)
+        self.url, self.page, self.loaded, self.ready_at = state or self.windows.pop(handle)
+        self.handle = handle
+
+    @property
+    def current_url(self):
+        self._check_alive()
+        return self.url
+
+    def _latency(self):
+        return self.random.uniform(*self.latency) if isinstance(self.latency, tuple) else self.latency
+
+    def get(self, url):
+        self.ready_at = 0.0  # 新的导航取代未完成的导航
+        self._check_alive()
+        latency = self._latency()
+        if latency:
+            time.sleep(latency)
+        self._navigate(url)
+
+    def _navigate(self, url):
+        self.navigations += 1
+        self.visited.append(url)
+        if url in self.crash_urls:
+            self.crashed = True
+            self._check_alive()
+        self.url = url
+        self._inject_failure(url)
+        if not self.logged_in():
+            self.url, self.page, self.loaded = LOGIN_WALL_URL, LOGIN_WALL_PAGE, 0
+            return
+        self.page = self.pages.get(url) or self.pages.get(url.rstrip('/'))
+        if self.page is None and self.page_factory:
+            self.page = self.page_factory(url)
+        self.loaded = self.page.initial_loaded() if self.page else 0
+        if self.page and self.page.results is not None:
+            self._emit_response(self.page.header_results + self.page.results[:self.loaded])
+
+    def logged_in(self):
+        if self.revoked_tokens is None:
+            return True
+        token = next((cookie['value'] for cookie in self.cookies if cookie.get('name') == 'auth_token'), None)
+        return token is not None and token not in self.revoked_tokens
+
+    def _inject_failure(self, url):
+        """按 failure_rates 抽取一次失败；真实页面中这些失败表现为 WebDriverWait 超时，这里直接抛出以免等待 20 秒"""
+        roll = self.random.random()
+        for kind, rate in self.failure_rates.items():
+            if roll >= rate:
+                roll -= rate
+                continue
+            self.injected[kind] = self.injected.get(kind, 0) + 1
+            if kind == FAILURE_CRASH:
+                self.crashed = True
+                self._check_alive()
+            self.page = RATE_LIMIT_PAGE if kind == FAILURE_RATE_LIMIT else None
+            self.loaded = 0
+            raise TimeoutException(f"fixture: 注入的{'频率限制' if kind == FAILURE_RATE_LIMIT else '超时'} {url}")
+
+    def _scroll(self):
+        loaded = self.page.scrolled(self.loaded)
+        if self.page.results is not None:
+            self._emit_response(self.page.results[self.loaded:loaded])
+        self.loaded = loaded
+
+    def _emit_response(self, results):
+        """记录一次时间线接口请求：responseReceived + loadingFinished 两条 performance 日志，响应体可用 getResponseBody 读取"""
+        if not self.network_log or not results:
+            return
+        request_id = f"fixture.{len(self.response_bodies) + 1}"
+        self.response_bodies[request_id] = json.dumps(build_timeline_response(results, self.page.operation), ensure_ascii=False)
+        url = f"https://x.com/i/api/graphql/fixtureQueryId/{self.page.operation}?variables=%7B%7D"
+        for method, params in (('Network.responseReceived', {'requestId': request_id, 'type': 'XHR', 'response': {'url': url, 'status': 200, 'mimeType': 'application/json'}}),
+                               ('Network.loadingFinished', {'requestId': request_id, 'encodedDataLength': len(self.response_bodies[request_id])})):
+            self.performance_log.append({'level': 'INFO', 'timestamp': int(time.time() * 1000), 'message': json.dumps({'message': {'method': method, 'params': params}, 'webview': 'fixture'})})
+
+    def get_log(self, log_type):
+        self._check_alive()
+        if log_type != 'performance' or not self.network_log:
+            raise WebDriverException(f"invalid argument: log type '{log_type}' not found")
+        entries, self.performance_log = self.performance_log, []
+        return entries
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        self._check_alive()
+        if cmd == 'Network.getResponseBody':
+            if cmd_args['requestId'] not in self.response_bodies:
+                raise WebDriverException("No resource with given identifier found")
+            return {'body': self.response_bodies[cmd_args['requestId']], 'base64Encoded': False}
+        if cmd == 'Network.setCookies':
+            if self.cookie_latency:
+                time.sleep(self.cookie_latency)
+            self.cookies.extend(dict(cookie) for cookie in cmd_args['cookies'])
+        return {}
+
+    @property
+    def page_source(self):
+        self._check_alive()
+        return self.page.render(self.loaded) if self.page else '<html><head></head><body></body></html>'
+
+    def execute_script(self, script, *args):
+        if 'window.location' in script:
+            self.ready_at = 0.0
+            self._check_alive()
+            self.ready_at = time.time() + self._latency()
+            try:
+                self._navigate(args[0])
+            except TimeoutException:
+                pass  # 注入的失败在之后等待该页面时表现为超时
+            return None
+        self._check_alive()
+        if not self.page:
+            return None
+        if 'outerHTML' in script:
+            seen = set(args[0]) if args else set()
+            result = []
+            for href, article_html in self.page.visible_articles(self.loaded):
+                if href not in seen:
+                    seen.add(href)
+                    result.append([href, article_html])
+            return result
+        if 'scrollTo' in script:
+            self._scroll()
+            return None
+        if 'scrollHeight' in script:
+            return self.page.scroll_height(self.loaded)
+        return None
+
+    def execute_async_script(self, script, *args):
+        """模拟 adaptive_wait 中的 MutationObserver 脚本：滚动后等待新推文出现或预算耗尽"""
+        self._check_alive()
+        if 'MutationObserver' not in script:
+            return None
+        last_height = self.page.scroll_height(self.loaded) if self.page else 0
+        grew = bool(self.page) and self.page.scrolled(self.loaded) > self.loaded
+        elapsed = self.scroll_latency if grew else args[0] / 1000
+        time.sleep(elapsed)
+        if self.page:
+            self._scroll()
+        new_height = self.page.scroll_height(self.loaded) if self.page else 0
+        return {'last_height': last_height, 'new_height': new_height, 'count': len(self.page.visible_articles(self.loaded)) if self.page else 0, 'elapsed_ms': elapsed * 1000, 'reason': 'articles' if grew else 'timeout'}
+
+    def find_element(self, by, value):
+        self._check_alive()
+        if self.page and 'article' in value and self.page.visible_articles(self.loaded):
+            return FakeElement(self.page.visible_articles(self.loaded)[0][1])
+        if self.page and 'UserName' in value and self.page.profile_html:
+            return FakeElement(self.page.profile_html)
+        raise NoSuchElementException(value)
+
+    def find_elements(self, by, value):
+        try:
+            return [self.find_element(by, value)]
+        except NoSuchElementException:
+            return []
+
+    def get_cookies(self):
+        return list(self.cookies)
+
+    def add_cookie(self, cookie):
+        self._check_alive()
+        if self.cookie_latency:
+            time.sleep(self.cookie_latency)
+        self.cookies.append(cookie)
+
+    def quit(self):
+        self.quit_called = True
+
+class FakeSwitchTo:
+    """FakeDriver.switch_to：在标签页之间切换"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver._switch(handle)
+
+    def new_window(self, type_hint=None):
+        driver = self.driver
+        handle = f"tab-{len(driver.windows) + 2}"
+        while handle == driver.handle or handle in driver.windows:
+            handle = f"tab-{int(handle.split('-')[1]) + 1}"
+        driver._switch(handle, ('about:blank', None, 0, 0.0))
@@ -0,0 +1,171 @@
+# 热点路径计时：记录每个链接在各阶段（页面加载、等待元素、随机等待、page_source 传输、解析、写出等）的耗时和计数
+# 每个链接结束时向 METRICS_LOG_FILE 追加一行 JSON，任务结束时打印按阶段汇总的耗时表；开销只有几次 perf_counter 调用，可以常开
+import json
+import threading
+import time
+
+INSTRUMENTATION = True  # False 时 stage()/count() 不做任何记录
+METRICS_LOG_FILE = 'metrics.jsonl'  # 每个链接一行的结构化日志；None 表示只打印汇总表，不写日志文件
+
+# --- 阶段名称 ---
+STAGE_SESSION = 'session_start'  # 启动浏览器并加载 Cookies
+STAGE_GET = 'driver_get'  # driver.get 页面导航
+STAGE_WAIT = 'wait_element'  # WebDriverWait 等待推文或用户名元素出现
+STAGE_SLEEP = 'random_sleep'  # 人类化的随机等待
+STAGE_SCROLL = 'scroll_wait'  # 滚动后等待新内容（adaptive_wait）
+STAGE_SOURCE = 'page_source'  # 从浏览器取回 page_source 或新推文节点的 HTML
+STAGE_CAPTURE = 'capture'  # 网络捕获模式下读取并映射 GraphQL 响应
+STAGE_PARSE = 'parse'  # 解析 HTML（BeautifulSoup / selectolax / lxml）
+STAGE_WRITE = 'write'  # 写出记录（JSON 文件 / JSONL / Parquet 缓冲）
+
+# --- 计数器名称 ---
+COUNT_SEEN = 'articles_seen'  # 每次采集时取回的推文节点数
+COUNT_NEW = 'new_articles'  # 其中未采集过的推文数
+COUNT_RETRIES = 'retries'  # 失败后重新排队的次数
+COUNT_BACKOFFS = 'backoffs'  # 失败后会话退避的次数
+COUNT_EARLY_STOPS = 'early_stops'  # 候选数已够抽样、提前停止滚动的次数
+COUNT_QUOTES_SKIPPED = 'quotes_skipped'  # 源帖子没有转发/引用、跳过 /quotes 页面的次数
+COUNT_BELOW_THRESHOLD = 'below_threshold'  # 搜索结果卡片的互动量低于门槛、没有进入采集队列的帖子数
+COUNT_BACKPRESSURE = 'backpressure_waits'  # 流水线中解析或写出跟不上、采集线程等待队列空位的次数
+
+class _Stage:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_STAGE = _NoStage()
+
+class Metrics:
+    """按线程记录当前链接的阶段耗时和计数，链接结束时合并到全局汇总
+
+    会话池在调用 handler 前后调用 begin()/end()；不在任何链接之内的调用（例如主线程中的准备工作）直接计入汇总。
+    """
+
+    def __init__(self, log_file=METRICS_LOG_FILE):
+        self.log_file = log_file
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.stage_totals = {}  # 阶段 -> [次数, 总耗时, 最长耗时]
+        self.counters = {}
+        self.items = {}  # 结果 -> 链接数
+        self.item_seconds = []
+        self.log = None
+
+    def stage(self, name):
+        """with METRICS.stage(STAGE_GET): driver.get(url)"""
+        return _Stage(self, name) if INSTRUMENTATION else _NO_STAGE
+
+    def add_time(self, name, seconds):
+        record = getattr(self.local, 'record', None)
+        if record is None:
+            with self.lock:
+                self._merge_stage(name, 1, seconds, seconds)
+            return
+        stages = record['stages']
+        entry = stages.get(name)
+        if entry is None:
+            stages[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def count(self, name, value=1):
+        if not INSTRUMENTATION:
+            return
+        record = getattr(self.local, 'record', None)
+        if record is None:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+            return
+        record['counters'][name] = record['counters'].get(name, 0) + value
+
+    def begin(self, item, worker=None):
+        """开始记录一个链接（或其他任务项），由会话池的工作线程调用"""
+        if not INSTRUMENTATION:
+            return
+        self.local.record = {'item': item, 'worker': worker, 'started': time.time(), 'clock': time.perf_counter(), 'stages': {}, 'counters': {}}
+
+    def end(self, status='done', error=None):
+        """结束当前链接：合并到汇总，并向日志文件追加一行 JSON"""
+        record = getattr(self.local, 'record', None)
+        if record is None:
+            return
+        self.local.record = None
+        elapsed = time.perf_counter() - record['clock']
+        line = {'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record['started'])), 'item': record['item'], 'worker': record['worker'], 'status': status,
+                'seconds': round(elapsed, 4), 'stages': {name: round(entry[1], 4) for name, entry in record['stages'].items()}, 'counters': record['counters']}
+        if error is not None:
+            line['error'] = str(error).strip()[:300]
+        with self.lock:
+            for name, (calls, seconds, longest) in record['stages'].items():
+                self._merge_stage(name, calls, seconds, longest)
+            for name, value in record['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.items[status] = self.items.get(status, 0) + 1
+            self.item_seconds.append(elapsed)
+            if self.log_file:
+                if self.log is None:
+                    self.log = open(self.log_file, 'a', encoding='utf-8')
+                self.log.write(json.dumps(line, ensure_ascii=False, default=str) + '\n')
+
+    def _merge_stage(self, name, calls, seconds, longest):
+        entry = self.stage_totals.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+        entry[2] = max(entry[2], longest)
+
+    def report(self, title='任务'):
+        """打印按阶段汇总的耗时表（按总耗时从高到低）和计数器"""
+        with self.lock:
+            stage_totals = {name: list(entry) for name, entry in self.stage_totals.items()}
+            counters, items, item_seconds = dict(self.counters), dict(self.items), sorted(self.item_seconds)
+            if self.log is not None:
+                self.log.flush()
+        if not stage_totals and not items:
+            return
+        handled = sum(items.values())
+        print(f"\n--- {title} 阶段耗时统计: {handled} 个链接 ({', '.join(f'{status} {count}' for status, count in items.items())}) ---")
+        if item_seconds:
+            print(f"每个链接: 平均 {sum(item_seconds) / len(item_seconds):.2f}s | p50 {item_seconds[len(item_seconds) // 2]:.2f}s | p90 {item_seconds[min(len(item_seconds) - 1, int(len(item_seconds) * 0.9))]:.2f}s")
+        total = sum(entry[1] for entry in stage_totals.values()) or 1e-9
+        print(f"{'阶段':<14} | {'次数':>7} | {'总耗时(s)':>9} | {'占比':>6} | {'平均(ms)':>9} | {'最长(ms)':>9} | {'每链接(ms)':>10}")
+        for name, (calls, seconds, longest) in sorted(stage_totals.items(), key=lambda kv: -kv[1][1]):
+            print(f"{name:<14} | {calls:>7} | {seconds:>9.2f} | {seconds / total:>6.1%} | {seconds / calls * 1000:>9.1f} | {longest * 1000:>9.1f} | {seconds / max(handled, 1) * 1000:>10.1f}")
+        other = sum(item_seconds) - total
+        if other > 0:
+            print(f"{'(未计时)':<14} | {'':>7} | {other:>9.2f} | {'':>6} | {'':>9} | {'':>9} | {other / max(handled, 1) * 1000:>10.1f}")
+        if counters:
+            print("计数: " + ' | '.join(f"{name} {value}" for name, value in counters.items()))
+
+    def reset(self):
+        with self.lock:
+            self.stage_totals.clear()
+            self.counters.clear()
+            self.items.clear()
+            self.item_seconds.clear()
+
+    def close(self):
+        with self.lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+
+METRICS = Metrics()
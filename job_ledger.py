@@ -0,0 +1,137 @@
+# 任务台账：用一个 SQLite (WAL 模式) 文件记录每个链接的状态、尝试次数和最后一次错误，断点续传时不再扫描输出目录
+import json
+import sqlite3
+import threading
+import time
+
+LEDGER_FILE = 'job_ledger.sqlite3'
+
+# --- 任务状态 ---
+STATE_PENDING = 'pending'  # 等待处理（包括失败后等待重试的任务）
+STATE_RUNNING = 'running'  # 已被某个工作线程领取
+STATE_DONE = 'done'  # 已成功写出
+STATE_FAILED = 'failed'  # 重试次数用完后放弃，下次启动时会重新排队
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    task TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    url TEXT,
+    payload TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    claimed_by TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (task, job_key)
+);
+CREATE INDEX IF NOT EXISTS jobs_task_state ON jobs (task, state);
+"""
+
+class JobLedger:
+    """多个工作线程共用的任务台账，每个线程使用自己的 SQLite 连接
+
+    task 是任务的名称（例如输出文件夹），job_key 是任务内唯一的键（例如推文 ID）。
+    claim / complete / fail 都是单条原子更新，多个线程可以同时调用。
+    """
+
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        self.local = threading.local()
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def has_task(self, task):
+        return self.connection().execute("SELECT 1 FROM jobs WHERE task = ? LIMIT 1", (task,)).fetchone() is not None
+
+    def add(self, task, jobs, state=STATE_PENDING):
+        """登记 (job_key, url, payload) 形式的任务，已存在的键保持原状；返回新登记的任务键列表"""
+        now = time.time()
+        added = []
+        connection = self.connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            for key, url, payload in jobs:
+                cursor = connection.execute("INSERT OR IGNORE INTO jobs (task, job_key, url, payload, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                            (task, key, url, json.dumps(payload, ensure_ascii=False) if payload is not None else None, state, now, now))
+                if cursor.rowcount == 1:
+                    added.append(key)
+        return added
+
+    def complete(self, task, keys, completed_at=None):
+        """批量把已落盘的任务标记为完成（也用于从旧版输出目录迁移）
+
+        completed_at 为 {键: 时间戳} 时以其作为完成时间（迁移时传入输出文件的修改时间，expire 才能识别早已过期的记录），缺少的键使用当前时间。
+        """
+        now = time.time()
+        completed_at = completed_at or {}
+        connection = self.connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany("UPDATE jobs SET state = ?, last_error = NULL, claimed_by = NULL, updated_at = ? WHERE task = ? AND job_key = ?",
+                                   [(STATE_DONE, completed_at.get(key, now), task, key) for key in keys])
+
+    def requeue(self, task, states=(STATE_RUNNING, STATE_FAILED)):
+        """把上次运行中断（running）或放弃（failed）的任务放回等待队列；返回数量"""
+        placeholders = ', '.join('?' for _ in states)
+        cursor = self.connection().execute(f"UPDATE jobs SET state = ?, claimed_by = NULL, updated_at = ? WHERE task = ? AND state IN ({placeholders})", (STATE_PENDING, time.time(), task, *states))
+        return cursor.rowcount
+
+    def expire(self, task, max_age):
+        """把完成时间早于 max_age 秒之前的任务放回等待队列（用于定期刷新的数据）；返回数量"""
+        now = time.time()
+        cursor = self.connection().execute("UPDATE jobs SET state = ?, updated_at = ? WHERE task = ? AND state = ? AND updated_at < ?", (STATE_PENDING, now, task, STATE_DONE, now - max_age))
+        return cursor.rowcount
+
+    def reopen(self, task, keys):
+        """把已完成的任务放回等待队列（例如只记录了引用的帖子，采集它的任务最终放弃了）；返回数量"""
+        connection = self.connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            cursor = connection.executemany("UPDATE jobs SET state = ?, claimed_by = NULL, updated_at = ? WHERE task = ? AND job_key = ? AND state = ?",
+                                            [(STATE_PENDING, time.time(), task, key, STATE_DONE) for key in keys])
+        return cursor.rowcount
+
+    def pending(self, task):
+        """按登记顺序返回等待处理的任务 [(job_key, url, payload), ...]"""
+        rows = self.connection().execute("SELECT job_key, url, payload FROM jobs WHERE task = ? AND state = ? ORDER BY rowid", (task, STATE_PENDING))
+        return [(row['job_key'], row['url'], json.loads(row['payload']) if row['payload'] is not None else None) for row in rows]
+
+    def jobs(self, task):
+        """按登记顺序返回任务的全部记录 [(job_key, url, payload, state), ...]"""
+        rows = self.connection().execute("SELECT job_key, url, payload, state FROM jobs WHERE task = ? ORDER BY rowid", (task,))
+        return [(row['job_key'], row['url'], json.loads(row['payload']) if row['payload'] is not None else None, row['state']) for row in rows]
+
+    def claim(self, task, key, worker=None):
+        """原子地领取一个等待中的任务，成功返回 True；已被其他线程领取或已完成时返回 False"""
+        cursor = self.connection().execute(
+            "UPDATE jobs SET state = ?, attempts = attempts + 1, claimed_by = ?, updated_at = ? WHERE task = ? AND job_key = ? AND state = ?",
+            (STATE_RUNNING, worker or threading.current_thread().name, time.time(), task, key, STATE_PENDING))
+        return cursor.rowcount == 1
+
+    def fail(self, task, key, error, final=False):
+        """记录一次失败；final 为 False 时任务回到等待状态以便重试"""
+        self.connection().execute("UPDATE jobs SET state = ?, last_error = ?, claimed_by = NULL, updated_at = ? WHERE task = ? AND job_key = ?",
+                                  (STATE_FAILED if final else STATE_PENDING, str(error).strip(), time.time(), task, key))
+
+    def counts(self, task):
+        """返回 {状态: 数量}"""
+        rows = self.connection().execute("SELECT state, COUNT(*) FROM jobs WHERE task = ? GROUP BY state", (task,))
+        return {state: count for state, count in rows}
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
@@ -0,0 +1,123 @@
+# 精简浏览器模式：屏蔽采集用不到的字体、图片、视频和统计脚本请求，限制渲染进程内存，可选为每个工作线程保留固定的用户目录
+# 对比当前选项与精简模式的页面加载耗时和内存占用（需要 Chrome 和 Cookies，内存统计需要 pip install psutil）:
+#   python lean_browser.py [帖子链接 ...]
+import importlib.util
+import os
+import sys
+import time
+
+from browser_pool import current_slot
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BLOCKED_RESOURCE_TYPES = ('image', 'font', 'media')  # 屏蔽的资源类型，对应 RESOURCE_TYPE_PATTERNS 中的链接规则
+BLOCKED_URL_PATTERNS = (  # 额外屏蔽的链接规则（统计、广告、客户端事件上报），支持 * 通配符
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*ads-twitter.com*', '*ads-api.x.com*',
+    '*/i/api/1.1/jot/*', '*/1.1/jot/*', '*analytics.x.com*', '*analytics.twitter.com*',
+)
+RENDERER_MEMORY_MB = 512  # 渲染进程 JavaScript 堆的上限 (MB)；None 表示不限制
+PROFILE_ROOT = 'browser_profiles'  # 固定用户目录的根目录，每个工作线程一个子目录
+
+# Network.setBlockedURLs 只能按链接屏蔽，这里把资源类型换成对应的链接规则；时间线接口 (/i/api/graphql) 和页面脚本不受影响
+RESOURCE_TYPE_PATTERNS = {
+    'image': ('*pbs.twimg.com/media/*', '*pbs.twimg.com/profile_images/*', '*pbs.twimg.com/profile_banners/*', '*pbs.twimg.com/card_img/*',
+              '*pbs.twimg.com/ext_tw_video_thumb/*', '*pbs.twimg.com/amplify_video_thumb/*', '*pbs.twimg.com/tweet_video_thumb/*',
+              '*abs-0.twimg.com/emoji/*', '*.jpg', '*.jpg?*', '*.jpeg', '*.png', '*.png?*', '*.gif', '*.webp'),
+    'font': ('*.woff', '*.woff2', '*.ttf', '*.otf'),
+    'media': ('*video.twimg.com/*', '*.mp4', '*.mp4?*', '*.m3u8', '*.m3u8?*', '*.m4s', '*.webm'),
+}
+
+LEAN_ARGUMENTS = (
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--autoplay-policy=user-gesture-required",
+    "--blink-settings=imagesEnabled=false",
+    "--renderer-process-limit=2",
+)
+
+def apply_lean_options(options):
+    """在 ChromeOptions 上加入精简模式的启动参数：关闭扩展、后台网络、自动播放，并限制渲染进程内存"""
+    for argument in LEAN_ARGUMENTS:
+        options.add_argument(argument)
+    if RENDERER_MEMORY_MB:
+        options.add_argument(f"--js-flags=--max-old-space-size={RENDERER_MEMORY_MB}")
+    return options
+
+def persistent_profile_dir(prefix):
+    """返回当前工作线程固定的浏览器用户目录（缓存和 Cookies 在多次运行之间保留）；不在会话池的工作线程中时返回 None
+
+    Chrome 同一时间只允许一个浏览器使用一个用户目录，每个会话池槽位各用一个子目录。
+    """
+    slot = current_slot()
+    if slot is None:
+        return None
+    path = os.path.abspath(os.path.join(PROFILE_ROOT, f"{prefix}-{slot + 1}"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def blocked_url_patterns():
+    return [pattern for kind in BLOCKED_RESOURCE_TYPES for pattern in RESOURCE_TYPE_PATTERNS.get(kind, ())] + list(BLOCKED_URL_PATTERNS)
+
+def enable_request_blocking(driver):
+    """通过 CDP 屏蔽 blocked_url_patterns() 中的请求，需在第一次导航前调用；不支持 CDP 时返回 False"""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_url_patterns()})
+    except Exception as e:
+        print(f"[{time.strftime('%H:%M:%S')}] [精简模式] 无法启用请求屏蔽，将加载全部资源: {str(e).strip()}")
+        return False
+    return True
+
+def browser_rss(driver):
+    """返回 chromedriver 启动的全部 Chrome 进程的常驻内存之和 (字节)"""
+    if psutil is None:
+        raise ImportError("内存统计需要安装 psutil: pip install psutil")
+    root = psutil.Process(driver.service.process.pid)
+    total = 0
+    for process in [root] + root.children(recursive=True):
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+def compare(urls, rounds=2):
+    """分别用当前选项和精简模式打开 urls，打印每个页面等到推文出现的耗时，以及加载完成后浏览器的内存占用"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    spec = importlib.util.spec_from_file_location('autotwi_V2_0', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'autotwi_V2.0.py'))
+    autotwi = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(autotwi)
+    print(f"{'模式':<8} | {'平均加载(s)':>10} | {'最长加载(s)':>10} | {'浏览器内存(MB)':>13} | 失败")
+    for mode_name, lean in (('当前选项', False), ('精简模式', True)):
+        autotwi.LEAN_BROWSER = lean
+        driver = autotwi.create_logged_in_driver()  # 精简模式下同时启用请求屏蔽
+        try:
+            timings, failures = [], 0
+            for _ in range(rounds):
+                for url in urls:
+                    start = time.perf_counter()
+                    try:
+                        driver.get(url)
+                        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
+                        timings.append(time.perf_counter() - start)
+                    except Exception:
+                        failures += 1
+            rss = browser_rss(driver) / 1024 / 1024 if psutil else float('nan')
+        finally:
+            driver.quit()
+        mean = sum(timings) / len(timings) if timings else float('nan')
+        print(f"{mode_name:<8} | {mean:>10.2f} | {max(timings, default=float('nan')):>10.2f} | {rss:>13.0f} | {failures}")
+
+if __name__ == "__main__":
+    compare(sys.argv[1:] or ["https://x.com/nasa"])
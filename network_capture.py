@@ -0,0 +1,195 @@
+# 网络捕获模式：读取页面自己请求的时间线 JSON (GraphQL 响应)，直接映射成与 parse_tweet_article 相同结构的记录
+# 依赖 Chrome 的 performance 日志 (goog:loggingPrefs) 和 CDP 命令 Network.getResponseBody；拿不到数据时由调用方退回 DOM 解析
+import base64
+import html
+import json
+import re
+from datetime import datetime
+
+from tweet_model import X_HOST, ProfileTweet, Tweet
+from tweet_parser import EMOJI_PATTERN
+
+# 包含推文的 GraphQL 操作：帖子详情（回复）、搜索（引用）、用户时间线
+GRAPHQL_URL_PATTERN = re.compile(r'/i/api/graphql/[^/]+/(TweetDetail|SearchTimeline|UserTweets|UserTweetsAndReplies|TweetResultByRestId)\b')
+TWEET_RESULT_KEYS = ('tweet_results', 'tweetResult')
+CREATED_AT_FORMAT = '%a %b %d %H:%M:%S %z %Y'  # 例如 "Wed May 01 12:00:00 +0000 2024"
+# 页面上以 <img> 显示的 emoji（国旗、带肤色/变体选择符和 ZWJ 组合的 emoji 各为一张图片）；EMOJI_PATTERN 的范围包含汉字，不能用来拆分正文
+DISPLAY_EMOJI_PATTERN = re.compile("[\U0001F1E6-\U0001F1FF]{2}|[\U0001F300-\U0001FAFF\u2600-\u27BF]\uFE0F?[\U0001F3FB-\U0001F3FF]?(?:\u200D[\U0001F300-\U0001FAFF\u2600-\u27BF]\uFE0F?[\U0001F3FB-\U0001F3FF]?)*")
+
+def enable_performance_log(options):
+    """在 ChromeOptions 上打开 performance 日志，驱动启动后才能读取网络事件"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+def _unwrap(result):
+    """处理 TweetWithVisibilityResults 等包装，以及转推（页面上显示的是原推文）"""
+    if not isinstance(result, dict):
+        return None
+    if result.get('__typename') == 'TweetWithVisibilityResults' or ('tweet' in result and 'legacy' not in result):
+        result = result.get('tweet') or {}
+    retweeted = (result.get('legacy') or {}).get('retweeted_status_result', {}).get('result')
+    if retweeted:
+        return _unwrap(retweeted)
+    return result if result.get('legacy') and result.get('rest_id') else None
+
+def iter_tweet_results(payload):
+    """按出现顺序遍历响应中时间线条目的推文对象；不进入推文内部，因此引用推文中嵌套的原帖不会被当成独立推文"""
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key in TWEET_RESULT_KEYS:
+                if key in node:
+                    result = _unwrap((node[key] or {}).get('result'))
+                    if result:
+                        yield result
+                    break
+            else:
+                stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def _display_text(legacy, result, emoji=True):
+    """还原页面上显示的正文：去掉开头的 @回复对象和结尾的媒体短链，t.co 短链换成链接文字
+
+    页面上 #话题、@提及、$代码、链接和 emoji 图片各是一个单独的节点，DOM 解析用换行连接去掉首尾空白的各个文本节点，
+    这里在同样的位置拆分并用换行连接。emoji=False 时去掉 emoji（parse_profile_tweet 不读取图片的 alt）。
+    """
+    note = ((result.get('note_tweet') or {}).get('note_tweet_results') or {}).get('result')
+    if note and note.get('text'):
+        text, entities = note['text'], note.get('entity_set') or {}
+    else:
+        text, entities = legacy.get('full_text', ''), legacy.get('entities') or {}
+        start, end = legacy.get('display_text_range') or (0, len(text))
+        text = text[start:end]
+    links = {url.get('url', ''): url.get('display_url', '') for url in entities.get('urls') or []}
+    links.update({media.get('url', ''): '' for media in (legacy.get('entities') or {}).get('media') or []})
+    tokens = ['#' + tag['text'] for tag in entities.get('hashtags') or []] + ['$' + symbol['text'] for symbol in entities.get('symbols') or []]
+    tokens += ['@' + mention['screen_name'] for mention in entities.get('user_mentions') or []] + [url for url in links if url]
+    pattern = '|'.join(re.escape(token) + r'(?!\w)' for token in sorted(set(tokens), key=len, reverse=True))
+    pattern = f"(?P<entity>{pattern})|(?P<emoji>{DISPLAY_EMOJI_PATTERN.pattern})" if pattern else f"(?P<emoji>{DISPLAY_EMOJI_PATTERN.pattern})"
+    text = html.unescape(text)
+    parts, position = [], 0
+    for match in re.finditer(pattern, text, flags=re.IGNORECASE):
+        parts.append(text[position:match.start()])
+        if match.lastgroup == 'emoji': parts.append(match.group() if emoji else '')
+        else: parts.append(links.get(match.group(), match.group()))
+        position = match.end()
+    parts.append(text[position:])
+    return '\n'.join(part.strip() for part in parts if part.strip())
+
+def _user_names(result):
+    user = ((result.get('core') or {}).get('user_results') or {}).get('result') or {}
+    names = user.get('core') or user.get('legacy') or {}
+    legacy = user.get('legacy') or {}
+    return names.get('screen_name') or legacy.get('screen_name'), names.get('name') or legacy.get('name')
+
+def _post_url(result):
+    screen_name, _ = _user_names(result)
+    return f"{X_HOST}/{screen_name}/status/{result['rest_id']}" if screen_name else None
+
+def map_tweet_result(result, profile=False):
+    """把一个 GraphQL 推文对象映射成与 parse_tweet_article（profile=True 时为 parse_profile_tweet）相同的记录
+
+    互动数据是接口返回的精确值，不受页面上 K/M 缩写的影响；转发数只取 retweet_count，引用数见 TimelineCapture.quote_count。
+    """
+    legacy = result['legacy']
+    screen_name, nickname = _user_names(result)
+    if not screen_name:
+        return None
+    path = f"/{screen_name}/status/{result['rest_id']}"
+    post_time = datetime.strptime(legacy['created_at'], CREATED_AT_FORMAT).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    content = _display_text(legacy, result, emoji=not profile)
+    reply_count = legacy.get('reply_count', 0)
+    retweet_count = legacy.get('retweet_count', 0)
+    like_count = legacy.get('favorite_count', 0)
+    if profile:
+        return ProfileTweet(path, post_time, content, reply_count, retweet_count, like_count)
+    hashtags = ", ".join('#' + tag['text'] for tag in (legacy.get('entities') or {}).get('hashtags') or [])
+    return Tweet(path, post_time, content, reply_count, retweet_count, like_count, nickname=nickname or screen_name, user_id=screen_name, hashtags=hashtags, emojis=EMOJI_PATTERN.findall(content))
+
+class TimelineCapture:
+    """挂在单个 driver 上的响应缓冲区：poll() 读取新的网络事件，take() 取出尚未采集过的推文记录
+
+    只由使用该 driver 的工作线程调用；performance 日志每次读取后即被清空，因此缓冲区负责保存尚未被取走的推文。
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.results = {}  # post_url -> GraphQL 推文对象，按到达顺序
+        self.pending_requests = {}
+        self.available = True
+        self.responses = 0
+        self.page_responses = 0  # 当前页面已读取的响应数；为 0 时调用方应退回 DOM 解析
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+        except Exception:
+            self.available = False
+
+    def poll(self):
+        """读取 performance 日志，抓取已完成的时间线响应体；日志不可用时返回 False"""
+        if not self.available:
+            return False
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
+            self.available = False
+            return False
+        for entry in entries:
+            message = json.loads(entry['message']).get('message', {})
+            method, params = message.get('method'), message.get('params', {})
+            if method == 'Network.responseReceived' and GRAPHQL_URL_PATTERN.search(params.get('response', {}).get('url', '')):
+                self.pending_requests[params['requestId']] = True
+            elif method == 'Network.loadingFinished' and self.pending_requests.pop(params.get('requestId'), None):
+                self._read_body(params['requestId'])
+        return True
+
+    def _read_body(self, request_id):
+        try:
+            body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            text = base64.b64decode(body['body']).decode('utf-8') if body.get('base64Encoded') else body['body']
+            payload = json.loads(text)
+        except Exception:
+            return  # 响应体已被浏览器丢弃或不是 JSON，交给 DOM 解析
+        self.responses += 1
+        self.page_responses += 1
+        for result in iter_tweet_results(payload):
+            post_url = _post_url(result)
+            if post_url:
+                self.results.setdefault(post_url, result)
+
+    def reset(self):
+        """导航到新页面前调用：丢弃上一个页面遗留的响应"""
+        self.poll()
+        self.pending_requests.clear()
+        self.results.clear()
+        self.page_responses = 0
+
+    def find(self, tweet_id, profile=False):
+        """返回缓冲区中指定推文 ID 的记录（不从缓冲区移除），没有时返回 None"""
+        self.poll()
+        for result in self.results.values():
+            if result['rest_id'] == tweet_id:
+                return map_tweet_result(result, profile)
+        return None
+
+    def quote_count(self, tweet_id):
+        """返回缓冲区中指定推文的引用数，没有捕获到该推文时返回 None"""
+        for result in self.results.values():
+            if result['rest_id'] == tweet_id:
+                return result['legacy'].get('quote_count', 0)
+        return None
+
+    def take(self, seen_tweets, profile=False):
+        """取出缓冲区中未在 seen_tweets 中的推文记录，并把它们加入 seen_tweets；日志不可用时返回 None"""
+        if not self.poll():
+            return None
+        results, self.results = self.results, {}
+        new_tweets = []
+        for post_url, result in results.items():
+            if post_url not in seen_tweets:
+                record = map_tweet_result(result, profile)
+                if record:
+                    new_tweets.append(record)
+                    seen_tweets.add(post_url)
+        return new_tweets
@@ -0,0 +1,362 @@
+# 可插拔的输出写入器：每条一个 JSON 文件（兼容旧版）、按大小轮转的 JSONL、可选的 Parquet 列式输出
+# Parquet 输出需要额外安装: pip install pyarrow
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from tweet_model import Tweet, UserProfile, to_json
+
+OUTPUT_FORMATS = ('json', 'jsonl', 'parquet')
+RECORD_FILE_PATTERN = re.compile(r'_id_(\d+)\.json$')  # 旧版每条一个文件的命名规则
+KEY_FIELD = '_key'  # JSONL/Parquet 中记录断点续传键的字段
+SIDE_FILES = ('references.jsonl', 'cascade_edges.jsonl')  # 与记录放在同一文件夹、但不是记录的文件（重复帖子的引用、传播边），读取记录时跳过
+PARENT_KEY_FIELD = '_parent_key'
+POSITION_FIELD = '_position'
+NESTED_FIELDS = ('replies', 'retweets_with_comment', 'recent_tweets')  # Parquet 模式下拆成子表的嵌套列表
+EXTRA_FIELD = '_extra'  # Parquet 中未声明的字段合并为一个 JSON 字符串保存在这一列
+# Parquet 的固定列：推文和用户资料的字段，以及各脚本附加的用户资料 (profile)、级联信息 (cascade)、时间线所属用户；记录中没有的列为空值
+PARQUET_COLUMNS = tuple(dict.fromkeys(Tweet.FIELDS + UserProfile.FIELDS + ('profile_user_id', 'profile', 'cascade')))
+JSON_COLUMNS = ('profile', 'cascade')  # 以 JSON 字符串保存的字典列，读取时还原
+PARQUET_PART_PATTERN = re.compile(r'^(.+)-(\d{8}-\d{6}-\d+-\d{5})\.parquet$')  # {表名}-{运行编号}-{分片}.parquet
+
+def open_sink(directory, output_format='json', name='tweets', key_of=None, on_durable=None, background=0):
+    """按 output_format 创建写入器
+
+    key_of 仅用于 json 模式，从目录中的文件名还原断点续传键；
+    on_durable(keys) 在记录真正落盘后被调用（缓冲写入器在 flush 时调用），用于更新任务台账。
+    completed_key_times() 返回 {键: 所在文件的修改时间}，用于从已有输出迁移到任务台账时保留记录的新旧。
+    background > 0 时由后台线程写出（见 pipeline.BackgroundWriter），队列中最多 background 条记录。
+    """
+    if output_format == 'jsonl':
+        sink = JsonlSink(directory, name, on_durable=on_durable)
+    elif output_format == 'parquet':
+        sink = ParquetSink(directory, name, on_durable=on_durable)
+    elif output_format == 'json':
+        sink = JsonFileSink(directory, key_of, on_durable=on_durable)
+    else:
+        raise ValueError(f"未知的输出格式 '{output_format}'，可选: {', '.join(OUTPUT_FORMATS)}")
+    if background:
+        from pipeline import BackgroundWriter
+        return BackgroundWriter(sink, max_pending=background)
+    return sink
+
+class JsonFileSink:
+    """兼容模式：每条记录写成一个缩进格式的 JSON 文件"""
+
+    def __init__(self, directory, key_of=None, on_durable=None):
+        self.directory = directory
+        self.key_of = key_of or (lambda filename: filename[:-5] if filename.endswith('.json') else None)
+        self.on_durable = on_durable
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, record, key, filename=None):
+        """写入一条记录，filename 可以包含子目录；返回保存位置"""
+        output_path = os.path.join(self.directory, filename or f"{key}.json")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=4, default=to_json)
+        if self.on_durable:
+            self.on_durable([key])
+        return output_path
+
+    def completed_keys(self):
+        keys = set()
+        for filename in os.listdir(self.directory):
+            key = self.key_of(filename)
+            if key:
+                keys.add(key)
+        return keys
+
+    def completed_key_times(self):
+        times = {}
+        for filename in os.listdir(self.directory):
+            key = self.key_of(filename)
+            if key:
+                times[key] = os.path.getmtime(os.path.join(self.directory, filename))
+        return times
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class JsonlSink:
+    """缓冲的追加写入器：每行一条记录，文件超过 max_bytes 后轮转到下一个编号
+
+    缓冲区中的记录在 flush/close 时才落盘，程序崩溃时最多丢失 buffer_records 条（之后会被重新采集）。
+    """
+
+    def __init__(self, directory, name='tweets', max_bytes=256 * 1024 * 1024, buffer_records=20, on_durable=None):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self.buffer_records = buffer_records
+        self.on_durable = on_durable
+        self.buffer = []
+        self.buffered_keys = []
+        self.keys = set()
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        existing = sorted(glob.glob(os.path.join(directory, f"{name}-*.jsonl")))
+        self.index = int(re.search(r'-(\d+)\.jsonl$', existing[-1]).group(1)) if existing else 1
+
+    def current_path(self):
+        return os.path.join(self.directory, f"{self.name}-{self.index:05d}.jsonl")
+
+    def write(self, record, key, filename=None):
+        line = json.dumps({KEY_FIELD: key, **record}, ensure_ascii=False, default=to_json)
+        with self.lock:
+            self.buffer.append(line)
+            self.buffered_keys.append(key)
+            self.keys.add(key)
+            if len(self.buffer) >= self.buffer_records:
+                self._flush_locked()
+            return self.current_path()
+
+    def _flush_locked(self):
+        if not self.buffer:
+            return
+        path = self.current_path()
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+            self.index += 1
+            path = self.current_path()
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(self.buffer) + '\n')
+        self.buffer = []
+        flushed_keys, self.buffered_keys = self.buffered_keys, []
+        if self.on_durable:
+            self.on_durable(flushed_keys)
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+
+    def completed_keys(self):
+        keys = set()
+        for path in glob.glob(os.path.join(self.directory, f"{self.name}-*.jsonl")):
+            keys.update(_iter_jsonl_keys(path))
+        with self.lock:
+            return keys | self.keys
+
+    def completed_key_times(self):
+        times = {}
+        for path in glob.glob(os.path.join(self.directory, f"{self.name}-*.jsonl")):
+            _merge_key_times(times, _iter_jsonl_keys(path), os.path.getmtime(path))
+        with self.lock:
+            _merge_key_times(times, self.keys, time.time())
+        return times
+
+def _iter_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 崩溃时写了一半的最后一行
+            yield record.pop(KEY_FIELD, None), record
+
+def _merge_key_times(times, keys, mtime):
+    """同一个键出现在多个文件中时（例如过期后重新采集），以最新的文件为准"""
+    for key in keys:
+        if times.get(key, 0) < mtime:
+            times[key] = mtime
+
+_KEY_PREFIX = '{"%s": ' % KEY_FIELD
+_DECODER = json.JSONDecoder()
+
+def _iter_jsonl_keys(path):
+    """只解码每行开头的 _key 字段，断点续传时不必解析整条记录"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.startswith(_KEY_PREFIX) or not line.endswith('}\n'):
+                continue  # 崩溃时写了一半的最后一行
+            try:
+                yield _DECODER.raw_decode(line, len(_KEY_PREFIX))[0]
+            except json.JSONDecodeError:
+                continue
+
+def _arrow_type(field):
+    if field.endswith('_count'):
+        return pa.int64()
+    if field == 'emojis':
+        return pa.list_(pa.string())
+    return pa.string()
+
+def parquet_schema(child=False):
+    """主表 (child=False) 或子表的固定 schema，与记录内容无关，每个批次和每次运行都相同"""
+    meta = [(PARENT_KEY_FIELD, pa.string()), (POSITION_FIELD, pa.int64())] if child else [(KEY_FIELD, pa.string())]
+    return pa.schema(meta + [(field, _arrow_type(field)) for field in PARQUET_COLUMNS] + [(EXTRA_FIELD, pa.string())])
+
+def _normalize(value, arrow_type):
+    if value is None:
+        return None
+    if arrow_type == pa.int64():
+        return value if isinstance(value, int) else None
+    if pa.types.is_list(arrow_type):
+        return [str(v) for v in value] if isinstance(value, list) else None
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=to_json)
+
+def _extra_fields(row, declared):
+    extra = {field: value for field, value in row.items() if field not in declared}
+    return json.dumps(extra, ensure_ascii=False, default=to_json) if extra else None
+
+class ParquetSink:
+    """列式输出：顶层字段写入主表，replies / retweets_with_comment / recent_tweets 等嵌套列表拆成子表
+
+    子表通过 _parent_key 与主表的 _key 关联，_position 保留原列表中的顺序。
+    每次 flush 把缓冲的记录写成一组新的分片文件 ({表名}-{运行编号}-{分片}.parquet)，文件关闭（写出 footer）后才调用 on_durable，
+    程序在两次 flush 之间崩溃时，已报告落盘的记录仍然可以读取。
+    各表使用固定的 schema (parquet_schema)：之后的批次中才出现的字段也不会丢失，PARQUET_COLUMNS 以外的字段保存在 _extra 列中。
+    """
+
+    def __init__(self, directory, name='tweets', buffer_records=500, on_durable=None):
+        if pa is None:
+            raise ImportError("Parquet 输出需要安装 pyarrow: pip install pyarrow")
+        self.directory = directory
+        self.name = name
+        self.buffer_records = buffer_records
+        self.on_durable = on_durable
+        self.buffered_keys = []
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.part = 0
+        self.rows = {}
+        self.pending = 0
+        self.keys = set()
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, record, key, filename=None):
+        parent = {KEY_FIELD: key}
+        children = {}
+        for field, value in record.items():
+            if field in NESTED_FIELDS and isinstance(value, list):
+                children[field] = [{PARENT_KEY_FIELD: key, POSITION_FIELD: i, **child} for i, child in enumerate(value)]
+            else:
+                parent[field] = value
+        with self.lock:
+            self.rows.setdefault(self.name, []).append(parent)
+            for field, child_rows in children.items():
+                self.rows.setdefault(f"{self.name}-{field}", []).extend(child_rows)
+            self.keys.add(key)
+            self.buffered_keys.append(key)
+            self.pending += 1
+            if self.pending >= self.buffer_records:
+                self._flush_locked()
+            return self.part_path(self.name, self.part + 1)
+
+    def part_path(self, table_name, part):
+        return os.path.join(self.directory, f"{table_name}-{self.run_id}-{part:05d}.parquet")
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        self.part += 1
+        # 子表在前、主表最后：completed_keys 只读取主表，主表分片出现时同一批次的子表已经完整
+        for table_name in sorted(self.rows, key=lambda table_name: table_name == self.name):
+            rows = self.rows[table_name]
+            if not rows:
+                continue
+            schema = parquet_schema(child=table_name != self.name)
+            columns = {field.name: [_normalize(row.get(field.name), field.type) for row in rows] for field in schema if field.name != EXTRA_FIELD}
+            declared = set(schema.names)
+            columns[EXTRA_FIELD] = [_extra_fields(row, declared) for row in rows]
+            # 先写入临时文件并关闭，再改名为 .parquet：崩溃时不会留下缺少 footer、无法读取的分片
+            path = self.part_path(table_name, self.part)
+            pq.write_table(pa.Table.from_pydict(columns, schema=schema), path + '.tmp')
+            os.replace(path + '.tmp', path)
+        self.rows = {}
+        self.pending = 0
+        flushed_keys, self.buffered_keys = self.buffered_keys, []
+        if self.on_durable and flushed_keys:
+            self.on_durable(flushed_keys)
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+
+    def completed_keys(self):
+        return set(self.completed_key_times())
+
+    def completed_key_times(self):
+        times = {}
+        for path in glob.glob(os.path.join(self.directory, f"{self.name}-[0-9]*.parquet")):
+            try:
+                _merge_key_times(times, (k for k in pq.read_table(path, columns=[KEY_FIELD]).column(KEY_FIELD).to_pylist() if k), os.path.getmtime(path))
+            except (OSError, pa.ArrowInvalid) as e:
+                print(f"  [警告] 跳过无法读取的 Parquet 文件 {path}，原因: {e}")
+        with self.lock:
+            _merge_key_times(times, self.keys, time.time())
+        return times
+
+def _parquet_row(row):
+    """把 Parquet 中的一行还原成记录：固定列中的空值视为记录中没有该字段，_extra 中的字段放回记录"""
+    record = {}
+    for field, value in row.items():
+        if value is None or field in (KEY_FIELD, PARENT_KEY_FIELD, POSITION_FIELD, EXTRA_FIELD):
+            continue
+        record[field] = json.loads(value) if field in JSON_COLUMNS and value[:1] in ('{', '[') else value
+    if row.get(EXTRA_FIELD):
+        record.update(json.loads(row[EXTRA_FIELD]))
+    return record
+
+def _iter_parquet(directory, filename, filenames):
+    """读取一个主表分片，并按 _parent_key / _position 把同一分片的子表放回嵌套列表"""
+    if pq is None:
+        raise ImportError("读取 Parquet 输出需要安装 pyarrow: pip install pyarrow")
+    table_name, part = PARQUET_PART_PATTERN.match(filename).groups()
+    present = [field for field in NESTED_FIELDS if f"{table_name}-{field}-{part}.parquet" in filenames]
+    children = {}
+    for field in present:
+        rows = pq.read_table(os.path.join(directory, f"{table_name}-{field}-{part}.parquet")).to_pylist()
+        for row in sorted(rows, key=lambda row: (row[PARENT_KEY_FIELD], row[POSITION_FIELD])):
+            children.setdefault(row[PARENT_KEY_FIELD], {}).setdefault(field, []).append(_parquet_row(row))
+    for row in pq.read_table(os.path.join(directory, filename)).to_pylist():
+        record = _parquet_row(row)
+        record.update({field: [] for field in present})  # 这一分片有该子表：没有子行的记录原来是空列表
+        record.update(children.get(row[KEY_FIELD], {}))
+        yield row[KEY_FIELD], record
+
+def iter_records(directory, filename_pattern=RECORD_FILE_PATTERN):
+    """依次读取目录中旧版的每条一个文件、JSONL 文件和 Parquet 主表分片，产出 (键, 记录)；json 文件的键为去掉扩展名的文件名
+
+    Parquet 记录由主表和同一分片的子表重建，固定列中为空的字段不出现在记录中。无法读取的文件会打印警告并跳过。
+    """
+    filenames = set(os.listdir(directory))
+    child_suffixes = tuple(f"-{field}" for field in NESTED_FIELDS)
+    for filename in sorted(filenames):
+        path = os.path.join(directory, filename)
+        try:
+            if filename in SIDE_FILES:
+                continue
+            if filename.endswith('.parquet'):
+                match = PARQUET_PART_PATTERN.match(filename)
+                if match and not match.group(1).endswith(child_suffixes):
+                    yield from _iter_parquet(directory, filename, filenames)
+            elif filename.endswith('.jsonl'):
+                yield from _iter_jsonl(path)
+            elif filename_pattern.search(filename):
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+                yield os.path.splitext(filename)[0], record
+        except (OSError, ValueError) as e:  # pyarrow.ArrowInvalid 是 ValueError 的子类
+            print(f"  [警告] 跳过文件 {path}，原因: {e}")
@@ -0,0 +1,137 @@
+# 分阶段流水线：浏览器线程只取回推文 HTML，解析交给进程池，写出交给后台线程
+# 两个阶段都有上限：解析或写出跟不上时，提交方在队列满时等待（背压），内存不会无限增长
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import COUNT_BACKPRESSURE, METRICS, STAGE_PARSE
+from tweet_parser import X_HOST, parse_profile_tweet, parse_tweet_article
+
+_FLUSH = object()  # 后台写入线程的控制标记
+_STOP = object()
+
+def parse_articles(articles_html, last_time=False, profile=False):
+    """在解析进程中运行：依次解析一批推文的 outerHTML，解析失败的位置为 None"""
+    if profile:
+        return [parse_profile_tweet(article_html) for article_html in articles_html]
+    return [parse_tweet_article(article_html, last_time=last_time) for article_html in articles_html]
+
+class ParsePool:
+    """解析进程池：浏览器线程提交一批推文 HTML 后立即返回 Future，可以继续滚动
+
+    同时排队或正在解析的批次最多 max_pending 个，超过时 submit 等待（背压）。
+    使用 spawn 启动子进程，避免在已有多个工作线程的进程中 fork。
+    """
+
+    def __init__(self, processes=2, max_pending=None):
+        self.processes = max(1, processes)
+        self.executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+        self.slots = threading.BoundedSemaphore(max_pending or self.processes * 4)
+        self.executor.submit(parse_articles, []).result()  # 启动时就拉起子进程并导入解析模块，不计入第一个链接
+
+    def submit(self, articles_html, last_time=False, profile=False):
+        if not self.slots.acquire(blocking=False):
+            METRICS.count(COUNT_BACKPRESSURE)
+            self.slots.acquire()
+        try:
+            future = self.executor.submit(parse_articles, articles_html, last_time, profile)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def close(self):
+        self.executor.shutdown()
+
+class ParseBatches:
+    """一次滚动采集中交给解析进程池的推文：提交时按帖子链接去重和计数，结束时用 results() 取回解析结果"""
+
+    def __init__(self, parser, last_time=False):
+        self.parser = parser
+        self.last_time = last_time
+        self.futures = []
+        self.found = 0
+
+    def submit(self, articles, seen_tweets):
+        """articles 为 [(链接路径, outerHTML)]，链接记入 seen_tweets；返回本次提交的推文数"""
+        articles = [(href, article_html) for href, article_html in articles if X_HOST + href not in seen_tweets]
+        if articles:
+            seen_tweets.update(X_HOST + href for href, _ in articles)
+            self.futures.append(self.parser.submit([article_html for _, article_html in articles], self.last_time))
+        self.found += len(articles)
+        return len(articles)
+
+    def results(self):
+        """等待所有批次解析完成，返回解析成功的推文"""
+        with METRICS.stage(STAGE_PARSE):
+            return [parsed_data for future in self.futures for parsed_data in future.result() if parsed_data]
+
+class BackgroundWriter:
+    """包装一个 output_sink 写入器：write() 只把记录放入有界队列，由后台线程成批写出
+
+    队列中最多 max_pending 条记录，写出跟不上时 write() 等待（背压）。后台写出失败时，下一次 write/flush/close 抛出该异常；
+    未写出的记录不会触发 on_durable，任务台账中保持未完成，下次运行时重新采集。
+    """
+
+    def __init__(self, sink, max_pending=100, batch_size=50):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.queue = queue.Queue(max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, record, key, filename=None):
+        """把记录交给后台线程，返回写入器所在的目录"""
+        self._raise_error()
+        try:
+            self.queue.put_nowait((record, key, filename))
+        except queue.Full:
+            METRICS.count(COUNT_BACKPRESSURE)
+            self.queue.put((record, key, filename))
+        return self.sink.directory
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for entry in batch:
+                try:
+                    if entry is _FLUSH:
+                        self.sink.flush()
+                    elif entry is not _STOP and self.error is None:
+                        self.sink.write(*entry)
+                except Exception as e:
+                    self.error = e
+                finally:
+                    self.queue.task_done()
+            if batch[-1] is _STOP:
+                return
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def flush(self):
+        """等待队列中的记录全部写出并落盘"""
+        self.queue.put(_FLUSH)
+        self.queue.join()
+        self._raise_error()
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.sink.close()
+        self._raise_error()
+
+    def completed_keys(self):
+        return self.sink.completed_keys()
+
+    def completed_key_times(self):
+        return self.sink.completed_key_times()
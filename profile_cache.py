@@ -0,0 +1,212 @@
+# 用户资料缓存：按 user_id 保存粉丝数、简介、注册时间等资料，带过期时间 (TTL) 和最近最少使用 (LRU) 的容量上限
+# user_autotwi.py 采集用户时写入，autotwi_V2.0.py 的资料附加阶段读取，多个脚本和多次运行之间共享同一个 SQLite 文件
+import json
+import sqlite3
+import threading
+import time
+
+PROFILE_CACHE_FILE = 'profile_cache.sqlite3'
+PROFILE_TTL_DAYS = 30  # 缓存的资料超过这么多天后视为过期，需要重新采集
+PROFILE_MAX_ENTRIES = 100000  # 缓存最多保存的用户数，超出后淘汰最久未使用的用户
+PROFILE_FIELDS = ('username', 'bio', 'location', 'website', 'join_date', 'following_count', 'followers_count', 'scraped_timestamp')  # 附加到推文记录中的字段
+EVICT_EVERY = 200  # 每写入这么多条资料检查一次容量
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profiles_last_used ON profiles (last_used);
+"""
+
+def normalize_user_id(user_id):
+    """推文记录中的 user_id 不带 '@'，用户主页上显示的带 '@'；统一成小写、不带 '@' 的形式"""
+    return user_id.strip().lstrip('@').lower()
+
+class ProfileCache:
+    """多个工作线程共用的用户资料缓存，每个线程使用自己的 SQLite 连接（与 JobLedger 相同）"""
+
+    def __init__(self, path=PROFILE_CACHE_FILE, ttl_days=PROFILE_TTL_DAYS, max_entries=PROFILE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def get_many(self, user_ids):
+        """返回 {user_id: 资料} 中未过期的部分，并刷新这些用户的最近使用时间"""
+        keys = list(dict.fromkeys(normalize_user_id(user_id) for user_id in user_ids))
+        found = {}
+        now = time.time()
+        connection = self.connection()
+        for start in range(0, len(keys), 500):  # SQLite 单条语句的参数数量有限
+            chunk = keys[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            for user_id, data in connection.execute(f"SELECT user_id, data FROM profiles WHERE user_id IN ({placeholders}) AND fetched_at >= ?", (*chunk, now - self.ttl)):
+                found[user_id] = json.loads(data)
+        if found:
+            connection.executemany("UPDATE profiles SET last_used = ? WHERE user_id = ?", [(now, user_id) for user_id in found])
+        with self.lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, user_id):
+        return self.get_many([user_id]).get(normalize_user_id(user_id))
+
+    def missing(self, user_ids):
+        """返回缓存中没有或已过期的用户（不刷新最近使用时间）"""
+        keys = list(dict.fromkeys(normalize_user_id(user_id) for user_id in user_ids))
+        connection = self.connection()
+        fresh = set()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            fresh.update(row[0] for row in connection.execute(f"SELECT user_id FROM profiles WHERE user_id IN ({placeholders}) AND fetched_at >= ?", (*chunk, time.time() - self.ttl)))
+        return [user_id for user_id in keys if user_id not in fresh]
+
+    def put(self, user_id, profile):
+        """保存一个用户的资料（只保留 PROFILE_FIELDS 中的字段）"""
+        data = {field: profile[field] for field in PROFILE_FIELDS if field in profile}
+        now = time.time()
+        self.connection().execute("INSERT OR REPLACE INTO profiles (user_id, data, fetched_at, last_used) VALUES (?, ?, ?, ?)",
+                                  (normalize_user_id(user_id), json.dumps(data, ensure_ascii=False), now, now))
+        with self.lock:
+            self.writes += 1
+            evict = self.writes % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """超出容量时删除最久未使用的用户；返回删除的数量"""
+        connection = self.connection()
+        excess = connection.execute("SELECT COUNT(*) FROM profiles").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return 0
+        connection.execute("DELETE FROM profiles WHERE user_id IN (SELECT user_id FROM profiles ORDER BY last_used LIMIT ?)", (excess,))
+        return excess
+
+    def close(self):
+        self.evict()
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+class ProfileEnricher:
+    """资料附加阶段：把缓存中的资料附加到源帖子及其回复/引用上，缓存未命中的用户攒成批次交给后台采集
+
+    enrich() 返回已攒满的批次（元组），调用方把它们交给会话池；drain() 返回剩余不足一批的用户。
+    enrich(record, write) 时记录由资料附加阶段写出：缓存中缺少的用户资料采集完（或采集失败）后再附加并调用 write(record)，
+    同一次运行中采集到的资料因此会出现在触发采集的记录里；flush() 写出所属批次最终没有采集完的记录。
+    """
+
+    def __init__(self, cache, batch_size=10, nested_fields=('replies', 'retweets_with_comment')):
+        self.cache = cache
+        self.batch_size = batch_size
+        self.nested_fields = nested_fields
+        self.queued = set()  # 已排队或已采集过的用户，避免同一用户被重复排队
+        self.settled = set()  # 已采集完（或采集失败）的用户，记录不再等待它们
+        self.pending = []
+        self.holders = {}  # 用户 -> 等待其资料的记录 [[记录, write, 仍在等待的用户集合], ...]
+        self.lock = threading.Lock()
+        self.fetched = 0
+        self.failed = 0
+        self.held = 0
+
+    def attach(self, record):
+        """把缓存中的资料附加到记录及其回复/引用上（没有时为 None），返回缓存中没有的用户"""
+        tweets = [record] + [tweet for field in self.nested_fields for tweet in record.get(field) or []]
+        user_ids = [tweet['user_id'] for tweet in tweets if tweet.get('user_id')]
+        profiles = self.cache.get_many(user_ids)
+        for tweet in tweets:
+            if tweet.get('user_id'):
+                tweet['profile'] = profiles.get(normalize_user_id(tweet['user_id']))
+        return list(dict.fromkeys(normalize_user_id(user_id) for user_id in user_ids if normalize_user_id(user_id) not in profiles))
+
+    def enrich(self, record, write=None):
+        misses = self.attach(record)
+        batches = []
+        waiting = set()
+        with self.lock:
+            for user_id in misses:
+                if user_id not in self.queued:
+                    self.queued.add(user_id)
+                    self.pending.append(user_id)
+            if write is not None:
+                waiting = {user_id for user_id in misses if user_id not in self.settled}
+                if waiting:
+                    entry = [record, write, waiting]
+                    for user_id in waiting:
+                        self.holders.setdefault(user_id, []).append(entry)
+                    self.held += 1
+            while len(self.pending) >= self.batch_size:
+                batches.append(tuple(self.pending[:self.batch_size]))
+                self.pending = self.pending[self.batch_size:]
+        if write is not None and not waiting:
+            write(record)
+        return batches
+
+    def drain(self):
+        with self.lock:
+            pending, self.pending = self.pending, []
+        return [tuple(pending[i:i + self.batch_size]) for i in range(0, len(pending), self.batch_size)]
+
+    def settle(self, user_ids):
+        """这些用户已采集完（或采集失败）：不再等待任何用户的记录附加资料后写出"""
+        ready = []
+        with self.lock:
+            for user_id in user_ids:
+                self.settled.add(user_id)
+                for entry in self.holders.pop(user_id, ()):
+                    entry[2].discard(user_id)
+                    if not entry[2]:
+                        ready.append(entry)
+        for record, write, _ in ready:
+            self.attach(record)
+            write(record)
+
+    def flush(self):
+        """写出仍在等待资料的记录（所属批次在重试后仍然失败），没有采集到的资料保持为 None；返回写出的数量"""
+        with self.lock:
+            entries = list({id(entry): entry for entries in self.holders.values() for entry in entries}.values())
+            self.holders = {}
+        for record, write, _ in entries:
+            self.attach(record)
+            write(record)
+        return len(entries)
+
+    def fetch_batch(self, driver, batch, fetch_profile):
+        """在一个会话中依次采集一批用户的资料；已被其他批次写入缓存的用户跳过。浏览器失效时抛出异常，整批重新排队"""
+        for user_id in self.cache.missing(batch):
+            try:
+                profile = fetch_profile(driver, user_id)
+            except Exception as e:
+                try:
+                    driver.current_url
+                except Exception:
+                    raise e  # 浏览器已失效：交给会话池重启会话并重试整批
+                with self.lock:
+                    self.failed += 1
+                print(f"[{time.strftime('%H:%M:%S')}] [资料] 采集用户 {user_id} 失败，跳过: {str(e).strip()}")
+                continue
+            self.cache.put(user_id, profile)
+            with self.lock:
+                self.fetched += 1
+        self.settle([normalize_user_id(user_id) for user_id in batch])
@@ -0,0 +1,40 @@
+# 搜索分片：把一个任务的日期范围拆成按天/按小时的窗口分别搜索，结果达到上限的窗口继续细分
+import calendar
+from datetime import datetime, timedelta
+
+SHARD_UNITS = {'day': timedelta(days=1), 'hour': timedelta(hours=1)}
+REFINE_PARTS = 4  # 达到上限的窗口被均分成的份数
+MIN_WINDOW = timedelta(minutes=15)  # 窗口细分到这个长度后不再继续细分
+
+def split_date_range(start_date, end_date, unit='day'):
+    """把 [start_date, end_date) 拆成按 unit 划分的窗口列表 [(开始, 结束), ...]，日期格式为 YYYY-MM-DD"""
+    step = SHARD_UNITS[unit]
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    windows = []
+    while start < end:
+        windows.append((start, min(start + step, end)))
+        start += step
+    return windows
+
+def refine_window(window, parts=REFINE_PARTS, min_window=MIN_WINDOW):
+    """把窗口均分成 parts 份；细分后的窗口短于 min_window 时返回空列表"""
+    start, end = window
+    span = (end - start) / parts
+    if span < min_window:
+        return []
+    return [(start + span * i, end if i == parts - 1 else start + span * (i + 1)) for i in range(parts)]
+
+def date_operators(since, until):
+    """生成搜索语句中的时间条件：整天的窗口用 since:/until:，其他窗口用精确到秒的 since_time:/until_time: (UTC)"""
+    if isinstance(since, str):
+        return f"since:{since} until:{until}"
+    if since.time() == until.time() == datetime.min.time():
+        return f"since:{since:%Y-%m-%d} until:{until:%Y-%m-%d}"
+    return f"since_time:{calendar.timegm(since.timetuple())} until_time:{calendar.timegm(until.timetuple())}"
+
+def describe_window(window):
+    start, end = window
+    if isinstance(start, str):
+        return f"{start}~{end}"
+    return f"{start:%Y-%m-%d %H:%M}~{end:%Y-%m-%d %H:%M}"
@@ -0,0 +1,159 @@
+# 登录会话管理：三个脚本共用的 Cookies 加载、手动登录和注入逻辑
+# Cookies 文件只读取一次，新浏览器通过一次 CDP Network.setCookies 批量注入；检测到掉线时集中刷新，多个账号按会话池槽位轮换
+import json
+import os
+import threading
+import time
+
+from browser_pool import current_slot
+
+LOGIN_URL = "https://x.com/login"
+LOGIN_TIMEOUT = 120  # 手动登录的等待时间（秒）
+AUTH_COOKIE = 'auth_token'  # 决定登录状态的 Cookie，过期时在启动时提示
+SAME_SITE_VALUES = ('Strict', 'Lax', 'None')
+
+def save_cookies(driver, file_path):
+    """保存当前浏览器的Cookies到文件"""
+    with open(file_path, 'w') as f:
+        json.dump(driver.get_cookies(), f)
+    print(f"Cookies 已保存至 {file_path}")
+
+def load_cookies(driver, file_path):
+    """旧的注入方式：先打开 x.com，再逐个 add_cookie（浏览器不支持 CDP 时使用）"""
+    if not os.path.exists(file_path):
+        return False
+    driver.get("https://x.com/")
+    with open(file_path, 'r') as f:
+        cookies = json.load(f)
+    for cookie in cookies:
+        if 'sameSite' in cookie and cookie['sameSite'] not in SAME_SITE_VALUES:
+            del cookie['sameSite']
+        driver.add_cookie(cookie)
+    return True
+
+def perform_login(file_path, options):
+    """打开一个有界面的浏览器等待手动登录，登录成功后把 Cookies 保存到 file_path；返回是否成功"""
+    from selenium import webdriver
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    if any('--headless' in arg for arg in options.arguments):
+        options.arguments.remove('--headless')
+    print(f"将打开浏览器，请在 {LOGIN_TIMEOUT} 秒内手动登录（Cookies 将保存到 {file_path}）...")
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get(LOGIN_URL)
+        WebDriverWait(driver, LOGIN_TIMEOUT).until(EC.url_contains("home"))
+        print("登录成功！正在保存Cookies以备后用...")
+        save_cookies(driver, file_path)
+        return True
+    except Exception as e:
+        print(f"登录超时或失败: {e}")
+        return False
+    finally:
+        driver.quit()
+
+def to_cdp_cookie(cookie):
+    """把 Selenium get_cookies() 格式的 Cookie 转成 Network.setCookies 的 CookieParam"""
+    param = {'name': cookie['name'], 'value': cookie['value'], 'domain': cookie.get('domain') or '.x.com', 'path': cookie.get('path') or '/',
+             'secure': cookie.get('secure', False), 'httpOnly': cookie.get('httpOnly', False)}
+    if cookie.get('sameSite') in SAME_SITE_VALUES:
+        param['sameSite'] = cookie['sameSite']
+    if cookie.get('expiry'):
+        param['expires'] = cookie['expiry']
+    return param
+
+class SessionManager:
+    """多个工作线程共用的登录会话：每个账号对应一个 Cookies 文件，只读取一次
+
+    attach(driver) 把当前槽位对应账号的 Cookies 注入新浏览器；会话池发现页面掉线（跳转到登录页）时调用 logged_out(driver)，
+    由一个线程集中刷新：Cookies 文件已被更新时重新读取，否则停用该账号，其他账号继续轮换；所有账号都失效时才打开浏览器等待手动登录。
+    """
+
+    def __init__(self, cookie_files, options_factory=None):
+        self.cookie_files = list(dict.fromkeys(cookie_files))
+        self.options_factory = options_factory  # 返回 ChromeOptions 的函数，手动登录时使用
+        self.jars = {}  # Cookies 文件 -> (修改时间, Cookies 列表)
+        self.expired = set()
+        self.sessions = {path: 0 for path in self.cookie_files}
+        self.refreshes = 0
+        self.lock = threading.Lock()
+
+    def ensure_logged_in(self):
+        """启动时调用：缺少 Cookies 文件或登录已过期的账号先手动登录；返回可用的账号数"""
+        with self.lock:
+            for path in self.cookie_files:
+                if self._load(path) or not self.options_factory:
+                    continue
+                if not os.path.exists(path):
+                    print(f"未找到Cookies文件 '{path}'。")
+                if perform_login(path, self.options_factory()):
+                    self._load(path)
+            return len(self.active_accounts())
+
+    def _load(self, path):
+        """读取一个 Cookies 文件，并检查登录 Cookie 是否已过期；文件不存在或已过期时停用该账号"""
+        if not os.path.exists(path):
+            self.expired.add(path)
+            return False
+        with open(path, 'r') as f:
+            cookies = json.load(f)
+        self.jars[path] = (os.path.getmtime(path), cookies)
+        auth = next((cookie for cookie in cookies if cookie.get('name') == AUTH_COOKIE), None)
+        if auth and auth.get('expiry') and auth['expiry'] < time.time():
+            print(f"[{time.strftime('%H:%M:%S')}] [会话] '{path}' 的登录 Cookie 已于 {time.strftime('%Y-%m-%d', time.localtime(auth['expiry']))} 过期，需要重新登录。")
+            self.expired.add(path)
+            return False
+        self.expired.discard(path)
+        return True
+
+    def active_accounts(self):
+        return [path for path in self.cookie_files if path not in self.expired]
+
+    def account_for_slot(self, slot):
+        """按会话池槽位轮换分配账号，使各账号的请求量大致均匀"""
+        with self.lock:
+            accounts = self.active_accounts()
+            if not accounts:
+                raise RuntimeError(f"没有可用的登录账号，请检查Cookies文件: {', '.join(self.cookie_files)}")
+            path = accounts[(slot or 0) % len(accounts)]
+            if path not in self.jars:
+                self._load(path)
+            self.sessions[path] += 1
+            return path, self.jars[path][1]
+
+    def attach(self, driver):
+        """把当前槽位账号的 Cookies 一次性注入新浏览器；不支持 CDP 时退回逐个 add_cookie。返回 driver"""
+        path, cookies = self.account_for_slot(current_slot())
+        try:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': [to_cdp_cookie(cookie) for cookie in cookies]})
+        except Exception:
+            load_cookies(driver, path)
+        driver.account = path
+        return driver
+
+    def logged_out(self, driver):
+        """会话池在页面掉线时调用：集中刷新该浏览器使用的账号，之后重启的会话会拿到可用的 Cookies"""
+        path = getattr(driver, 'account', None)
+        if path is None:
+            return
+        with self.lock:
+            if path in self.expired:
+                return  # 其他线程已经处理过
+            mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            if mtime is not None and mtime != self.jars.get(path, (None,))[0] and self._load(path):
+                print(f"[{time.strftime('%H:%M:%S')}] [会话] 账号 '{path}' 的Cookies文件已更新，重新加载。")
+                self.refreshes += 1
+                return
+            self.expired.add(path)
+            remaining = self.active_accounts()
+            print(f"[{time.strftime('%H:%M:%S')}] [会话] 账号 '{path}' 已掉线，停用该账号" + (f"，剩余 {len(remaining)} 个账号继续轮换。" if remaining else "。"))
+            if remaining or not self.options_factory:
+                return
+            # 所有账号都已失效：由当前线程打开浏览器重新登录，其他线程在锁上等待
+            if perform_login(path, self.options_factory()) and self._load(path):
+                self.refreshes += 1
+
+    def report(self):
+        usage = ' | '.join(f"{os.path.basename(path)}: {count} 个会话{' (已停用)' if path in self.expired else ''}" for path, count in self.sessions.items())
+        print(f"登录账号: {usage}" + (f" | 刷新 {self.refreshes} 次" if self.refreshes else ""))
@@ -0,0 +1,122 @@
+# 多标签页模式：一个浏览器进程打开多个标签页，当前标签页在采集时，其余标签页预先加载队列中后面的链接
+# WebDriver 同一时间只能操作一个标签页，这里不并行执行脚本，而是让页面加载与采集重叠；浏览器进程数不变，同时在加载的页面更多
+# 用真实的 Chrome 对比多进程与多标签页的每分钟页面数和每个页面的内存（需要 Cookies 和 pip install psutil）:
+#   python tab_session.py [帖子链接 ...]
+import importlib.util
+import os
+import sys
+import time
+
+PREFETCH_JS = "window.location.href = arguments[0];"  # 在当前标签页中开始导航，不等待加载完成
+
+class TabDriver:
+    """包装一个 WebDriver，额外打开 tabs - 1 个空闲标签页用于预加载
+
+    prefetch(url) 在空闲标签页中开始加载 url 并立即返回（没有空闲标签页时排队，get 空出标签页后再开始）；之后 get(url) 直接切换到该标签页，只需等待剩余的加载时间。
+    没有预加载过的链接照常在当前标签页中导航。其余属性和方法（page_source、execute_script 等）都转给当前标签页。
+    setup(driver) 在每个新标签页中调用一次，用于只对单个标签页生效的 CDP 设置（例如请求屏蔽）。
+    """
+
+    def __init__(self, driver, tabs=3, setup=None):
+        self.driver = driver
+        self.tabs = max(1, tabs)
+        self.current = driver.current_window_handle
+        self.idle = []  # 可用于预加载的标签页
+        for _ in range(self.tabs - 1):
+            driver.switch_to.new_window('tab')
+            if setup:
+                setup(driver)
+            self.idle.append(driver.current_window_handle)
+        driver.switch_to.window(self.current)
+        self.prefetched = {}  # 链接 -> 正在加载或已加载该链接的标签页
+        self.waiting = []  # 等待空闲标签页的链接
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def __setattr__(self, name, value):
+        # 脚本在 driver 上附加的属性（capture、account 等）保存在被包装的 driver 上
+        if name in ('driver', 'tabs', 'current', 'idle', 'prefetched', 'waiting', 'hits', 'misses'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.driver, name, value)
+
+    def prefetch(self, url):
+        """预加载 url；已在预加载或排队时返回 False"""
+        if url in self.prefetched or url in self.waiting or self.tabs == 1:
+            return False
+        self.waiting.append(url)
+        self._start()
+        return True
+
+    def _start(self):
+        """让空闲标签页开始加载排队的链接，完成后切回当前标签页"""
+        if not (self.idle and self.waiting):
+            return
+        while self.idle and self.waiting:
+            url, handle = self.waiting.pop(0), self.idle.pop(0)
+            self.driver.switch_to.window(handle)
+            self.driver.execute_script(PREFETCH_JS, url)
+            self.prefetched[url] = handle
+        self.driver.switch_to.window(self.current)
+
+    def get(self, url):
+        handle = self.prefetched.pop(url, None)
+        if handle is None:
+            if url in self.waiting:
+                self.waiting.remove(url)
+            self.misses += 1
+            self.driver.get(url)
+            return
+        # 切换到预加载的标签页，原来的标签页空出来加载排队的下一个链接
+        self.hits += 1
+        self.idle.append(self.current)
+        self.current = handle
+        self.driver.switch_to.window(handle)
+        self._start()
+
+    def release(self):
+        """放弃尚未使用的预加载（例如任务已被其他会话完成，或引用页被跳过），标签页重新变为空闲"""
+        self.idle.extend(self.prefetched.values())
+        self.prefetched.clear()
+        self.waiting.clear()
+
+def tweet_pages(url):
+    """采集一条帖子时依次打开的页面：帖子页和引用页，作为 handler.prefetch 使用"""
+    return [url, url.rstrip('/') + '/quotes']
+
+def compare(urls, processes=3, rounds=2):
+    """分别用 processes 个浏览器进程（每个一个标签页）和 1 个浏览器进程（processes 个标签页）打开 urls，打印每分钟页面数和每个页面的内存"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    from browser_pool import BrowserPool
+    from lean_browser import browser_rss, psutil
+
+    spec = importlib.util.spec_from_file_location('autotwi_V2_0', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'autotwi_V2.0.py'))
+    autotwi = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(autotwi)
+
+    def open_page(driver, url):
+        driver.get(url)
+        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
+    open_page.prefetch = lambda url: [url]
+
+    print(f"{'模式':<14} | {'每分钟页面':>8} | {'浏览器内存(MB)':>13} | {'每个页面(MB)':>11} | 失败")
+    for mode_name, size, tabs in ((f'{processes} 进程 x 1 标签页', processes, 1), (f'1 进程 x {processes} 标签页', 1, processes)):
+        autotwi.TABS_PER_BROWSER = tabs
+        pool = BrowserPool(autotwi.create_logged_in_driver, size=size, pages_per_session=None)
+        start = time.perf_counter()
+        pool.run([url for _ in range(rounds) for url in urls], open_page)
+        elapsed = time.perf_counter() - start
+        rss = sum(browser_rss(driver) for driver in pool.drivers if driver is not None) / 1024 / 1024 if psutil else float('nan')
+        failures = len(pool.failures)
+        pool.close()
+        pages = len(urls) * rounds - failures
+        print(f"{mode_name:<14} | {pages / elapsed * 60:>8.1f} | {rss:>13.0f} | {rss / (size * tabs):>11.0f} | {failures}")
+
+if __name__ == "__main__":
+    compare(sys.argv[1:] or ["https://x.com/nasa"])
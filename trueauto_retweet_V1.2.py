@@ -8,105 +8,60 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from tweet_parser import parse_tweet_article
+from adaptive_wait import SCROLL_STATS
+import article_collector
+from instrumentation import COUNT_QUOTES_SKIPPED, METRICS, STAGE_CAPTURE, STAGE_GET, STAGE_PARSE, STAGE_SLEEP, STAGE_SOURCE, STAGE_WAIT, STAGE_WRITE
+from backoff import FAILURE_MISSING_SOURCE, BackoffPolicy, ScrapeFailure
+from browser_pool import BrowserPool
+from session_manager import SessionManager
+from lean_browser import apply_lean_options, enable_request_blocking, persistent_profile_dir
+from tab_session import TabDriver, tweet_pages
+from output_sink import RECORD_FILE_PATTERN, iter_records, open_sink
+from pipeline import ParsePool
+from job_ledger import LEDGER_FILE, STATE_DONE, JobLedger
+from network_capture import TimelineCapture, enable_performance_log
+from tweet_index import TWEET_INDEX_FILE, TweetIndex
 
 # --- 全局设置 ---
 COOKIES_FILE = 'x_cookies.json'
+ACCOUNT_COOKIE_FILES = None # 多账号轮换：Cookies 文件列表，例如 ['x_cookies.json', 'x_cookies_2.json']，各浏览器会话按槽位轮流使用；None 表示只用 COOKIES_FILE
 MAX_WORKERS = 2
 HEADLESS_MODE = False
+LEAN_BROWSER = False # 精简模式：屏蔽图片、字体、视频和统计脚本请求，并限制渲染进程内存（规则见 lean_browser.py）
+TABS_PER_BROWSER = 1 # 多标签页模式：每个浏览器打开的标签页数，当前标签页以外的标签页预加载队列中后面的链接，页面加载与采集重叠（见 tab_session.py）；1 表示不使用
+PERSISTENT_PROFILES = False # 每个浏览器会话使用固定的用户目录 (browser_profiles/retweet-N)，缓存和 Cookies 在多次运行之间保留
 REPLY_RETWEET_LIMIT = 20
-ERROR_WAIT_TIME = 183 # 错误发生时的等待时间（秒）
+OVERSAMPLE_FACTOR = None # 回复/引用的候选数达到 REPLY_RETWEET_LIMIT × 此倍数（如 2.0）后停止滚动，再从候选中随机抽样；样本只来自 X 排在最前面的那部分回复，不再是全部回复中的随机样本。None 表示始终滚动到最大次数
+SKIP_EMPTY_QUOTES = True # 源帖子的转发数（页面上包含引用数；网络捕获模式下使用接口返回的引用数）为 0 时不再打开 /quotes 页面
+INCREMENTAL_COLLECT = True # 滚动采集时只解析新出现的推文，而不是每次都重新解析整个页面
+ERROR_WAIT_TIME = 183 # 疑似触发反爬限制时，出错的浏览器会话首次暂停的秒数（连续出错时指数增长）
+PAGES_PER_SESSION = None # 每个浏览器会话处理多少个任务后重启；None 表示每个工作线程的会话一直复用到程序结束，只在浏览器失效时重启
+NETWORK_CAPTURE = False # 直接读取页面请求的时间线JSON (GraphQL 响应) 生成记录，拿不到响应时自动退回DOM解析
+PARSE_PROCESSES = 0 # 流水线：解析推文 HTML 的进程数，浏览器线程取回 HTML 后立即继续滚动，解析在进程池中进行；0 表示在浏览器线程中解析
+WRITE_QUEUE_SIZE = 0 # 流水线：后台写入线程的队列长度，写出跟不上时采集线程等待；0 表示在采集线程中直接写出
+OUTPUT_FORMAT = 'json' # 二次采集的输出格式: 'json' 每条一个文件（默认，与旧版一致）/ 'jsonl' / 'parquet'（需要 pyarrow）
+GLOBAL_DEDUPE = False # 全局去重：与 autotwi_V2.0.py 共用 tweet_index.sqlite3，其他任务或阶段已采集过的引用推文不再打开，只在 secondary_output/references.jsonl 中记录引用
+CASCADE_MODE = False # 级联模式：不再逐个stage做一次二次采集，而是从所有stage的第一阶段数据出发，广度优先地逐层跟进引用推文
+CASCADE_TOP_K = 3 # 级联模式下每条推文跟进转发量最高的前K条引用推文
+CASCADE_DEPTH = 3 # 级联模式下最多跟进的层数（CASCADE_TOP_K = 1、CASCADE_DEPTH = 1 相当于原来的二次采集）
+CASCADE_OUTPUT_DIR = 'cascade_output' # 级联模式的输出文件夹
+CASCADE_EDGES_FILE = 'cascade_edges.jsonl' # 传播树的父子边，保存在级联输出文件夹中
 
 # --- 核心函数 ---
 
-def save_cookies(driver, file_path):
-    """保存当前浏览器的Cookies到文件"""
-    with open(file_path, 'w') as f:
-        json.dump(driver.get_cookies(), f)
-    print(f"Cookies have been saved to {file_path}")
-
-def load_cookies(driver, file_path):
-    """从文件加载Cookies到浏览器"""
-    if os.path.exists(file_path):
-        driver.get("https://x.com/")
-        with open(file_path, 'r') as f:
-            cookies = json.load(f)
-        for cookie in cookies:
-            driver.add_cookie(cookie)
-        return True
-    return False
-
-def parse_tweet_article(article_soup):
-    """从一个包含单条推文的 'article' HTML片段中解析出所有数据"""
-    try:
-        time_elements = article_soup.find_all('time')
-        if not time_elements: return None
-        time_element = time_elements[-1]
+PARSER = None # 解析进程池，main 中按 PARSE_PROCESSES 创建
+INDEX = None # 全局推文索引，main 中按 GLOBAL_DEDUPE 创建
 
-        if not time_element.find_parent('a'): return None
-        post_link = "https://x.com" + time_element.find_parent('a')['href']
-        post_time = time_element['datetime']
-        
-        user_id = post_link.split('/')[3]
-        user_name_div = article_soup.find('div', {'data-testid': 'User-Name'})
-        nickname = user_name_div.find_all('span')[0].text if user_name_div else user_id
-        
-        tweet_text_div = article_soup.find('div', {'data-testid': 'tweetText'})
-        if tweet_text_div:
-            for img in tweet_text_div.find_all('img', alt=True): img.replace_with(img['alt'])
-        content = tweet_text_div.get_text(separator='\n', strip=True) if tweet_text_div else ''
-        
-        emoji_pattern = re.compile("[" u"\U0001F600-\U0001F64F" u"\U0001F300-\U0001F5FF" u"\U0001F680-\U0001F6FF" u"\U0001F1E0-\U0001F1FF" u"\U00002702-\U000027B0" u"\U000024C2-\U0001F251" "]+", flags=re.UNICODE)
-        emojis = emoji_pattern.findall(content)
-        hashtags = [tag.text for tag in article_soup.find_all('a', href=re.compile(r'/hashtag/'))]
-        reply_count_element = article_soup.find('button', {'data-testid': 'reply'}) or article_soup.find('div', {'data-testid': 'reply'})
-        retweet_count_element = article_soup.find('button', {'data-testid': 'retweet'}) or article_soup.find('div', {'data-testid': 'retweet'})
-        like_count_element = article_soup.find('button', {'data-testid': 'like'}) or article_soup.find('div', {'data-testid': 'like'})
-
-        def parse_metric(element):
-            if not element: return 0
-            aria_label = element.get('aria-label', '')
-            if aria_label:
-                match = re.search(r'([\d,]+)', aria_label)
-                if match:
-                    try: return int(match.group(1).replace(',', ''))
-                    except (ValueError, TypeError): pass
-            text = element.get_text(strip=True).upper()
-            if not text: return 0
-            if 'K' in text: return int(float(text.replace('K', '')) * 1000)
-            if 'M' in text: return int(float(text.replace('M', '')) * 1000000)
-            try: return int(text)
-            except (ValueError, TypeError): return 0
-
-        return {"nickname": nickname, "user_id": user_id, "platform": "X", "post_time": post_time, "ip_location": "N/A (Not available on web version)", "hashtags": ", ".join(hashtags), "post_text": content, "emojis": emojis, "reply_count": parse_metric(reply_count_element), "retweet_count": parse_metric(retweet_count_element), "like_count": parse_metric(like_count_element), "post_url": post_link}
-    except Exception: return None
-
-def scroll_and_collect(driver, seen_tweets, max_scrolls=1):
-    """通过限制滚动次数来快速采集样本"""
-    collected_data = []
-    scroll_count = 0
-    while scroll_count < max_scrolls:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        articles = soup.find_all('article', {'data-testid': 'tweet'})
-        new_tweets_found = False
-        for article in articles:
-            parsed_data = parse_tweet_article(article)
-            if parsed_data and parsed_data['post_url'] not in seen_tweets:
-                collected_data.append(parsed_data)
-                seen_tweets.add(parsed_data['post_url'])
-                new_tweets_found = True
-        
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(2.0, 3.5))
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        
-        scroll_count += 1
-        if new_height == last_height and not new_tweets_found:
-            break
-            
-    return collected_data
+def scroll_and_collect(driver, seen_tweets, max_scrolls=1, target=None):
+    """按本脚本的 INCREMENTAL_COLLECT / PARSER 设置滚动采集（见 article_collector.scroll_and_collect）"""
+    return article_collector.scroll_and_collect(driver, seen_tweets, max_scrolls, target, last_time=True, incremental=INCREMENTAL_COLLECT, parser=PARSER)
+
+def sample_target():
+    """回复和引用各自需要的候选数：从 REPLY_RETWEET_LIMIT × OVERSAMPLE_FACTOR 条候选中随机抽取 REPLY_RETWEET_LIMIT 条"""
+    if not OVERSAMPLE_FACTOR:
+        return None
+    return max(REPLY_RETWEET_LIMIT, round(REPLY_RETWEET_LIMIT * OVERSAMPLE_FACTOR))
 
 def get_chrome_options():
     """配置Chrome浏览器选项以提高速度"""
@@ -118,167 +73,249 @@ def get_chrome_options():
     options.add_argument("--start-maximized")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if LEAN_BROWSER: apply_lean_options(options)
+    profile_dir = persistent_profile_dir('retweet') if PERSISTENT_PROFILES else None
+    if profile_dir: options.add_argument(f"--user-data-dir={profile_dir}")
+    if NETWORK_CAPTURE: enable_performance_log(options)
     return options
 
-def perform_initial_login():
-    """仅在没有cookies时执行，用于首次手动登录"""
-    if os.path.exists(COOKIES_FILE): return
-    print("Cookies file not found. A browser will open for you to log in.")
-    print("Please log in manually. You have 120 seconds...")
-    login_options = get_chrome_options()
-    if any('--headless' in arg for arg in login_options.arguments): login_options.arguments.remove('--headless')
-    driver = webdriver.Chrome(options=login_options)
-    driver.get("https://x.com/login")
-    try:
-        WebDriverWait(driver, 120).until(EC.url_contains("home"))
-        print("Login successful! Saving cookies for future use...")
-        save_cookies(driver, COOKIES_FILE)
-    except Exception: print("Login timed out or failed.")
-    finally: driver.quit()
-
-def process_url(task, secondary_output_path):
-    """处理单个URL的完整爬取流程"""
-    url = task['url_to_scrape']
-    source_filename = task['source_filename']
-    
-    output_dir = os.path.join(secondary_output_path, source_filename)
-    
-    thread_id = f"线程-{random.randint(100, 999)}"
-    print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 开始处理链接: {url}")
+def create_logged_in_driver(sessions=None):
+    """创建一个新的浏览器并注入登录 Cookies，供浏览器会话池使用；sessions 为 None 时只读取 COOKIES_FILE"""
+    sessions = sessions or SessionManager([COOKIES_FILE])
     driver = webdriver.Chrome(options=get_chrome_options())
+    if LEAN_BROWSER: enable_request_blocking(driver)
     try:
-        if not load_cookies(driver, COOKIES_FILE):
-            print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 无法加载Cookies，跳过链接 {url}")
-            return
+        sessions.attach(driver)
+    except Exception:
+        driver.quit()
+        raise
+    if TABS_PER_BROWSER > 1: driver = TabDriver(driver, TABS_PER_BROWSER, setup=enable_request_blocking if LEAN_BROWSER else None)
+    if NETWORK_CAPTURE: driver.capture = TimelineCapture(driver)
+    return driver
 
+def scrape_tweet(driver, url, thread_id):
+    """打开帖子页和引用页，返回带 replies / retweets_with_comment 的源帖子记录；出错时抛出异常"""
+    print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 开始处理链接: {url}")
+    capture = getattr(driver, 'capture', None)
+    if capture: capture.reset()
+    with METRICS.stage(STAGE_GET):
         driver.get(url)
-        
-        wait = WebDriverWait(driver, 20)
-        source_tweet = None
-        
+    
+    wait = WebDriverWait(driver, 20)
+    with METRICS.stage(STAGE_WAIT):
+        source_article_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
+    
+    if random.randint(1, 3) == 1:
         try:
-            source_article_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
-            
-            if random.randint(1, 3) == 1:
-                try:
-                    like_button = source_article_element.find_element(By.CSS_SELECTOR, "button[data-testid='like']")
-                    like_button.click()
-                    print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [操作] 模拟点赞成功: {url}")
-                    time.sleep(random.uniform(1, 2))
-                except Exception:
-                    pass
-
-            source_soup = BeautifulSoup(source_article_element.get_attribute('outerHTML'), 'html.parser')
-            source_tweet = parse_tweet_article(source_soup)
-        except Exception as find_error:
-            print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [警告] 查找源帖子时出错，将暂停 {ERROR_WAIT_TIME // 60} 分钟... Error: {find_error}")
-            for i in range(ERROR_WAIT_TIME, 0, -1):
-                print(f"\r[{time.strftime('%H:%M:%S')}] {thread_id}: 倒计时: {i:03d} 秒...", end="", flush=True)
-                time.sleep(1)
-            print(f"\n[{time.strftime('%H:%M:%S')}] {thread_id}: 暂停结束，放弃此链接。")
-            return
-        
-        if not source_tweet:
-            print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [失败] 页面加载后未能找到并解析源帖子 {url}")
-            return
-
-        seen_tweets = {source_tweet['post_url']}
-
-        final_replies = scroll_and_collect(driver, seen_tweets, max_scrolls=1)
-        quotes_url = url.rstrip('/') + "/quotes"
-        all_retweets = []
+            like_button = source_article_element.find_element(By.CSS_SELECTOR, "button[data-testid='like']")
+            like_button.click()
+            print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [操作] 模拟点赞成功: {url}")
+            with METRICS.stage(STAGE_SLEEP):
+                time.sleep(random.uniform(1, 2))
+        except Exception:
+            pass
+
+    source_tweet = quote_count = None
+    if capture:
+        with METRICS.stage(STAGE_CAPTURE):
+            source_tweet = capture.find(url.rstrip('/').split('/')[-1])
+            quote_count = capture.quote_count(url.rstrip('/').split('/')[-1])  # 滚动采集会取走缓冲区，先记下
+    if not source_tweet:
+        with METRICS.stage(STAGE_SOURCE):
+            article_html = source_article_element.get_attribute('outerHTML')
+        with METRICS.stage(STAGE_PARSE):
+            source_tweet = parse_tweet_article(article_html, last_time=True)
+    
+    if not source_tweet:
+        raise ScrapeFailure(FAILURE_MISSING_SOURCE, f"页面加载后未能找到并解析源帖子 {url}")
+
+    seen_tweets = {source_tweet['post_url']}
+
+    target = sample_target()
+    final_replies = scroll_and_collect(driver, seen_tweets, max_scrolls=1, target=target)
+    quotes_url = url.rstrip('/') + "/quotes"
+    all_retweets = []
+    if SKIP_EMPTY_QUOTES and (quote_count == 0 if quote_count is not None else source_tweet.get('retweet_count') == 0):
+        METRICS.count(COUNT_QUOTES_SKIPPED)  # 引用数为 0（页面上的转发数包含引用数）时引用页面必然为空
+    else:
         try:
-            driver.get(quotes_url)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
-            all_retweets = scroll_and_collect(driver, seen_tweets, max_scrolls=1)
+            if capture: capture.reset()
+            with METRICS.stage(STAGE_GET):
+                driver.get(quotes_url)
+            with METRICS.stage(STAGE_WAIT):
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "article[data-testid='tweet']")))
+            all_retweets = scroll_and_collect(driver, seen_tweets, max_scrolls=1, target=target)
         except Exception: pass
 
-        if len(final_replies) > REPLY_RETWEET_LIMIT: sampled_replies = random.sample(final_replies, REPLY_RETWEET_LIMIT)
-        else: sampled_replies = final_replies
+    if len(final_replies) > REPLY_RETWEET_LIMIT: sampled_replies = random.sample(final_replies, REPLY_RETWEET_LIMIT)
+    else: sampled_replies = final_replies
 
-        if len(all_retweets) > REPLY_RETWEET_LIMIT: sampled_retweets = random.sample(all_retweets, REPLY_RETWEET_LIMIT)
-        else: sampled_retweets = all_retweets
+    if len(all_retweets) > REPLY_RETWEET_LIMIT: sampled_retweets = random.sample(all_retweets, REPLY_RETWEET_LIMIT)
+    else: sampled_retweets = all_retweets
 
-        source_tweet['replies'] = sampled_replies
-        source_tweet['retweets_with_comment'] = sampled_retweets
-        
-        post_time_str = source_tweet.get('post_time', str(time.time()))
-        filename_time = post_time_str.replace('T', '_').replace(':', '-').split('.')[0]
-        tweet_id = url.split('/')[-1]
-        output_filename = f"{filename_time}_id_{tweet_id}.json"
+    source_tweet['replies'] = sampled_replies
+    source_tweet['retweets_with_comment'] = sampled_retweets
+    return source_tweet
 
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, output_filename)
+def tweet_id_of(url):
+    return url.rstrip('/').split('/')[-1]
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(source_tweet, f, ensure_ascii=False, indent=4)
-        print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [成功] {url} 的数据已保存至 {output_path}")
+def record_filename(record, url):
+    """json 模式下的输出文件名: {发布时间}_id_{推文ID}.json"""
+    post_time_str = record.get('post_time', str(time.time()))
+    filename_time = post_time_str.replace('T', '_').replace(':', '-').split('.')[0]
+    return f"{filename_time}_id_{tweet_id_of(url)}.json"
 
-    except Exception as e:
-        print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: 处理链接 {url} 时发生严重错误: {e}")
-    finally:
-        driver.quit()
+def process_url(driver, task, sink):
+    """处理单个URL的完整爬取流程，出错时抛出异常交给浏览器会话池分类、退避和重试"""
+    url = task['url_to_scrape']
+    source_filename = task['source_filename']
+    
+    thread_id = f"线程-{random.randint(100, 999)}"
+    source_tweet = scrape_tweet(driver, url, thread_id)
+    output_filename = record_filename(source_tweet, url)
+
+    # 以源文件名作为断点续传键；json 模式下仍保存为 secondary_output/{源文件名}/{时间}_id_{ID}.json
+    with METRICS.stage(STAGE_WRITE):
+        output_path = sink.write(source_tweet, source_filename, filename=os.path.join(source_filename, output_filename))
+    print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [成功] {url} 的数据已保存至 {output_path}")
+
+def top_quotes(record, k):
+    """按转发量从高到低返回记录中前 k 条带链接的引用推文（转发量相同时保持原顺序）"""
+    retweets = [retweet for retweet in record.get('retweets_with_comment', []) if retweet.get('post_url')]
+    return sorted(retweets, key=lambda x: x.get('retweet_count', 0), reverse=True)[:k]
 
 def find_all_top_retweets(stage_path, secondary_output_path):
     """
     遍历指定stage文件夹的数据文件，找到每个文件中转发量最高的转推，并返回一个任务列表。
+    同时支持每条一个 JSON 文件和 JSONL 格式的第一阶段数据。
     """
     print(f"开始分析 {stage_path} 的第一阶段数据...")
     tasks = []
     
-    for filename in os.listdir(stage_path):
-        if re.search(r'_id_(\d+).json$', filename):
-            file_path = os.path.join(stage_path, filename)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                retweets = data.get('retweets_with_comment', [])
-                if not retweets:
-                    continue
-                    
-                top_retweet = max(retweets, key=lambda x: x.get('retweet_count', 0))
-                top_url = top_retweet.get('post_url')
-                
-                if top_url:
-                    tasks.append({
-                        "source_filename": os.path.splitext(filename)[0],
-                        "url_to_scrape": top_url
-                    })
-            except Exception as e:
-                print(f"  [警告] 跳过文件 {file_path}，原因: {e}")
+    for record_key, data in iter_records(stage_path):
+        for top_retweet in top_quotes(data, 1):
+            tasks.append({
+                "source_filename": record_key,
+                "url_to_scrape": top_retweet['post_url']
+            })
     
     print(f"分析完成！在 {stage_path} 中共找到 {len(tasks)} 个高转发链接需要进行二次采集。")
     return tasks
 
-def main():
-    # --- 【新功能】自动化工作流 ---
-    # 1. 查找所有以 'stage' 开头的文件夹
-    try:
-        stage_folders = [d for d in os.listdir('.') if os.path.isdir(d) and d.startswith('stage')]
-        stage_folders.sort(key=lambda s: int(re.search(r'\d+', s).group()))
-    except Exception:
-        print("错误：无法找到或排序stage文件夹。请确保脚本与stage数据文件夹在同一目录下。")
-        return
-
-    if not stage_folders:
-        print("在当前目录下未找到任何以 'stage' 开头的文件夹。")
-        return
-
-    # 2. 对所有任务，只需登录一次
-    perform_initial_login()
-
-    # 3. 按顺序执行每个stage的任务
+def cascade_children(record, key, payload):
+    """返回 record 中需要继续跟进的引用推文任务 [(推文ID, 链接, 任务信息), ...]；已到最大层数时返回空列表"""
+    depth = payload['depth'] + 1
+    if depth > CASCADE_DEPTH:
+        return []
+    root = payload.get('root') or key
+    return [(tweet_id_of(retweet['post_url']), retweet['post_url'], {"parent": key, "root": root, "depth": depth, "retweet_count": retweet.get('retweet_count', 0)})
+            for retweet in top_quotes(record, CASCADE_TOP_K)]
+
+def register_cascade_seeds(ledger, task_name, stage_folders):
+    """把各stage第一阶段数据中的帖子登记为已完成的根节点（第 0 层），并登记它们的第一层引用推文；返回登记的任务数"""
+    added = 0
     for stage_folder in stage_folders:
-        print(f"\n{'='*50}")
-        print(f"开始处理阶段: {stage_folder}")
-        print(f"{'='*50}\n")
-
-        secondary_output_path = os.path.join(stage_folder, 'secondary_output')
-        tasks_file_path = os.path.join(secondary_output_path, 'secondary_tasks.json')
-        os.makedirs(secondary_output_path, exist_ok=True)
+        for record_key, record in iter_records(stage_folder):
+            if not record.get('post_url'):
+                continue
+            root = tweet_id_of(record['post_url'])
+            payload = {"depth": 0, "stage": stage_folder, "source_filename": record_key}
+            ledger.add(task_name, [(root, record['post_url'], payload)], state=STATE_DONE)
+            added += len(ledger.add(task_name, cascade_children(record, root, payload)))
+    return added
+
+def export_cascade_edges(ledger, task_name, path):
+    """从台账导出传播树：每行一条 父推文 -> 引用推文 的边，重建传播树时不必重新读取输出文件；返回边数"""
+    count = 0
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for key, url, payload, state in ledger.jobs(task_name):
+            if payload and payload.get('parent'):
+                edge = {"parent": payload['parent'], "child": key, "root": payload['root'], "depth": payload['depth'], "url": url, "retweet_count": payload.get('retweet_count', 0), "state": state}
+                f.write(json.dumps(edge, ensure_ascii=False) + '\n')
+                count += 1
+    os.replace(path + '.tmp', path)
+    return count
+
+def run_cascade(pool, ledger, stage_folders):
+    """级联模式：所有层级共用一个浏览器会话池和一个全局任务队列，以推文ID在所有层级间去重"""
+    task_name = CASCADE_OUTPUT_DIR
+    sink = open_sink(CASCADE_OUTPUT_DIR, OUTPUT_FORMAT, key_of=lambda name: (RECORD_FILE_PATTERN.search(name) or [None, None])[1],
+                     on_durable=lambda keys: ledger.complete(task_name, keys), background=WRITE_QUEUE_SIZE)
+    if not ledger.has_task(task_name):
+        print(f"首次运行级联模式，从 {len(stage_folders)} 个stage文件夹中登记根节点...")
+        added = register_cascade_seeds(ledger, task_name, stage_folders)
+        ledger.complete(task_name, sink.completed_keys())
+        print(f"已登记 {added} 个第一层引用推文 (每条推文跟进前 {CASCADE_TOP_K} 条，最多 {CASCADE_DEPTH} 层)。")
+
+    ledger.requeue(task_name)
+    pending_jobs = ledger.pending(task_name)
+    counts = ledger.counts(task_name)
+    print(f"\n级联任务: 已登记推文: {sum(counts.values())} | 已完成: {counts.get('done', 0)} | 待处理: {len(pending_jobs)}")
+    print(f"准备就绪，将使用 {pool.size} 个并行浏览器会话逐层采集...")
+
+    progress = {'done': 0, 'skipped': 0}
+
+    def scrape(driver, job):
+        key, url, payload = job
+        if not ledger.claim(task_name, key):
+            with pool.lock:
+                progress['skipped'] += 1
+            return  # 已在其他层级采集过，或已被其他线程领取
+        if INDEX:
+            INDEX.claim(key, task_name)  # 只登记不跳过：跟进下一层需要这条推文当前的引用列表
+        thread_id = f"线程-{random.randint(100, 999)}"
+        try:
+            record = scrape_tweet(driver, url, thread_id)
+            children = cascade_children(record, key, payload)
+            # 先登记下一层再写出记录：中途中断时，已写出记录的子任务一定已在台账中
+            ledger.add(task_name, children)
+            record['cascade'] = {"parent": payload.get('parent'), "root": payload.get('root'), "depth": payload['depth']}
+            with METRICS.stage(STAGE_WRITE):
+                output_path = sink.write(record, key, filename=record_filename(record, url))
+        except Exception as e:
+            ledger.fail(task_name, key, e)
+            raise
+        for child in children:
+            pool.submit(scrape, child)  # 重试时会重复派发，已完成或已领取的推文在 claim 时跳过
+        with pool.lock:
+            progress['done'] += 1
+        print(f"[{time.strftime('%H:%M:%S')}] {thread_id}: [成功] 第 {payload['depth']} 层 {url} 的数据已保存至 {output_path}，派发 {len(children)} 条引用推文 (累计完成 {progress['done']})")
+    scrape.prefetch = lambda job: tweet_pages(job[1])  # 多标签页模式下预加载的页面
 
-        # 4. 断点续传逻辑
+    try:
+        pool.run(pending_jobs, scrape)
+    finally:
+        sink.close()
+        failures, pool.failures = pool.failures, []
+        for failure in failures:
+            ledger.fail(task_name, failure['item'][0], failure['error'], final=True)
+            if INDEX:
+                INDEX.release(failure['item'][0], task_name)
+            print(f"  [放弃] [{failure['kind']}] {failure['item'][1]} (失败 {failure['attempts']} 次): {failure['error']}")
+        edge_count = export_cascade_edges(ledger, task_name, os.path.join(CASCADE_OUTPUT_DIR, CASCADE_EDGES_FILE))
+    SCROLL_STATS.report()
+    SCROLL_STATS.reset()
+    METRICS.report('级联采集')
+    METRICS.reset()
+    counts = ledger.counts(task_name)
+    print(f"级联采集结束: 本次完成 {progress['done']} 条，跨层重复跳过 {progress['skipped']} 条 | 台账: {counts} | 传播边 {edge_count} 条已写入 {CASCADE_EDGES_FILE}")
+
+def run_stage(pool, ledger, stage_folder):
+    """对一个stage文件夹执行二次采集，会话池由调用方创建并在各阶段之间复用"""
+    print(f"\n{'='*50}")
+    print(f"开始处理阶段: {stage_folder}")
+    print(f"{'='*50}\n")
+
+    secondary_output_path = os.path.join(stage_folder, 'secondary_output')
+    tasks_file_path = os.path.join(secondary_output_path, 'secondary_tasks.json')
+    os.makedirs(secondary_output_path, exist_ok=True)
+
+    # 4. 断点续传逻辑：台账中已有此阶段时直接续传，不再读取任务列表或扫描输出目录
+    # json 模式下每个已完成任务对应 secondary_output 中的一个同名文件夹；记录落盘后才在台账中标记完成
+    sink = open_sink(secondary_output_path, OUTPUT_FORMAT, key_of=lambda name: name, on_durable=lambda keys: ledger.complete(secondary_output_path, keys),
+                     background=WRITE_QUEUE_SIZE)
+    if not ledger.has_task(secondary_output_path):
         tasks_to_run = []
         if os.path.exists(tasks_file_path):
             print(f"找到阶段 '{stage_folder}' 的任务列表文件，将从中加载链接。")
@@ -294,29 +331,108 @@ def main():
         
         if not tasks_to_run:
             print(f"阶段 '{stage_folder}' 未找到任何可供二次采集的链接，跳过此阶段。")
-            continue
-            
-        # 5. 检查已完成的任务
-        processed_source_filenames = set(os.listdir(secondary_output_path))
-        pending_tasks = [task for task in tasks_to_run if task['source_filename'] not in processed_source_filenames]
-        
-        if not pending_tasks:
-            print(f"阶段 '{stage_folder}' 的所有二次采集任务均已处理完毕！")
-            continue
+            return
 
-        print(f"\n阶段 '{stage_folder}': 总任务数: {len(tasks_to_run)} | 已完成: {len(tasks_to_run) - len(pending_tasks)} | 待处理: {len(pending_tasks)}")
-        print(f"准备就绪，将使用 {MAX_WORKERS} 个并行线程处理剩余的链接...")
+        ledger.add(secondary_output_path, [(task['source_filename'], task['url_to_scrape'], task) for task in tasks_to_run])
+        # 从旧版迁移：只在首次登记时扫描一次已有输出
+        ledger.complete(secondary_output_path, sink.completed_keys())
         
-        # 6. 并行处理阶段
-        processed_count = 0
-        total_pending = len(pending_tasks)
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = {executor.submit(process_url, task, secondary_output_path): task for task in pending_tasks}
-            for future in as_completed(futures):
-                processed_count += 1
-                print(f"\n--- 阶段 '{stage_folder}' 进度: {processed_count}/{total_pending} 个待办链接已处理完毕 ---\n")
-
-    print("\n所有阶段均已处理完毕。")
+    # 5. 检查已完成的任务：上次中断或放弃的任务重新排队
+    ledger.requeue(secondary_output_path)
+    pending_tasks = [task for _, _, task in ledger.pending(secondary_output_path)]
+    counts = ledger.counts(secondary_output_path)
+    
+    if not pending_tasks:
+        print(f"阶段 '{stage_folder}' 的所有二次采集任务均已处理完毕！")
+        return
+
+    print(f"\n阶段 '{stage_folder}': 总任务数: {sum(counts.values())} | 已完成: {counts.get('done', 0)} | 待处理: {len(pending_tasks)}")
+    print(f"准备就绪，将使用 {pool.size} 个并行浏览器会话处理剩余的链接...")
+    
+    # 6. 并行处理阶段：出错的会话单独退避，失败的链接在重试预算内重新排队
+    progress = {'done': 0}
+    total_pending = len(pending_tasks)
+
+    def scrape(driver, task):
+        if not ledger.claim(secondary_output_path, task['source_filename']):
+            return  # 已被其他线程领取或已完成
+        try:
+            if INDEX:
+                owner = INDEX.claim(tweet_id_of(task['url_to_scrape']), secondary_output_path)
+                if owner is not None:
+                    # 其他阶段或 autotwi 的任务已采集过这条推文：记录引用，本任务视为完成
+                    INDEX.reference(secondary_output_path, task['url_to_scrape'], owner, source_filename=task['source_filename'])
+                    ledger.complete(secondary_output_path, [task['source_filename']])
+                    return
+            process_url(driver, task, sink)
+        except Exception as e:
+            ledger.fail(secondary_output_path, task['source_filename'], e)
+            raise
+        with pool.lock:
+            progress['done'] += 1
+            print(f"\n--- 阶段 '{stage_folder}' 进度: {progress['done']}/{total_pending} 个待办链接已处理完毕 ---\n")
+    scrape.prefetch = lambda task: tweet_pages(task['url_to_scrape'])  # 多标签页模式下预加载的页面
+
+    try:
+        pool.run(pending_tasks, scrape)
+    finally:
+        sink.close()
+    SCROLL_STATS.report()
+    SCROLL_STATS.reset()
+    METRICS.report(f"阶段 '{stage_folder}'")
+    METRICS.reset()
+    failures, pool.failures = pool.failures, []
+    for failure in failures:
+        ledger.fail(secondary_output_path, failure['item']['source_filename'], failure['error'], final=True)
+        if INDEX:
+            INDEX.release(tweet_id_of(failure['item']['url_to_scrape']), secondary_output_path)
+        print(f"  [放弃] [{failure['kind']}] {failure['item']['url_to_scrape']} (失败 {failure['attempts']} 次): {failure['error']}")
+
+def main():
+    # --- 【新功能】自动化工作流 ---
+    # 1. 查找所有以 'stage' 开头的文件夹
+    try:
+        stage_folders = [d for d in os.listdir('.') if os.path.isdir(d) and d.startswith('stage')]
+        stage_folders.sort(key=lambda s: int(re.search(r'\d+', s).group()))
+    except Exception:
+        print("错误：无法找到或排序stage文件夹。请确保脚本与stage数据文件夹在同一目录下。")
+        return
+
+    if not stage_folders:
+        print("在当前目录下未找到任何以 'stage' 开头的文件夹。")
+        return
+
+    # 2. 对所有任务，只需登录一次
+    sessions = SessionManager(ACCOUNT_COOKIE_FILES or [COOKIES_FILE], options_factory=get_chrome_options)
+    if not sessions.ensure_logged_in():
+        print("无法加载Cookies，程序无法继续执行。")
+        return
+    ledger = JobLedger(LEDGER_FILE)
+    # 每个工作线程独占一个已登录的浏览器会话，跨任务、跨阶段复用，只在浏览器失效时重启
+    pool = BrowserPool(lambda: create_logged_in_driver(sessions), size=MAX_WORKERS, pages_per_session=PAGES_PER_SESSION, name='线程',
+                       backoff=BackoffPolicy(rate_limit_delay=ERROR_WAIT_TIME), on_logged_out=sessions.logged_out)
+    global PARSER, INDEX
+    PARSER = ParsePool(PARSE_PROCESSES) if PARSE_PROCESSES else None
+    INDEX = TweetIndex(TWEET_INDEX_FILE) if GLOBAL_DEDUPE else None
+
+    try:
+        if CASCADE_MODE:
+            run_cascade(pool, ledger, stage_folders)
+        else:
+            # 3. 按顺序执行每个stage的任务
+            for stage_folder in stage_folders:
+                run_stage(pool, ledger, stage_folder)
+            print("\n所有阶段均已处理完毕。")
+    finally:
+        print(f"本次运行共启动 {pool.sessions_started} 个浏览器会话。")
+        sessions.report()
+        pool.close()
+        if PARSER: PARSER.close()
+        if INDEX:
+            INDEX.report()
+            INDEX.close()
+        ledger.close()
+        METRICS.close()
 
 if __name__ == "__main__":
     main()
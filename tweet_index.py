@@ -0,0 +1,114 @@
+# 全局推文索引：按数字推文 ID 记录每条帖子由哪个任务（输出文件夹）采集，autotwi 的搜索/采集和 trueauto 的二次采集共用一个 SQLite 文件
+# 其他任务已采集过的帖子不再打开，只在本任务文件夹的 references.jsonl 中记录一条指向已有记录的引用
+# 内存中只保存排序后的 64 位整数数组（1000 万条约 80 MB），用于快速判断“可能已采集”；归属以 SQLite 中的记录为准
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from heapq import merge
+
+TWEET_INDEX_FILE = 'tweet_index.sqlite3'
+REFERENCES_FILE = 'references.jsonl'  # 每个任务文件夹中的重复帖子引用，每行一条（已列入 output_sink.SIDE_FILES，读取记录时跳过）
+MERGE_EVERY = 50000  # 本次运行新登记的推文达到这么多条后并入排序数组
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    tweet_id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    claimed_at REAL NOT NULL
+);
+"""
+
+def tweet_id_from_url(url):
+    """https://x.com/{用户}/status/{ID} -> 整数 ID；不是帖子链接时返回 None"""
+    tail = url.rstrip('/').split('/')[-1]
+    return int(tail) if tail.isdigit() else None
+
+class TweetIndex:
+    """多个工作线程共用的全局推文索引，每个线程使用自己的 SQLite 连接（与 JobLedger 相同）
+
+    claim(tweet_id, task) 为任务登记一条帖子：尚未登记或已属于该任务时返回 None，已被其他任务登记时返回那个任务的名称。
+    release(tweet_id, task) 在采集最终失败时撤销登记，之后其他任务可以重新领取。
+    内存中的排序数组只增不减，撤销登记的推文仍在其中，因此 `in` 只表示“可能已登记”，命中后再查询 SQLite。
+    """
+
+    def __init__(self, path=TWEET_INDEX_FILE):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.recent = set()  # 本次运行新登记、尚未并入排序数组的推文
+        self.duplicates = 0
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        # INTEGER PRIMARY KEY 即 rowid，按 ID 顺序读取不需要额外排序
+        self.ids = array('q', (row[0] for row in connection.execute("SELECT tweet_id FROM tweets ORDER BY tweet_id")))
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def __contains__(self, tweet_id):
+        tweet_id = int(tweet_id)
+        position = bisect_left(self.ids, tweet_id)
+        return (position < len(self.ids) and self.ids[position] == tweet_id) or tweet_id in self.recent
+
+    def count(self):
+        """索引中登记的推文数"""
+        return self.connection().execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+
+    def _remember(self, tweet_id):
+        with self.lock:
+            self.recent.add(tweet_id)
+            if len(self.recent) >= MERGE_EVERY:
+                # 归并两个有序序列，不生成整个索引的临时列表
+                self.ids = array('q', merge(self.ids, sorted(self.recent)))
+                self.recent = set()
+
+    def owner(self, tweet_id):
+        """返回登记该推文的任务，未登记时返回 None"""
+        row = self.connection().execute("SELECT task FROM tweets WHERE tweet_id = ?", (int(tweet_id),)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, tweet_id, task):
+        tweet_id = int(tweet_id)
+        connection = self.connection()
+        # 内存中没有的推文一定是新的，直接插入；可能已登记的先只读查询归属，重复帖子不占用写锁
+        owner = self.owner(tweet_id) if tweet_id in self else None
+        if owner is None:
+            if connection.execute("INSERT OR IGNORE INTO tweets (tweet_id, task, claimed_at) VALUES (?, ?, ?)", (tweet_id, task, time.time())).rowcount == 1:
+                self._remember(tweet_id)
+                return None
+            owner = self.owner(tweet_id)  # 同时运行的另一个进程刚刚登记
+        if owner == task:
+            return None
+        with self.lock:
+            self.duplicates += 1
+        return owner
+
+    def release(self, tweet_id, task):
+        """撤销 task 对该推文的登记（已属于其他任务时不变）"""
+        self.connection().execute("DELETE FROM tweets WHERE tweet_id = ? AND task = ?", (int(tweet_id), task))
+
+    def reference(self, directory, url, owner, **extra):
+        """在 directory/references.jsonl 中记录一条重复帖子：它已由 owner 任务采集，本任务不再重复保存"""
+        entry = {"tweet_id": str(tweet_id_from_url(url)), "url": url, "owner": owner, **extra, "referenced_at": time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with self.lock:
+            with open(os.path.join(directory, REFERENCES_FILE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def report(self):
+        print(f"全局去重: 索引中共 {self.count()} 条推文 | 本次跳过 {self.duplicates} 条其他任务已采集的帖子（已记录到各任务的 {REFERENCES_FILE}）")
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
@@ -0,0 +1,130 @@
+# 推文和用户资料的紧凑记录：用 __slots__ 对象代替每条推文一个字典，回复和引用在写出前一直留在内存中时占用更少
+# 推文 ID 保存为整数，帖子链接在读取 post_url 时由用户名和 ID 拼出；"X"、"N/A ..." 等常量是类属性，不再逐条保存
+# 记录支持字典式的读写 (record['post_url']、get、items、**record)，脚本和写入器照常使用；写出时经 to_json 还原成与原来完全相同的字典
+import re
+import sys
+
+X_HOST = "https://x.com"
+PLATFORM = "X"
+IP_LOCATION_NA = "N/A (Not available on web version)"
+PROFILE_IP_LOCATION_NA = "N/A (无法从公开页面获取)"
+STATUS_PATH_PATTERN = re.compile(r'/([^/]+)/status/([1-9]\d*)')  # 可以由用户名和整数 ID 还原的帖子链接路径
+
+class Record:
+    """记录的公共部分：FIELDS 是 JSON 中的字段及顺序，之后附加的字段（replies、profile 等）按添加顺序保存在 extra 中"""
+    __slots__ = ('extra',)
+    FIELDS = ()
+
+    def __init__(self):
+        self.extra = None
+
+    def __getitem__(self, field):
+        if field in self.FIELDS:
+            return getattr(self, field)
+        if self.extra is not None and field in self.extra:
+            return self.extra[field]
+        raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        if field in self.FIELDS:
+            setattr(self, field, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[field] = value
+
+    def __contains__(self, field):
+        return field in self.FIELDS or (self.extra is not None and field in self.extra)
+
+    def get(self, field, default=None):
+        return self[field] if field in self else default
+
+    def keys(self):
+        return list(self.FIELDS) + list(self.extra or ())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.FIELDS) + len(self.extra or ())
+
+    def items(self):
+        return [(field, self[field]) for field in self.keys()]
+
+    def to_dict(self):
+        """与原来的字典相同的字段和顺序（嵌套的记录保持原样，由 to_json 逐层转换）"""
+        return {field: self[field] for field in self.keys()}
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return self.to_dict() == other if isinstance(other, dict) else NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class Tweet(Record):
+    """parse_tweet_article / map_tweet_result 返回的推文
+
+    path 为帖子链接去掉 https://x.com 的部分；符合 /{user_id}/status/{ID} 时只保存整数 ID，否则原样保存路径。
+    """
+    __slots__ = ('nickname', 'user_id', 'post_time', 'hashtags', 'post_text', 'emojis', 'reply_count', 'retweet_count', 'like_count', 'tweet_id', '_path')
+    FIELDS = ('nickname', 'user_id', 'platform', 'post_time', 'ip_location', 'hashtags', 'post_text', 'emojis', 'reply_count', 'retweet_count', 'like_count', 'post_url')
+    platform = PLATFORM
+    ip_location = IP_LOCATION_NA
+
+    def __init__(self, path, post_time, post_text, reply_count, retweet_count, like_count, nickname=None, user_id=None, hashtags='', emojis=None):
+        self.extra = None
+        match = STATUS_PATH_PATTERN.fullmatch(path)
+        if user_id is None and match:
+            user_id = match.group(1)
+        self.user_id = sys.intern(user_id) if user_id is not None else None  # 同一用户的多条回复共用一个字符串
+        self.tweet_id = int(match.group(2)) if match else None
+        self._path = None if match and match.group(1) == user_id else path
+        self.nickname = nickname
+        self.post_time = post_time
+        self.hashtags = hashtags
+        self.post_text = post_text
+        self.emojis = emojis if isinstance(emojis, list) else list(emojis or ())  # 原样保存列表，对它的修改会写出
+        self.reply_count = reply_count
+        self.retweet_count = retweet_count
+        self.like_count = like_count
+
+    @property
+    def post_url(self):
+        if self._path is not None:
+            return X_HOST + self._path
+        return f"{X_HOST}/{self.user_id}/status/{self.tweet_id}"
+
+    @post_url.setter
+    def post_url(self, url):
+        path = url[len(X_HOST):] if url.startswith(X_HOST) else url
+        match = STATUS_PATH_PATTERN.fullmatch(path)
+        self.tweet_id = int(match.group(2)) if match else None
+        self._path = None if match and match.group(1) == self.user_id else path
+
+class ProfileTweet(Tweet):
+    """parse_profile_tweet 返回的精简推文：只输出时间、正文、互动数据和链接"""
+    __slots__ = ()
+    FIELDS = ('post_time', 'post_text', 'reply_count', 'retweet_count', 'like_count', 'post_url')
+
+class UserProfile(Record):
+    """user_autotwi.fetch_profile 返回的用户资料，近期帖子等附加字段保存在 extra 中"""
+    __slots__ = ('scraped_url', 'scraped_timestamp', 'username', 'user_id', 'bio', 'location', 'website', 'join_date', 'following_count', 'followers_count')
+    FIELDS = ('scraped_url', 'scraped_timestamp', 'username', 'user_id', 'bio', 'location', 'website', 'join_date', 'following_count', 'followers_count', 'ip_location')
+    ip_location = PROFILE_IP_LOCATION_NA
+
+    def __init__(self, scraped_url, scraped_timestamp):
+        self.extra = None
+        self.scraped_url = scraped_url
+        self.scraped_timestamp = scraped_timestamp
+        self.username = self.user_id = self.bio = self.location = self.website = self.join_date = None
+        self.following_count = self.followers_count = 0
+
+def to_json(value):
+    """json.dump 的 default 参数：把记录对象转换成字典，输出与原来的字典逐字节相同"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
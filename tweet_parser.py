@@ -0,0 +1,282 @@
+# 三个脚本共用的推文解析模块：预编译正则 + 导入时自动选择最快的HTML解析后端
+# 可选后端（按优先级）: pip install selectolax / pip install lxml，都未安装时回退到 BeautifulSoup('html.parser')
+import os
+import re
+
+from bs4 import BeautifulSoup, Tag
+
+from tweet_model import X_HOST, ProfileTweet, Tweet
+
+ARTICLE_SELECTOR = "article[data-testid='tweet']"
+METRIC_TESTIDS = ('reply', 'retweet', 'like')
+
+EMOJI_PATTERN = re.compile("[" u"\U0001F600-\U0001F64F" u"\U0001F300-\U0001F5FF" u"\U0001F680-\U0001F6FF" u"\U0001F1E0-\U0001F1FF" u"\U00002702-\U000027B0" u"\U000024C2-\U0001F251" "]+", flags=re.UNICODE)
+HASHTAG_HREF_PATTERN = re.compile(r'/hashtag/')
+METRIC_DIGITS_PATTERN = re.compile(r'([\d,]+)')
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+def available_backends():
+    """返回当前环境中可用的解析后端，按速度从快到慢排列"""
+    backends = []
+    if LexborHTMLParser is not None: backends.append('selectolax')
+    if etree is not None: backends.append('lxml')
+    backends.append('bs4')
+    return backends
+
+def _pick_backend():
+    """导入时选择解析后端，可通过环境变量 TWEET_PARSER_BACKEND 强制指定"""
+    requested = os.environ.get('TWEET_PARSER_BACKEND', '').strip().lower()
+    if requested in available_backends():
+        return requested
+    return available_backends()[0]
+
+PARSER_BACKEND = _pick_backend()
+
+# --- 互动数据解析 ---
+
+def parse_count_text(text):
+    """解析带单位（万, K, M）和千位分隔符的数字文本"""
+    if not text:
+        return 0
+    text = text.replace(',', '').strip().upper()
+    try:
+        if '万' in text:
+            return int(float(text.replace('万', '')) * 10000)
+        if 'K' in text:
+            return int(float(text.replace('K', '')) * 1000)
+        if 'M' in text:
+            return int(float(text.replace('M', '')) * 1000000)
+        return int(text)
+    except (ValueError, TypeError):
+        return 0
+
+def _metric_value(aria_label, get_text, lenient):
+    """优先从 aria-label 中读取精确数字，否则解析按钮上显示的文本（如 1.2K）"""
+    if aria_label:
+        match = METRIC_DIGITS_PATTERN.search(aria_label)
+        if match:
+            try: return int(match.group(1).replace(',', ''))
+            except (ValueError, TypeError): pass
+    if lenient:
+        return parse_count_text(get_text())
+    text = get_text().upper()
+    if not text: return 0
+    if 'K' in text: return int(float(text.replace('K', '')) * 1000)
+    if 'M' in text: return int(float(text.replace('M', '')) * 1000000)
+    try: return int(text)
+    except (ValueError, TypeError): return 0
+
+def parse_metric(element, lenient=False):
+    """从 BeautifulSoup 的互动按钮元素中解析数字"""
+    if not element: return 0
+    return _metric_value(element.get('aria-label', ''), lambda: element.get_text(strip=True), lenient)
+
+def _build_record(href, post_time, nickname, content, hashtags, metrics, profile):
+    """把各后端抽取出的原始字段组装成 Tweet / ProfileTweet，写出的 JSON 与原 parse_tweet_article 的字典完全一致"""
+    if profile:
+        reply_count, retweet_count, like_count = [_metric_value(aria, get_text, True) if get_text else 0 for aria, get_text in metrics]
+        return ProfileTweet(href, post_time, content, reply_count, retweet_count, like_count)
+    user_id = (X_HOST + href).split('/')[3]
+    if nickname is None: nickname = user_id
+    emojis = EMOJI_PATTERN.findall(content)
+    reply_count, retweet_count, like_count = [_metric_value(aria, get_text, False) if get_text else 0 for aria, get_text in metrics]
+    return Tweet(href, post_time, content, reply_count, retweet_count, like_count, nickname=nickname, user_id=user_id, hashtags=", ".join(hashtags), emojis=emojis)
+
+def _stripped_join(strings, separator):
+    return separator.join(s for s in (s.strip() for s in strings) if s)
+
+# --- BeautifulSoup 后端（与原实现逐行对应，作为参照实现） ---
+
+def _parse_bs4(article_soup, last_time, profile):
+    if last_time:
+        time_elements = article_soup.find_all('time')
+        if not time_elements: return None
+        time_element = time_elements[-1]
+    else:
+        time_element = article_soup.find('time')
+        if not time_element: return None
+    link = time_element.find_parent('a')
+    if not link: return None
+    href = link['href']
+    post_time = time_element['datetime']
+    nickname = None
+    hashtags = []
+    if not profile:
+        user_name_div = article_soup.find('div', {'data-testid': 'User-Name'})
+        if user_name_div: nickname = user_name_div.find_all('span')[0].text
+    tweet_text_div = article_soup.find('div', {'data-testid': 'tweetText'})
+    if tweet_text_div and not profile:
+        for img in tweet_text_div.find_all('img', alt=True): img.replace_with(img['alt'])
+    content = tweet_text_div.get_text(separator='\n', strip=True) if tweet_text_div else ''
+    if not profile:
+        hashtags = [tag.text for tag in article_soup.find_all('a', href=HASHTAG_HREF_PATTERN)]
+    metrics = []
+    for testid in METRIC_TESTIDS:
+        element = article_soup.find('button', {'data-testid': testid}) or article_soup.find('div', {'data-testid': testid})
+        metrics.append((element.get('aria-label', ''), lambda element=element: element.get_text(strip=True)) if element else ('', None))
+    return _build_record(href, post_time, nickname, content, hashtags, metrics, profile)
+
+# --- lxml 后端 ---
+
+def _lxml_strings(element, img_alt):
+    """按文档顺序产出元素内的所有文本节点（跳过注释），img_alt 为真时用 alt 文本代替表情图片"""
+    if element.text: yield element.text
+    for child in element:
+        if isinstance(child.tag, str):
+            if img_alt and child.tag == 'img' and child.get('alt') is not None: yield child.get('alt')
+            else: yield from _lxml_strings(child, img_alt)
+        if child.tail: yield child.tail
+
+def _parse_lxml(article, last_time, profile):
+    time_element = user_name_div = tweet_text_div = None
+    hashtag_links = []
+    buttons, divs = {}, {}
+    # 单次遍历收集所有需要的节点
+    for element in article.iterdescendants():
+        tag = element.tag
+        if not isinstance(tag, str): continue
+        if tag == 'time':
+            if last_time or time_element is None: time_element = element
+        elif tag == 'div':
+            testid = element.get('data-testid')
+            if testid == 'User-Name':
+                if user_name_div is None: user_name_div = element
+            elif testid == 'tweetText':
+                if tweet_text_div is None: tweet_text_div = element
+            elif testid in METRIC_TESTIDS and testid not in divs: divs[testid] = element
+        elif tag == 'button':
+            testid = element.get('data-testid')
+            if testid in METRIC_TESTIDS and testid not in buttons: buttons[testid] = element
+        elif tag == 'a' and not profile:
+            href = element.get('href')
+            if href is not None and HASHTAG_HREF_PATTERN.search(href): hashtag_links.append(element)
+    if time_element is None: return None
+    link = next(time_element.iterancestors('a'), None)
+    if link is None: return None
+    href, post_time = link.get('href'), time_element.get('datetime')
+    if href is None or post_time is None: return None
+    nickname = None
+    if not profile and user_name_div is not None:
+        nickname = "".join(_lxml_strings(next(user_name_div.iterdescendants('span')), False))
+    content = _stripped_join(_lxml_strings(tweet_text_div, not profile), '\n') if tweet_text_div is not None else ''
+    hashtags = ["".join(_lxml_strings(link, False)) for link in hashtag_links]
+    metrics = []
+    for testid in METRIC_TESTIDS:
+        element = buttons.get(testid, divs.get(testid))
+        metrics.append((element.get('aria-label') or '', lambda element=element: _stripped_join(_lxml_strings(element, False), '')) if element is not None else ('', None))
+    return _build_record(href, post_time, nickname, content, hashtags, metrics, profile)
+
+# --- selectolax 后端 ---
+
+def _selectolax_strings(node, img_alt):
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == '-text': yield child.text(deep=False)
+        elif tag.startswith(('-', '_')): continue
+        elif img_alt and tag == 'img' and 'alt' in child.attributes: yield child.attributes['alt'] or ''
+        else: yield from _selectolax_strings(child, img_alt)
+
+def _parse_selectolax(article, last_time, profile):
+    time_element = user_name_div = tweet_text_div = None
+    hashtag_links = []
+    buttons, divs = {}, {}
+    for node in article.traverse(include_text=False):
+        tag = node.tag
+        if node is article or tag.startswith(('-', '_')): continue
+        if tag == 'time':
+            if last_time or time_element is None: time_element = node
+        elif tag == 'div':
+            testid = node.attributes.get('data-testid')
+            if testid == 'User-Name':
+                if user_name_div is None: user_name_div = node
+            elif testid == 'tweetText':
+                if tweet_text_div is None: tweet_text_div = node
+            elif testid in METRIC_TESTIDS and testid not in divs: divs[testid] = node
+        elif tag == 'button':
+            testid = node.attributes.get('data-testid')
+            if testid in METRIC_TESTIDS and testid not in buttons: buttons[testid] = node
+        elif tag == 'a' and not profile:
+            href = node.attributes.get('href')
+            if href is not None and HASHTAG_HREF_PATTERN.search(href): hashtag_links.append(node)
+    if time_element is None: return None
+    link = time_element.parent
+    while link is not None and link.tag != 'a': link = link.parent
+    if link is None: return None
+    href, post_time = link.attributes.get('href'), time_element.attributes.get('datetime')
+    if href is None or post_time is None: return None
+    nickname = None
+    if not profile and user_name_div is not None:
+        nickname = "".join(_selectolax_strings(user_name_div.css('span')[0], False))
+    content = _stripped_join(_selectolax_strings(tweet_text_div, not profile), '\n') if tweet_text_div is not None else ''
+    hashtags = ["".join(_selectolax_strings(link, False)) for link in hashtag_links]
+    metrics = []
+    for testid in METRIC_TESTIDS:
+        node = buttons.get(testid, divs.get(testid))
+        metrics.append((node.attributes.get('aria-label') or '', lambda node=node: _stripped_join(_selectolax_strings(node, False), '')) if node is not None else ('', None))
+    return _build_record(href, post_time, nickname, content, hashtags, metrics, profile)
+
+# --- 对外接口 ---
+
+def _parse(article, last_time, profile, backend):
+    try:
+        if isinstance(article, Tag):
+            return _parse_bs4(article, last_time, profile)
+        backend = backend or PARSER_BACKEND
+        if backend == 'selectolax':
+            tree = LexborHTMLParser(article)
+            node = tree.css_first('article') or tree.body
+            return _parse_selectolax(node, last_time, profile) if node is not None else None
+        if backend == 'lxml':
+            root = etree.HTML(article)
+            if root is None: return None
+            node = next(root.iter('article'), root)
+            return _parse_lxml(node, last_time, profile)
+        soup = BeautifulSoup(article, 'html.parser')
+        return _parse_bs4(soup.find('article') or soup, last_time, profile)
+    except Exception:
+        return None
+
+def parse_tweet_article(article, last_time=False, backend=None):
+    """从单条推文的 'article'（BeautifulSoup 元素或 outerHTML 字符串）中解析出所有数据
+
+    last_time=True 时以最后一个 <time> 元素定位帖子链接（转推脚本的旧行为）。
+    """
+    return _parse(article, last_time, False, backend)
+
+def parse_profile_tweet(article, backend=None):
+    """user_autotwi.py 使用的精简版本 (ProfileTweet)，只包含时间、正文、互动数据和链接"""
+    return _parse(article, False, True, backend)
+
+def _safe(parse, *args):
+    try:
+        return parse(*args)
+    except Exception:
+        return None
+
+def parse_page_articles(page_html, last_time=False, profile=False, limit=None, backend=None):
+    """解析整个页面中的所有推文，返回解析成功的记录列表（limit 限制参与解析的 article 数量）"""
+    backend = backend or PARSER_BACKEND
+    if backend == 'selectolax':
+        articles = LexborHTMLParser(page_html).css(ARTICLE_SELECTOR)
+        parse = _parse_selectolax
+    elif backend == 'lxml':
+        root = etree.HTML(page_html)
+        articles = [] if root is None else [a for a in root.iter('article') if a.get('data-testid') == 'tweet']
+        parse = _parse_lxml
+    else:
+        articles = BeautifulSoup(page_html, 'html.parser').find_all('article', {'data-testid': 'tweet'})
+        parse = _parse_bs4
+    if limit is not None: articles = articles[:limit]
+    results = []
+    for article in articles:
+        parsed_data = _safe(parse, article, last_time, profile)
+        if parsed_data: results.append(parsed_data)
+    return results
@@ -4,44 +4,49 @@ import time
 import random
 import json
 import os
-import re
+from collections import deque
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
+from adaptive_wait import SCROLL_STATS, scroll_and_wait
+from article_collector import find_new_articles
+from instrumentation import COUNT_NEW, METRICS, STAGE_GET, STAGE_PARSE, STAGE_SLEEP, STAGE_SOURCE, STAGE_WAIT, STAGE_WRITE
+from tweet_parser import parse_count_text, parse_profile_tweet
+from tweet_model import UserProfile
+from backoff import BackoffPolicy
+from browser_pool import BrowserPool
+from session_manager import SessionManager
+from lean_browser import apply_lean_options, enable_request_blocking, persistent_profile_dir
+from tab_session import TabDriver
+from output_sink import open_sink
+from job_ledger import LEDGER_FILE, JobLedger
+from profile_cache import PROFILE_CACHE_FILE, ProfileCache
 
 # --- 全局设置 ---
 USERS_FILE = 'users.txt'  # 包含用户ID的输入文件名
 COOKIES_FILE = 'x_cookies.json'  # 登录凭证文件名
+ACCOUNT_COOKIE_FILES = None  # 多账号轮换：Cookies 文件列表，例如 ['x_cookies.json', 'x_cookies_2.json']，各浏览器会话按槽位轮流使用；None 表示只用 COOKIES_FILE
 OUTPUT_DIR = 'scraped_users'  # 结果保存目录
 HEADLESS_MODE = True  # True为无头模式（不显示浏览器），False为显示浏览器
-MAX_TWEETS = 10  # 每个用户爬取的近期帖子数量
+LEAN_BROWSER = False  # 精简模式：屏蔽图片、字体、视频和统计脚本请求，并限制渲染进程内存（规则见 lean_browser.py）
+TABS_PER_BROWSER = 1  # 多标签页模式：每个浏览器打开的标签页数，当前标签页以外的标签页预加载队列中后面的链接，页面加载与采集重叠（见 tab_session.py）；1 表示不使用
+PERSISTENT_PROFILES = False  # 每个浏览器会话使用固定的用户目录 (browser_profiles/user-N)，缓存和 Cookies 在多次运行之间保留
+MAX_TWEETS = 10  # 每个用户爬取的近期帖子数量（时间线边滚动边采集，不受页面虚拟列表的限制）
+TIMELINE_SINCE = None  # 只采集此日期 (YYYY-MM-DD) 及之后的帖子，遇到整批更早的帖子时停止滚动；None 表示不限
+INLINE_TWEETS = 10  # 保存在用户记录 recent_tweets 中的帖子数量；MAX_TWEETS 更大时，全部帖子逐条写入 timelines 子文件夹
+MAX_TIMELINE_SCROLLS = 500  # 每个用户最多滚动的次数
+MAX_WORKERS = 2  # 同时工作的浏览器会话数量
+PAGES_PER_SESSION = 50  # 每个浏览器会话处理多少个用户后自动重启
+PACE_SECONDS = (5, 12)  # 每个会话处理完一个用户后各自随机暂停的秒数范围（代替原来所有用户共用的全局等待）
+USER_TTL_DAYS = 30  # 已采集的用户数据超过这么多天后重新采集；None 表示永不过期
+ERROR_WAIT_TIME = 241  # 疑似触发频率限制时，出错的会话首次暂停的秒数（连续出错时指数增长）
+WRITE_QUEUE_SIZE = 0  # 流水线：后台写入线程的队列长度，写出跟不上时采集线程等待；0 表示在采集线程中直接写出
+OUTPUT_FORMAT = 'json'  # 输出格式: 'json' 每个用户一个文件（默认）/ 'jsonl' / 'parquet'（需要 pyarrow）；出错记录始终单独保存为 _error.json
 
 # --- 辅助函数 ---
 
-def save_cookies(driver, file_path):
-    """保存当前浏览器的Cookies到文件"""
-    with open(file_path, 'w') as f:
-        json.dump(driver.get_cookies(), f)
-    print(f"Cookies 已保存至 {file_path}")
-
-def load_cookies(driver, file_path):
-    """从文件加载Cookies到浏览器"""
-    if os.path.exists(file_path):
-        driver.get("https://x.com/")
-        time.sleep(1)
-        with open(file_path, 'r') as f:
-            cookies = json.load(f)
-        for cookie in cookies:
-            if 'sameSite' in cookie and cookie['sameSite'] not in ['Strict', 'Lax', 'None']:
-                del cookie['sameSite']
-            driver.add_cookie(cookie)
-        print("Cookies 加载成功。")
-        return True
-    print("未找到 Cookies 文件。")
-    return False
-
 def get_chrome_options():
     """配置Chrome浏览器选项"""
     options = webdriver.ChromeOptions()
@@ -53,181 +58,175 @@ def get_chrome_options():
     options.add_argument("--start-maximized")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if LEAN_BROWSER:
+        apply_lean_options(options)
+    profile_dir = persistent_profile_dir('user') if PERSISTENT_PROFILES else None
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={profile_dir}")
     options.add_argument('--log-level=3')
     options.add_experimental_option('excludeSwitches', ['enable-logging'])
     return options
 
-def perform_initial_login():
-    """仅在没有cookies时执行，用于首次手动登录"""
-    if os.path.exists(COOKIES_FILE):
-        return
-    print("未找到Cookies文件，将打开浏览器以便您手动登录。")
-    print("请在120秒内完成登录...")
-    login_options = get_chrome_options()
-    if any('--headless' in arg for arg in login_options.arguments):
-        login_options.arguments.remove('--headless')
-    driver = webdriver.Chrome(options=login_options)
-    driver.get("https://x.com/login")
+def create_logged_in_driver(sessions=None):
+    """创建一个新的浏览器并注入登录 Cookies，供浏览器会话池使用；sessions 为 None 时只读取 COOKIES_FILE"""
+    sessions = sessions or SessionManager([COOKIES_FILE])
+    driver = webdriver.Chrome(options=get_chrome_options())
+    if LEAN_BROWSER:
+        enable_request_blocking(driver)
     try:
-        WebDriverWait(driver, 120).until(EC.url_contains("home"))
-        print("登录成功！正在保存Cookies以备后用...")
-        save_cookies(driver, COOKIES_FILE)
-    except Exception as e:
-        print(f"登录超时或失败: {e}")
-    finally:
+        sessions.attach(driver)
+    except Exception:
         driver.quit()
+        raise
+    if TABS_PER_BROWSER > 1:
+        driver = TabDriver(driver, TABS_PER_BROWSER, setup=enable_request_blocking if LEAN_BROWSER else None)
+    return driver
 
-def parse_metric(element):
-    """从互动数据元素中更准确地解析出数字"""
-    if not element:
-        return 0
-    aria_label = element.get('aria-label', '')
-    if aria_label:
-        match = re.search(r'([\d,]+)', aria_label)
-        if match:
-            try:
-                return int(match.group(1).replace(',', ''))
-            except (ValueError, TypeError):
-                pass
-    return parse_count_text(element.get_text(strip=True))
+# --- 核心功能函数 ---
 
-def parse_count_text(text):
-    """【修复】解析带单位（万, K, M）的数字文本"""
-    if not text:
-        return 0
-    text = text.replace(',', '').strip().upper()
-    try:
-        if '万' in text:
-            num = float(text.replace('万', ''))
-            return int(num * 10000)
-        if 'K' in text:
-            num = float(text.replace('K', ''))
-            return int(num * 1000)
-        if 'M' in text:
-            num = float(text.replace('M', ''))
-            return int(num * 1000000)
-        return int(text)
-    except (ValueError, TypeError):
-        return 0
+RECENT_PATHS = 200  # 传给浏览器的最近链接数量：虚拟列表中同时存在的推文远少于此，更早的链接只在 Python 端去重
 
-def parse_tweet_article(article_soup):
-    """从一个包含单条推文的 'article' HTML片段中解析出关键数据。"""
-    try:
-        time_element = article_soup.find('time')
-        if not time_element or not time_element.find_parent('a'):
-            return None
-        post_link = "https://x.com" + time_element.find_parent('a')['href']
-        post_time = time_element['datetime']
-        tweet_text_div = article_soup.find('div', {'data-testid': 'tweetText'})
-        content = tweet_text_div.get_text(separator='\n', strip=True) if tweet_text_div else ''
-        reply_element = article_soup.find('button', {'data-testid': 'reply'}) or article_soup.find('div', {'data-testid': 'reply'})
-        retweet_element = article_soup.find('button', {'data-testid': 'retweet'}) or article_soup.find('div', {'data-testid': 'retweet'})
-        like_element = article_soup.find('button', {'data-testid': 'like'}) or article_soup.find('div', {'data-testid': 'like'})
-        reply_count = parse_metric(reply_element)
-        retweet_count = parse_metric(retweet_element)
-        like_count = parse_metric(like_element)
-        return {"post_time": post_time, "post_text": content, "reply_count": reply_count, "retweet_count": retweet_count, "like_count": like_count, "post_url": post_link}
-    except Exception:
-        return None
+def stream_timeline(driver, on_tweet, limit, since=None, max_scrolls=MAX_TIMELINE_SCROLLS):
+    """边滚动边采集主页时间线：每次滚动后只解析新出现的推文，按帖子链接去重后立即交给 on_tweet(tweet)
 
-# --- 核心功能函数 ---
+    达到 limit 条、某次滚动新出现的帖子全部早于 since (YYYY-MM-DD)、时间线到底或滚动 max_scrolls 次后停止；返回采集数量。
+    已滚出视野的推文不会丢失，内存中只保留帖子链接。
+    """
+    seen_paths = set()
+    recent_paths = deque(maxlen=RECENT_PATHS)
+    count = scrolls = idle = 0
+    while True:
+        new_count = older_count = 0
+        articles = find_new_articles(driver, recent_paths)
+        for href, article_html in articles:
+            if href in seen_paths:
+                continue
+            seen_paths.add(href)
+            recent_paths.append(href)
+            with METRICS.stage(STAGE_PARSE):
+                tweet = parse_profile_tweet(article_html)
+            if not tweet:
+                continue
+            new_count += 1
+            METRICS.count(COUNT_NEW)
+            if since and tweet['post_time'] < since:
+                older_count += 1  # 置顶帖可能很早，只有整批都早于截止日期时才停止
+                continue
+            on_tweet(tweet)
+            count += 1
+            if count >= limit:
+                return count
+        if (older_count and older_count == new_count) or scrolls >= max_scrolls:
+            return count
+        # 新帖子一出现就继续，最多等待3秒
+        last_height, new_height = scroll_and_wait(driver, (2, 3), 'profile')
+        scrolls += 1
+        idle = idle + 1 if new_height == last_height and not new_count else 0
+        if idle >= 2:
+            return count  # 连续两次滚动没有新内容，说明已到时间线底部
 
-def scrape_user_profile(driver, user_id):
-    """爬取单个用户的个人主页信息。"""
+def fetch_profile(driver, user_id):
+    """打开用户主页并解析资料区域（不含近期帖子），返回用户资料 (UserProfile)；出错时抛出异常"""
     url = f"https://x.com/{user_id}"
-    print(f"\n正在处理用户: {user_id} ({url})")
-    try:
+    with METRICS.stage(STAGE_GET):
         driver.get(url)
-        # 等待页面核心部分（用户名）加载
+    # 等待页面核心部分（用户名）加载
+    with METRICS.stage(STAGE_WAIT):
         WebDriverWait(driver, 20).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-testid="UserName"]'))
         )
+    with METRICS.stage(STAGE_SLEEP):
         time.sleep(random.uniform(2, 4)) # 等待页面稳定
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        user_data = {"scraped_url": url, "scraped_timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}
-        
-        username_element = soup.select_one('div[data-testid="UserName"] span > span')
-        user_data['username'] = username_element.text.strip() if username_element else "N/A"
-        userid_element = soup.select_one('div[data-testid="UserScreenName"] span')
-        user_data['user_id'] = userid_element.text.strip() if userid_element else f"@{user_id}"
-        bio_element = soup.select_one('div[data-testid="UserDescription"]')
-        user_data['bio'] = bio_element.get_text(separator='\n', strip=True) if bio_element else ""
-        location_element = soup.select_one('span[data-testid="UserLocation"] span')
-        user_data['location'] = location_element.text.strip() if location_element else "N/A"
-        website_element = soup.select_one('a[data-testid="UserUrl"] span')
-        user_data['website'] = website_element.text.strip() if website_element else "N/A"
-        join_date_element = soup.select_one('span[data-testid="UserJoinDate"] span')
-        user_data['join_date'] = join_date_element.text.strip() if join_date_element else "N/A"
-        
-        # --- 【修复】采用更精确的选择器来提取关注和粉丝数 ---
-        following_count = 0
-        followers_count = 0
-        
-        # 直接通过href属性的后缀来定位元素，更精确
-        following_link = soup.select_one(f'a[href$="/following"]')
-        if following_link:
-            # 寻找所有可能包含数字的span元素
-            count_elements = following_link.select('span')
-            for span in count_elements:
-                text = span.get_text(strip=True)
-                if text and any(char.isdigit() or char in '万KM.' for char in text):
-                    following_count = parse_count_text(text)
-                    break
-                
-        # followers链接可能以 /followers 或 /verified_followers 结尾
-        followers_link = soup.select_one(f'a[href$="/verified_followers"]') or soup.select_one(f'a[href$="/followers"]')
-        if followers_link:
-            # 寻找所有可能包含数字的span元素
-            count_elements = followers_link.select('span')
-            for span in count_elements:
-                text = span.get_text(strip=True)
-                if text and any(char.isdigit() or char in '万KM.' for char in text):
-                    followers_count = parse_count_text(text)
-                    break
-        
-        user_data['following_count'] = following_count
-        user_data['followers_count'] = followers_count
-        user_data['ip_location'] = "N/A (无法从公开页面获取)"
+    
+    with METRICS.stage(STAGE_SOURCE):
+        page_source = driver.page_source
+    with METRICS.stage(STAGE_PARSE):
+        soup = BeautifulSoup(page_source, 'html.parser')
+    user_data = UserProfile(url, time.strftime("%Y-%m-%d %H:%M:%S"))
+    
+    username_element = soup.select_one('div[data-testid="UserName"] span > span')
+    user_data['username'] = username_element.text.strip() if username_element else "N/A"
+    userid_element = soup.select_one('div[data-testid="UserScreenName"] span')
+    user_data['user_id'] = userid_element.text.strip() if userid_element else f"@{user_id}"
+    bio_element = soup.select_one('div[data-testid="UserDescription"]')
+    user_data['bio'] = bio_element.get_text(separator='\n', strip=True) if bio_element else ""
+    location_element = soup.select_one('span[data-testid="UserLocation"] span')
+    user_data['location'] = location_element.text.strip() if location_element else "N/A"
+    website_element = soup.select_one('a[data-testid="UserUrl"] span')
+    user_data['website'] = website_element.text.strip() if website_element else "N/A"
+    join_date_element = soup.select_one('span[data-testid="UserJoinDate"] span')
+    user_data['join_date'] = join_date_element.text.strip() if join_date_element else "N/A"
+    
+    # --- 【修复】采用更精确的选择器来提取关注和粉丝数 ---
+    following_count = 0
+    followers_count = 0
+    
+    # 直接通过href属性的后缀来定位元素，更精确
+    following_link = soup.select_one(f'a[href$="/following"]')
+    if following_link:
+        # 寻找所有可能包含数字的span元素
+        count_elements = following_link.select('span')
+        for span in count_elements:
+            text = span.get_text(strip=True)
+            if text and any(char.isdigit() or char in '万KM.' for char in text):
+                following_count = parse_count_text(text)
+                break
+            
+    # followers链接可能以 /followers 或 /verified_followers 结尾
+    followers_link = soup.select_one(f'a[href$="/verified_followers"]') or soup.select_one(f'a[href$="/followers"]')
+    if followers_link:
+        # 寻找所有可能包含数字的span元素
+        count_elements = followers_link.select('span')
+        for span in count_elements:
+            text = span.get_text(strip=True)
+            if text and any(char.isdigit() or char in '万KM.' for char in text):
+                followers_count = parse_count_text(text)
+                break
+    
+    user_data['following_count'] = following_count
+    user_data['followers_count'] = followers_count
+    return user_data
 
-        print(f"正在为 {user_id} 爬取最近 {MAX_TWEETS} 条帖子...")
-        # --- 【修复】增加多次滚动逻辑以加载更多帖子 ---
-        scroll_attempts = 0
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while scroll_attempts < 3: # 最多滚动3次来加载帖子
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(random.uniform(2, 3))
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break # 如果页面高度不变，说明已到底部
-            last_height = new_height
-            scroll_attempts += 1
-        
-        # 滚动后重新解析页面，获取所有已加载的帖子
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        tweet_articles = soup.find_all('article', {'data-testid': 'tweet'}, limit=MAX_TWEETS)
-        
-        recent_tweets = []
-        for article in tweet_articles:
-            parsed_tweet = parse_tweet_article(article)
-            if parsed_tweet:
-                recent_tweets.append(parsed_tweet)
-        
-        user_data['recent_tweets'] = recent_tweets
-        
-        output_filename = f"{user_id}.json"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(user_data, f, ensure_ascii=False, indent=4)
-        print(f"[成功] 用户 {user_id} 的数据已保存至 {output_path}")
+def scrape_user_profile(driver, user_id, sink, cache=None, timeline_sink=None):
+    """爬取单个用户的个人主页信息和近期帖子并写出，同时更新用户资料缓存；出错时抛出异常交给浏览器会话池分类、退避和重试
 
-    except Exception as e:
-        print(f"[失败] 处理用户 {user_id} 时发生错误: {e}")
-        error_info = {"user_id": user_id, "error_message": str(e), "error_timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}
-        output_filename = f"{user_id}_error.json"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(error_info, f, ensure_ascii=False, indent=4)
+    前 INLINE_TWEETS 条帖子保存在用户记录的 recent_tweets 中；提供 timeline_sink 时，每条帖子采集到后立即逐条写出。
+    重试的用户可能重复写出部分帖子，读取时按帖子链接 (_key) 去重。
+    """
+    print(f"\n[{time.strftime('%H:%M:%S')}] 正在处理用户: {user_id} (https://x.com/{user_id})")
+    user_data = fetch_profile(driver, user_id)
+    if cache is not None:
+        cache.put(user_id, user_data)
+
+    print(f"正在为 {user_id} 爬取最近 {MAX_TWEETS} 条帖子" + (f" (截止 {TIMELINE_SINCE})..." if TIMELINE_SINCE else "..."))
+    recent_tweets = []
+
+    def on_tweet(tweet):
+        if len(recent_tweets) < INLINE_TWEETS:
+            recent_tweets.append(tweet)
+        if timeline_sink is not None:
+            with METRICS.stage(STAGE_WRITE):
+                timeline_sink.write({"profile_user_id": user_id, **tweet}, tweet['post_url'])
+
+    collected = stream_timeline(driver, on_tweet, MAX_TWEETS, TIMELINE_SINCE)
+    if collected > len(recent_tweets):
+        print(f"用户 {user_id} 共采集 {collected} 条帖子，已逐条写入时间线文件。")
+    
+    user_data['recent_tweets'] = recent_tweets
+    
+    with METRICS.stage(STAGE_WRITE):
+        output_path = sink.write(user_data, user_id, filename=f"{user_id}.json")
+    error_path = os.path.join(OUTPUT_DIR, f"{user_id}_error.json")
+    if os.path.exists(error_path):
+        os.remove(error_path)  # 重试成功，删除上次留下的错误记录
+    print(f"[{time.strftime('%H:%M:%S')}] [成功] 用户 {user_id} 的数据已保存至 {output_path}")
+
+def save_error(user_id, error):
+    """重试次数用完后，把错误信息保存为 {user_id}_error.json；下次运行时这些用户会被重新采集"""
+    error_info = {"user_id": user_id, "error_message": str(error).strip(), "error_timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}
+    with open(os.path.join(OUTPUT_DIR, f"{user_id}_error.json"), 'w', encoding='utf-8') as f:
+        json.dump(error_info, f, ensure_ascii=False, indent=4)
+    return error_info
 
 def main():
     """主执行函数"""
@@ -248,32 +247,78 @@ def main():
         print(f"'{USERS_FILE}' 文件为空或不包含有效用户ID。")
         return
 
-    perform_initial_login()
+    sessions = SessionManager(ACCOUNT_COOKIE_FILES or [COOKIES_FILE], options_factory=get_chrome_options)
+    if not sessions.ensure_logged_in():
+        print("无法加载Cookies，程序无法继续执行。")
+        return
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
-    driver = None
-    try:
-        driver = webdriver.Chrome(options=get_chrome_options())
-        if not load_cookies(driver, COOKIES_FILE):
-            print("无法加载Cookies，程序无法继续执行。请检查或删除 x_cookies.json 文件后重试。")
-            return
-        
-        print(f"\n准备就绪，将处理 {len(user_ids)} 个用户...")
-        
-        for user_id in user_ids:
-            scrape_user_profile(driver, user_id)
-            sleep_time = random.uniform(5, 12)
-            print(f"暂停 {sleep_time:.1f} 秒...")
-            time.sleep(sleep_time)
+    # 任务台账记录每个用户的状态，重新运行时跳过已完成的用户；记录落盘后才标记完成
+    ledger = JobLedger(LEDGER_FILE)
+    sink = open_sink(OUTPUT_DIR, OUTPUT_FORMAT, name='users', on_durable=lambda keys: ledger.complete(OUTPUT_DIR, keys), background=WRITE_QUEUE_SIZE)
+    # 需要的帖子多于 INLINE_TWEETS 时，帖子逐条写入 timelines 子文件夹（json 模式下使用 JSONL，避免产生大量小文件）
+    timeline_sink = open_sink(os.path.join(OUTPUT_DIR, 'timelines'), 'jsonl' if OUTPUT_FORMAT == 'json' else OUTPUT_FORMAT, name='timeline',
+                             background=WRITE_QUEUE_SIZE) if MAX_TWEETS > INLINE_TWEETS else None
+    cache = ProfileCache(PROFILE_CACHE_FILE)  # 采集到的用户资料同时写入共享缓存，供推文采集脚本附加到记录中
+    first_run = not ledger.has_task(OUTPUT_DIR)
+    ledger.add(OUTPUT_DIR, [(user_id, f"https://x.com/{user_id}", None) for user_id in user_ids])  # 已登记的用户保持原状，只追加 users.txt 中新增的用户
+    if first_run:
+        # 从旧版迁移：只在首次登记时扫描一次已有输出；以文件的修改时间作为完成时间，早已过期的资料照常按 USER_TTL_DAYS 重新采集
+        completed_at = sink.completed_key_times()
+        ledger.complete(OUTPUT_DIR, completed_at, completed_at=completed_at)
+    if USER_TTL_DAYS is not None:
+        expired = ledger.expire(OUTPUT_DIR, USER_TTL_DAYS * 86400)
+        if expired:
+            print(f"{expired} 个用户的数据已超过 {USER_TTL_DAYS} 天，将重新采集。")
+    retried = ledger.requeue(OUTPUT_DIR)  # 上次中断或出错（留下 _error.json）的用户重新排队
+    if retried:
+        print(f"{retried} 个上次未完成或出错的用户将重新采集。")
+    pending_ids = set(user_id for user_id, _, _ in ledger.pending(OUTPUT_DIR))
+    user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id in pending_ids]
+    if not user_ids:
+        print("所有用户均已处理完毕！")
+        sink.close()
+        if timeline_sink: timeline_sink.close()
+        cache.close()
+        ledger.close()
+        return
 
-        print("\n所有用户处理完毕！")
+    print(f"\n准备就绪，将使用 {MAX_WORKERS} 个并行浏览器会话处理 {len(user_ids)} 个用户...")
+    # 每个会话处理完一个用户后各自暂停 PACE_SECONDS，出错的会话按失败类型单独退避，其他会话继续工作
+    pool = BrowserPool(lambda: create_logged_in_driver(sessions), size=MAX_WORKERS, pages_per_session=PAGES_PER_SESSION, name='会话',
+                       backoff=BackoffPolicy(rate_limit_delay=ERROR_WAIT_TIME), pace=PACE_SECONDS, on_logged_out=sessions.logged_out)
+
+    def scrape(driver, user_id):
+        if not ledger.claim(OUTPUT_DIR, user_id):
+            return  # 已被其他会话领取或已完成
+        try:
+            scrape_user_profile(driver, user_id, sink, cache, timeline_sink)
+        except Exception as e:
+            ledger.fail(OUTPUT_DIR, user_id, e)
+            raise
+    scrape.prefetch = lambda user_id: [f"https://x.com/{user_id}"]  # 多标签页模式下预加载的主页
 
+    try:
+        pool.run(user_ids, scrape)
+        print("\n所有用户处理完毕！")
     except Exception as e:
         print(f"程序在执行过程中遇到未处理的严重错误: {e}")
     finally:
-        if driver:
-            print("正在关闭浏览器...")
-            driver.quit()
+        print("正在关闭浏览器...")
+        pool.close()
+        sink.close()
+        if timeline_sink: timeline_sink.close()
+        for failure in pool.failures:
+            save_error(failure['item'], failure['error'])
+            ledger.fail(OUTPUT_DIR, failure['item'], failure['error'], final=True)
+            print(f"  [放弃] [{failure['kind']}] 用户 {failure['item']} (失败 {failure['attempts']} 次): {failure['error']}")
+        pool.report()
+        sessions.report()
+        SCROLL_STATS.report()
+        METRICS.report('用户采集')
+        METRICS.close()
+        cache.close()
+        ledger.close()
 
 if __name__ == "__main__":
     main()